@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+
+"""
+Script:	benchmark.py
+Date:	2026-10-16
+Platform: macOS/Linux
+Description:
+Benchmarks of the jamf classes against the local mock server (mock_jamf.py)
+Results are written as json, and can be compared to an earlier run to catch regressions
+"""
+__author__ = 'thedzy'
+__copyright__ = 'Copyright 2020, thedzy'
+__license__ = 'GPL'
+__version__ = '1.0'
+__maintainer__ = 'thedzy'
+__email__ = 'thedzy@hotmail.com'
+__status__ = 'Development'
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List
+
+import requests
+
+import jamf
+from mock_jamf import MockJamfServer
+
+BENCHMARKS = ('startup', 'dispatch', 'paging', 'parse')
+# Lower is better for every result except these
+HIGHER_IS_BETTER = ('records_per_second', 'megabytes_per_second')
+
+
+def measure(function: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """
+    Time a function
+    :param function: Function to call
+    :param repeat: Times to call it
+    :return: Seconds, median/min/max
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return {'median': statistics.median(times), 'min': min(times), 'max': max(times)}
+
+
+def clear_specs() -> None:
+    """
+    Forget the swagger docs parsed in this process
+    """
+    with jamf._SPEC_LOCK:
+        jamf._SPEC_ENTRIES.clear()
+        jamf._SPEC_DIGESTS.clear()
+        jamf._SPEC_DIGEST_LOCKS.clear()
+
+
+def bench_startup(url: str, repeat: int) -> Dict[str, Any]:
+    """
+    Constructor time of the classes, with and without the swagger cache
+    :param url: Server url
+    :param repeat: Times to create each class
+    :return: Results
+    """
+    results = {}
+    for cls in (jamf.JamfClassic, jamf.JamfUAPI):
+        def create(**kwargs: Any) -> None:
+            api = cls(url, 'user', 'password', **kwargs)
+            api.logout()
+
+        # The parsed docs are also kept in process, by server and by digest, cleared so the fetch and parse or the disk
+        # cache is what is measured
+        results[f'{cls.__name__}.uncached'] = measure(lambda: (clear_specs(), create(spec_cache_dir=None)), repeat)
+        with tempfile.TemporaryDirectory() as cache_dir:
+            create(spec_cache_dir=cache_dir)
+            results[f'{cls.__name__}.disk_cache'] = measure(
+                lambda: (clear_specs(), create(spec_cache_dir=cache_dir)), repeat)
+            results[f'{cls.__name__}.memory_cache'] = measure(lambda: create(spec_cache_dir=cache_dir), repeat)
+    return results
+
+
+def bench_dispatch(url: str, calls: int) -> Dict[str, Any]:
+    """
+    Time a generated method takes over a plain request of the same url
+    :param url: Server url
+    :param calls: Calls to make
+    :return: Results, seconds per call
+    """
+    results = {}
+    for cls, method, target in ((jamf.JamfClassic, 'computers_find_computers_by_id', '/JSSResource/computers/id/1'),
+                                (jamf.JamfUAPI, 'categories_get_v1_categories_by_id', '/api/v1/categories/1')):
+        api = cls(url, 'user', 'password', spec_cache_dir=None)
+        api_method = getattr(api, method)
+        session = requests.Session()
+        headers = dict(api._headers)
+
+        api_method(id=1)
+        session.get(f'{url}{target}', headers=headers)
+        generated = measure(lambda: api_method(id=1), calls)['median']
+        plain = measure(lambda: session.get(f'{url}{target}', headers=headers), calls)['median']
+        results[f'{cls.__name__}.{method}'] = {
+            'generated': generated,
+            'plain': plain,
+            'overhead': generated - plain,
+        }
+        session.close()
+        api.logout()
+    return results
+
+
+def bench_paging(url: str, page_sizes: List[int]) -> Dict[str, Any]:
+    """
+    Records per second walking the computer inventory
+    :param url: Server url
+    :param page_sizes: Page sizes to walk with
+    :return: Results
+    """
+    results = {}
+    api = jamf.JamfUAPI(url, 'user', 'password', spec_cache_dir=None)
+    for page_size in page_sizes:
+        for prefetch in (False, True):
+            start = time.perf_counter()
+            count = sum(1 for _ in api.iter_results('computer_inventory_get_v1_computers_inventory',
+                                                    page_size=page_size, prefetch=prefetch,
+                                                    section=['GENERAL', 'HARDWARE']))
+            seconds = time.perf_counter() - start
+            results[f'page_size_{page_size}.{"prefetch" if prefetch else "serial"}'] = {
+                'records': count,
+                'seconds': seconds,
+                'records_per_second': count / seconds,
+            }
+    api.logout()
+    return results
+
+
+def bench_parse(url: str, computers: int, repeat: int) -> Dict[str, Any]:
+    """
+    APIResponse parse time of a large json and xml response
+    :param url: Server url
+    :param computers: Records in the response
+    :param repeat: Times to parse each response
+    :return: Results
+    """
+    results = {}
+    uapi = jamf.JamfUAPI(url, 'user', 'password', spec_cache_dir=None, response_bytes=True)
+    page = uapi.computer_inventory_get_v1_computers_inventory(
+        **{'page-size': computers, 'section': ['GENERAL', 'HARDWARE', 'APPLICATIONS']})
+    classic = jamf.JamfClassic(url, 'user', 'password', spec_cache_dir=None, return_format='xml',
+                               response_bytes=True)
+    listing = classic.computers_find_computers()
+    record = classic.computers_find_computers_by_id(id=1)
+
+    for name, response, list_tags in (('json.inventory_page', page, ()),
+                                      ('xml.computers', listing, classic._xml_lists),
+                                      ('xml.computer', record, classic._xml_lists)):
+        body = response.data
+        timing = measure(lambda: jamf.APIResponse(True, response.url, body, 200, list_tags=list_tags).json, repeat)
+        timing['bytes'] = len(body)
+        timing['megabytes_per_second'] = len(body) / timing['median'] / 1e6
+        results[name] = timing
+
+    start = time.perf_counter()
+    count = sum(1 for _ in classic.iter_xml('computers_find_computers'))
+    seconds = time.perf_counter() - start
+    results['xml.iter_xml'] = {'records': count, 'seconds': seconds, 'records_per_second': count / seconds}
+
+    uapi.logout()
+    classic.logout()
+    return results
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float, path: str = '') -> List[str]:
+    """
+    Find the results that are worse than the baseline
+    :param results: Results of this run
+    :param baseline: Results of an earlier run
+    :param tolerance: Fraction a result can be worse by, ie. 0.2
+    :param path: Key path, for the messages
+    :return: Messages, one per regression
+    """
+    regressions = []
+    for key, value in results.items():
+        old = baseline.get(key) if isinstance(baseline, dict) else None
+        if isinstance(value, dict):
+            regressions += compare(value, old or {}, tolerance, f'{path}{key}.')
+        elif isinstance(value, (int, float)) and isinstance(old, (int, float)) and old > 0:
+            if key in ('records', 'bytes', 'overhead', 'max'):
+                continue
+            change = (value - old) / old
+            if key in HIGHER_IS_BETTER:
+                change = -change
+            if change > tolerance:
+                regressions.append(f'{path}{key}: {old:.6g} -> {value:.6g} ({change:+.0%} worse)')
+    return regressions
+
+
+def main():
+    selected = set(options.benchmarks or BENCHMARKS)
+    with MockJamfServer('127.0.0.1', computers=options.computers, latency=options.latency) as server:
+        results = {}
+        if 'startup' in selected:
+            results['startup'] = bench_startup(server.url, options.repeat)
+        if 'dispatch' in selected:
+            results['dispatch'] = bench_dispatch(server.url, options.calls)
+        if 'paging' in selected:
+            results['paging'] = bench_paging(server.url, options.page_sizes)
+        if 'parse' in selected:
+            results['parse'] = bench_parse(server.url, options.computers, options.repeat)
+
+    report = {
+        'date': datetime.now(timezone.utc).isoformat(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'options': {'computers': options.computers, 'latency': options.latency, 'repeat': options.repeat,
+                    'calls': options.calls},
+        'results': results,
+    }
+    output = json.dumps(report, indent=2)
+    if options.output:
+        with open(options.output, 'w') as file:
+            file.write(output)
+    else:
+        print(output)
+
+    if options.baseline:
+        with open(options.baseline) as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline.get('results', {}), options.tolerance)
+        for regression in regressions:
+            print(f'Regression: {regression}', file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    # Create argument parser
+    parser = argparse.ArgumentParser(description='Benchmark the jamf classes against a local mock server')
+
+    parser.add_argument('benchmarks', nargs='*', metavar='benchmark',
+                        help=f'benchmarks to run: {", ".join(BENCHMARKS)}, default all')
+    parser.add_argument('-o', '--output', default=None, dest='output', help='json file to write, default stdout')
+    parser.add_argument('-b', '--baseline', default=None, dest='baseline',
+                        help='json of an earlier run, exits 1 if a result is worse by more than the tolerance')
+    parser.add_argument('-t', '--tolerance', default=0.2, type=float, dest='tolerance',
+                        help='fraction a result can be worse than the baseline by, default 0.2')
+    parser.add_argument('--computers', default=5000, type=int, dest='computers', help='synthetic computers')
+    parser.add_argument('--latency', default=0.0, type=float, dest='latency', help='seconds added to each response')
+    parser.add_argument('--repeat', default=5, type=int, dest='repeat', help='times to repeat each timing')
+    parser.add_argument('--calls', default=200, type=int, dest='calls', help='calls for the dispatch benchmark')
+    parser.add_argument('--page-sizes', default=[100, 1000], type=int, nargs='+', dest='page_sizes',
+                        help='page sizes for the paging benchmark')
+
+    options = parser.parse_args()
+    for benchmark in options.benchmarks:
+        if benchmark not in BENCHMARKS:
+            parser.error(f'unknown benchmark {benchmark}, choose from {", ".join(BENCHMARKS)}')
+    main()
@@ -15,12 +15,28 @@ __maintainer__ = 'thedzy'
 __email__ = 'thedzy@hotmail.com'
 __status__ = 'Development'
 
+import base64
+import gzip
+import hashlib
+import importlib
+import io
+import itertools
 import json
+import marshal
+import os
 import re
+import sqlite3
+import sys
+import threading
 import time
 import warnings
+import weakref
 import xml.etree.ElementTree as ET
-from typing import Any, Dict, Optional, Union, Tuple
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from collections import Counter, OrderedDict, deque
+from typing import Any, Callable, Collection, Dict, FrozenSet, Iterable, Iterator, List, Optional, Union, Tuple
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 import logging
@@ -29,6 +45,27 @@ import requests
 import urllib3
 import yaml
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Parsed swagger docs are kept here between runs, keyed by server url
+SPEC_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'jamf_classes')
+# Bump when the layout of a spec cache entry (or the method naming) changes
+SPEC_CACHE_FORMAT = 2
+
+# Spec cache entries already loaded by this process, keyed by swagger url
+_SPEC_ENTRIES: Dict[str, Dict[str, Any]] = {}
+# The same, keyed by a digest of the swagger docs, so servers running the same version share one parsed spec
+_SPEC_DIGESTS: Dict[str, Dict[str, Any]] = {}
+_SPEC_DIGEST_LOCKS: Dict[str, threading.Lock] = {}
+_SPEC_LOCK = threading.Lock()
+
+
+# orjson is used to parse responses when it is installed
+_json_loads: Callable[[Union[str, bytes]], Any] = orjson.loads if orjson is not None else json.loads
+
 
 class AuthenticationError(Exception):
     """Raised when authentication to Jamf API fails."""
@@ -40,22 +77,131 @@ class SwaggerDocsError(Exception):
     pass
 
 
+class PageError(Exception):
+    """Raised when getting a page of results fails."""
+    pass
+
+
+class StreamError(Exception):
+    """Raised when a streamed response fails."""
+    pass
+
+
+class CassetteError(Exception):
+    """Raised when a cassette cannot be read or has no response for a request."""
+    pass
+
+
+class CircuitOpenError(Exception):
+    """Raised when an endpoint is failing and its calls are stopped by the circuit breaker."""
+    pass
+
+
+def xml_to_dict(element: ET.Element, list_tags: Collection[str] = ()) -> Any:
+    """
+    Convert an element and everything in it to python values
+    An element is a list when the swagger docs say so or when its children are repeated, only then is a <size> child
+    taken to be the count of the list rather than a field
+    :param element: Element
+    :param list_tags: Tags of elements that are lists
+    :return: Text, list or dictionary
+    """
+    children = list(element)
+    if not children:
+        if element.tag in list_tags and not (element.text or '').strip():
+            return []
+        return element.text
+
+    counts = Counter(child.tag for child in children)
+    item_tags = [tag for tag in counts if tag != 'size']
+    if element.tag in list_tags or (len(item_tags) == 1 and counts[item_tags[0]] > 1):
+        return [xml_to_dict(child, list_tags) for child in children if child.tag != 'size']
+
+    values = {}
+    for child in children:
+        if counts[child.tag] > 1:
+            values.setdefault(child.tag, []).append(xml_to_dict(child, list_tags))
+        else:
+            values[child.tag] = xml_to_dict(child, list_tags)
+    return values
+
+
 class APIResponse:
+    """
+    The response to an api call, the body is only parsed when json is first used
+    """
+    __slots__ = ('success', 'url', 'response', 'http_code', 'err', 'list_tags', 'cached', 'not_modified',
+                 'elapsed', '_json', '_is_json')
+
     def __init__(self, success: bool = False, url: Optional[str] = None,
-                 response: Optional[Union[str, Dict[str, Any]]] = None, http_code: int = 0,
-                 err: Optional[str] = None, **kwargs: Any) -> None:
+                 response: Optional[Union[str, bytes, Dict[str, Any]]] = None, http_code: int = 0,
+                 err: Optional[str] = None, list_tags: Collection[str] = (), **kwargs: Any) -> None:
         """
         Initialisation
+        :param list_tags: Tags of xml elements that are lists
         """
         self.success: bool = kwargs.get('success', success)
         self.url: Optional[str] = kwargs.get('url', url)
-        self.response: Optional[Union[str, Dict[str, Any]]] = kwargs.get('response', response)
+        self.response: Optional[Union[str, bytes, Dict[str, Any]]] = kwargs.get('response', response)
         self.http_code: int = kwargs.get('http_code', http_code)
         self.err: Optional[str] = kwargs.get('err', err)
-        self.data: Optional[Union[str, Dict[str, Any]]] = self.response
-        self.json: dict
-        self.is_json: bool
-        self.json, self.is_json = self.get_json()
+        self.list_tags: Collection[str] = kwargs.get('list_tags', list_tags)
+        self.cached: bool = kwargs.get('cached', False)
+        self.not_modified: bool = kwargs.get('not_modified', False)
+        self.elapsed: Optional[Dict[str, float]] = kwargs.get('elapsed')
+        self._json: Optional[Dict[str, Any]] = None
+        self._is_json: Optional[bool] = None
+
+    def copy(self, **kwargs: Any) -> 'APIResponse':
+        """
+        Copy the response, the body and the parsed json are shared rather than copied
+        :param kwargs: Attributes to change, ie. elapsed
+        :return: API response
+        """
+        response = APIResponse(self.success, self.url, self.response, self.http_code, self.err, self.list_tags,
+                               cached=self.cached, not_modified=self.not_modified, elapsed=self.elapsed)
+        response._json, response._is_json = self._json, self._is_json
+        for key, value in kwargs.items():
+            setattr(response, key, value)
+        return response
+
+    @property
+    def data(self) -> Optional[Union[str, bytes, Dict[str, Any]]]:
+        """
+        Get the raw response
+        :return: Response text, or bytes
+        """
+        return self.response
+
+    @property
+    def json(self) -> Optional[Dict[str, Any]]:
+        """
+        Get the parsed response, parsed on first use
+        :return: Dictionary values/None
+        """
+        if self._is_json is None:
+            self._parse()
+        return self._json
+
+    @property
+    def is_json(self) -> bool:
+        """
+        Get if the response could be parsed
+        :return: Is converted successfully
+        """
+        if self._is_json is None:
+            self._parse()
+        return self._is_json
+
+    def _parse(self) -> None:
+        """
+        Parse the response, adding the time taken to elapsed
+        :return: None
+        """
+        start = time.perf_counter()
+        self._json, self._is_json = self.get_json()
+        if self.elapsed is not None:
+            self.elapsed['parse'] = time.perf_counter() - start
 
     def get_json(self) -> Tuple[Optional[Dict[str, Any]], bool]:
         """
@@ -64,13 +210,17 @@ class APIResponse:
         """
         is_json = False
         json_data = None
+        if self.data is None:
+            return json_data, is_json
+        if isinstance(self.data, dict):
+            return self.data, True
         try:
-            json_data = json.loads(self.data)
+            json_data = _json_loads(self.data)
             is_json = True
-        except json.decoder.JSONDecodeError:
+        except ValueError:
             try:
                 root = ET.fromstring(self.data)
-                json_data = {root.tag: {child.tag: child.text for child in root}}
+                json_data = {root.tag: xml_to_dict(root, self.list_tags)}
                 is_json = True
             except ET.ParseError as e:
                 json_data = None
@@ -78,231 +228,2817 @@ class APIResponse:
         return json_data, is_json
 
     def __str__(self) -> str:
+        if isinstance(self.data, bytes):
+            return self.data.decode(errors='replace')
         return str(self.data)
 
     def __repr__(self) -> str:
         return f'<APIResponse(success={self.success}, http_code={self.http_code}, url={self.url})>'
 
 
-class Jamf:
+def token_lifetime(data: Dict[str, Any], date: Optional[str] = None) -> float:
     """
-    Parent class for shared Jamf API logic.
+    Seconds a token is valid for, from the expires in the auth response
+    Measured against the servers Date header when there is one, so clock differences do not matter
+    :param data: Auth response, {'token': ..., 'expires': ...}
+    :param date: Date header of the auth response
+    :return: Seconds, 30 minutes if the expiry is missing or unreadable
+    """
+    expires = data.get('expires')
+    try:
+        if isinstance(expires, (int, float)):
+            expiry = expires / 1000
+        else:
+            expiry = datetime.fromisoformat(str(expires).replace('Z', '+00:00')).timestamp()
+        now = parsedate_to_datetime(date).timestamp() if date else time.time()
+    except (TypeError, ValueError):
+        return 30 * 60
+    lifetime = expiry - now
+    return lifetime if lifetime > 0 else 30 * 60
+
+
+class TokenManager:
+    """
+    Bearer token for a Jamf server, shareable between clients and threads
+    Only one caller fetches a token while the others wait for it, and the token is renewed on a background
+    thread before it expires so requests do not wait on authentication
     """
 
-    def __init__(self, api_url: str, username: str, password: str,
-                 timeout: float = 240.0, verify: bool = True,
-                 disable_warnings: bool = False, return_format: str = 'json',
-                 **kwargs: Any) -> None:
+    def __init__(self, auth_url: str, username: str, password: str, session: Optional[requests.Session] = None,
+                 timeout: float = 240.0, verify: bool = True, refresh_margin: float = 60.0) -> None:
         """
-        Shared initialization logic for Jamf classes.
+        Initialisation
+        :param auth_url: Token url, ie. https://jamf.example.com/api/v1/auth/token
+        :param username: Username
+        :param password: Password
+        :param session: Session to authenticate with, pooled connections are reused
+        :param timeout: Request timeout
+        :param verify: Verify ssl
+        :param refresh_margin: Seconds before expiry to renew the token
         """
         self._logger = logging.getLogger(__name__)
-
-        self._api_url: str = self._format_api_url(api_url)
-        self._username: str = username
-        self._password: str = password
-        self._token_expiry = 0
-
+        self._auth_url: str = auth_url
+        self._username: Optional[str] = username
+        self._password: Optional[str] = password
+        self._session: requests.Session = session or requests.Session()
         self._timeout: float = timeout
         self._verify: bool = verify
-        self._disable_warnings: bool = disable_warnings
-        self._return_format: str = return_format
-        self._hide_deprecated: bool = kwargs.get('hide_deprecated', False)
+        self._refresh_margin: float = refresh_margin
+
+        self._lock = threading.Lock()
+        self._token: Optional[str] = None
+        self._expires: float = 0
+        self._renew_at: float = 0
+        self._timer: Optional[threading.Timer] = None
+        self._renewing = False
+        self._clients = 0
+        # A token owned by another process, it is used until it expires but never renewed or invalidated
+        self._borrowed: Optional[str] = None
+
+        self.refresh_time: float = 0
+        self.refreshes: int = 0
+
+    @classmethod
+    def borrow(cls, auth_url: str, username: Optional[str], password: Optional[str], token: str, expires: float,
+               **kwargs: Any) -> 'TokenManager':
+        """
+        Create a token manager using a token owned by another process
+        Renewing the token (keep-alive) would invalidate it for its owner, so before it expires a token of its own is
+        fetched with the credentials, and only that one is invalidated
+        :param auth_url: Token url
+        :param username: Username, None to only use the token
+        :param password: Password
+        :param token: Token
+        :param expires: Token expiry, epoch seconds
+        :param kwargs: Options, as the constructor
+        :return: Token manager
+        """
+        manager = cls(auth_url, username, password, **kwargs)
+        manager._token = manager._borrowed = token
+        manager._expires = expires
+        manager._renew_at = expires - manager._refresh_margin if username is not None else expires
+        return manager
 
-        self._headers: Dict[str, str] = {}
+    def state(self) -> Tuple[Optional[str], float]:
+        """
+        Get the token as it is, to lend to another process, without fetching or renewing it
+        The borrower fetches its own with the credentials if it is missing or about to expire
+        :return: Token, None without one, and its expiry, epoch seconds
+        """
+        return self._token, self._expires
 
-        if self._return_format not in ('json', 'xml'):
-            raise ValueError('return_format must be "json" or "xml"')
+    @property
+    def expires(self) -> float:
+        """
+        Get the token expiry
+        :return: Epoch seconds, 0 without a token
+        """
+        return self._expires
 
-        # Configure session with retry strategy
-        retry_strategy = Retry(
-            total=3,
-            backoff_factor=1,
-            status_forcelist=[429, 500, 502, 503, 504],
-            allowed_methods=["HEAD", "GET", "OPTIONS", "POST", "PUT", "DELETE"]
+    def token(self) -> str:
+        """
+        Get a valid token, only blocking when there is none
+        :return: Token
+        """
+        token = self._token
+        if token is not None and time.time() < self._expires:
+            if time.time() >= self._renew_at and not self._renewing:
+                # The renewal timer has not run, renew without holding up this request
+                self._renewing = True
+                self._schedule(0)
+            return token
+
+        with self._lock:
+            if self._token is None or time.time() >= self._expires:
+                self._refresh()
+            return self._token
+
+    def attach(self) -> 'TokenManager':
+        """
+        Register a client using the token
+        :return: The token manager
+        """
+        with self._lock:
+            self._clients += 1
+        return self
+
+    def release(self) -> None:
+        """
+        Unregister a client, the token is invalidated when the last one is released
+        :return: None
+        """
+        with self._lock:
+            self._clients = max(self._clients - 1, 0)
+            if self._clients > 0:
+                return
+        self.invalidate()
+
+    def invalidate(self) -> None:
+        """
+        De-authenticate
+        :return: None
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            token, self._token, self._expires = self._token, None, 0
+            self._username = None
+            self._password = None
+        if token is None or token == self._borrowed:
+            return
+
+        de_auth_url = self._auth_url.replace('/token', '/invalidate-token')
+        self._logger.debug(f'De-authenticating to {de_auth_url}')
+        response = self._session.post(
+            de_auth_url,
+            headers={
+                'Authorization': f'Bearer {token}',
+                'Accept': '*/*'
+            },
+            timeout=self._timeout,
+            verify=self._verify
         )
-        adapter = HTTPAdapter(max_retries=retry_strategy, pool_connections=10, pool_maxsize=25)
-        self._session: requests.Session = requests.Session()
-        self._session.mount("https://", adapter)
+        if response.status_code != 204:
+            raise AuthenticationError(f'De-Authentication failed: {response.status_code} {response.text}')
+
+    def _refresh(self) -> None:
+        """
+        Renew the token, or get a new one, must be called holding the lock
+        :return: None
+        """
+        start = time.perf_counter()
+        response = None
+        if self._token is not None and self._token != self._borrowed and time.time() < self._expires:
+            auth_url = self._auth_url.replace('/token', '/keep-alive')
+            self._logger.debug(f'Authenticating to {auth_url}')
+            response = self._session.post(
+                auth_url,
+                headers={'Authorization': f'Bearer {self._token}', 'Accept': 'application/json'},
+                timeout=self._timeout,
+                verify=self._verify
+            )
+        if response is None or response.status_code != 200:
+            self._logger.debug(f'Authenticating to {self._auth_url}')
+            response = self._session.post(
+                self._auth_url,
+                auth=(self._username, self._password),
+                headers={'Accept': 'application/json'},
+                timeout=self._timeout,
+                verify=self._verify
+            )
+        if response.status_code != 200:
+            raise AuthenticationError(f'Authentication failed: {response.status_code} {response.text}')
+
+        data = response.json()
+        lifetime = token_lifetime(data, response.headers.get('Date'))
+        self._token = data.get('token')
+        self._expires = time.time() + lifetime
+        self._renew_at = self._expires - min(self._refresh_margin, lifetime / 2)
+        self.refresh_time += time.perf_counter() - start
+        self.refreshes += 1
+        self._schedule(self._renew_at - time.time())
+
+    def _schedule(self, delay: float) -> None:
+        """
+        Renew the token on a background thread
+        :param delay: Seconds to wait
+        :return: None
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(max(delay, 0), self._renew)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _renew(self) -> None:
+        """
+        Background renewal, a failure is left to the next request to retry
+        :return: None
+        """
+        try:
+            with self._lock:
+                if self._token is None or time.time() < self._renew_at:
+                    return
+                self._refresh()
+        except (AuthenticationError, requests.RequestException, ValueError) as err:
+            self._logger.debug(f'Background token renewal failed: {err}')
+        finally:
+            self._renewing = False
+
+
+class ResponseCache:
+    """
+    Cache of GET responses, with a ttl per tag and a size bound, the least recently used are evicted first
+    A write to a resource removes every cached response for that resource, its collection and items
+    Kept in memory, or in a sqlite file that can be shared between processes
+    """
+
+    def __init__(self, ttl: float = 60.0, tag_ttls: Optional[Dict[str, float]] = None, max_entries: int = 1024,
+                 path: Optional[str] = None) -> None:
+        """
+        Initialisation
+        :param ttl: Seconds a response is kept
+        :param tag_ttls: Seconds a response is kept by tag, ie. {'categories': 3600, 'buildings': 3600}
+        :param max_entries: Most responses kept
+        :param path: sqlite file to keep the responses in, otherwise they are kept in memory
+        """
+        self._ttl: float = ttl
+        self._tag_ttls: Dict[str, float] = {tag.replace('-', '_'): value for tag, value in (tag_ttls or {}).items()}
+        self._max_entries: int = max_entries
+        self.path: Optional[str] = path or None
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[str, Tuple[float, str, Tuple[bool, str, Any, int]]]' = OrderedDict()
+
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            self._db = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, resource TEXT, '
+                             'expires REAL, used REAL, success INTEGER, url TEXT, body BLOB, is_text INTEGER, '
+                             'http_code INTEGER)')
+            self._db.execute('CREATE INDEX IF NOT EXISTS responses_resource ON responses (resource)')
+            self._db.execute('CREATE INDEX IF NOT EXISTS responses_used ON responses (used)')
+
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def __reduce__(self) -> Tuple[Callable[..., 'ResponseCache'], Tuple[Any, ...]]:
+        """
+        Pickle the cache as its settings, a process unpickling it opens the same sqlite file or starts empty in memory
+        :return: Class and arguments to rebuild the cache
+        """
+        return ResponseCache, (self._ttl, self._tag_ttls, self._max_entries, self.path)
+
+    @staticmethod
+    def key(method: str, url: str, params: Optional[Dict[str, Any]] = None, accept: Optional[str] = None) -> str:
+        """
+        Key for a request
+        :param method: Method (GET, etc)
+        :param url: url
+        :param params: Query parameters
+        :param accept: Accept header, json and xml responses are kept apart
+        :return: Key
+        """
+        query = '&'.join(f'{name}={value}' for name, value in sorted((params or {}).items()) if value is not None)
+        return f'{method} {url}?{query} {accept}'
+
+    def ttl(self, tag: str) -> float:
+        """
+        Seconds a response is kept
+        :param tag: Endpoint tag
+        :return: Seconds
+        """
+        return self._tag_ttls.get(tag, self._ttl)
+
+    def get(self, key: str) -> Optional[APIResponse]:
+        """
+        Get a cached response
+        :param key: Key from key()
+        :return: Response, or None if not cached or expired
+        """
+        now = time.time()
+        with self._lock:
+            if self._db is not None:
+                row = self._db.execute('SELECT expires, success, url, body, is_text, http_code FROM responses '
+                                       'WHERE key = ?', (key,)).fetchone()
+                if row is not None and row[0] > now:
+                    self._db.execute('UPDATE responses SET used = ? WHERE key = ?', (now, key))
+                    expires, success, url, body, is_text, http_code = row
+                    value = (bool(success), url, body.decode() if is_text else body, http_code)
+                else:
+                    value = None
+            else:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] > now:
+                    self._entries.move_to_end(key)
+                    value = entry[2]
+                else:
+                    value = None
+
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+
+        success, url, body, http_code = value
+        return APIResponse(success, url, body, http_code, cached=True)
+
+    def set(self, key: str, tag: str, resource: str, response: APIResponse) -> None:
+        """
+        Cache a response
+        :param key: Key from key()
+        :param tag: Endpoint tag, for its ttl
+        :param resource: Resource the response belongs to, for invalidation
+        :param response: Response
+        :return: None
+        """
+        now = time.time()
+        expires = now + self.ttl(tag)
+        with self._lock:
+            if self._db is not None:
+                is_text = isinstance(response.data, str)
+                body = response.data.encode() if is_text else response.data
+                self._db.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                 (key, resource, expires, now, int(response.success), response.url, body,
+                                  int(is_text), response.http_code))
+                count = self._db.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+                if count > self._max_entries:
+                    self._db.execute('DELETE FROM responses WHERE key IN '
+                                     '(SELECT key FROM responses ORDER BY used LIMIT ?)', (count - self._max_entries,))
+            else:
+                self._entries[key] = (expires, resource, (response.success, response.url, response.data,
+                                                          response.http_code))
+                self._entries.move_to_end(key)
+                while len(self._entries) > self._max_entries:
+                    self._entries.popitem(last=False)
+
+    def invalidate(self, resource: Optional[str] = None) -> None:
+        """
+        Remove cached responses
+        :param resource: Resource to remove, ie. scripts, otherwise everything
+        :return: None
+        """
+        with self._lock:
+            if self._db is not None:
+                if resource is None:
+                    self._db.execute('DELETE FROM responses')
+                else:
+                    self._db.execute('DELETE FROM responses WHERE resource = ?', (resource,))
+            elif resource is None:
+                self._entries.clear()
+            else:
+                for key in [key for key, entry in self._entries.items() if entry[1] == resource]:
+                    del self._entries[key]
+
+    def close(self) -> None:
+        """
+        Close the sqlite file
+        :return: None
+        """
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+def retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Seconds to wait from a Retry-After header
+    :param value: Header value, seconds or a http date
+    :return: Seconds, None if missing or unreadable
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimiter:
+    """
+    Client side limit on the requests to a server, shared by every thread and client it is given to
+    Requests per second are limited by a token bucket and requests in flight by a limit that is halved when the server
+    throttles (429/503) and grows by one for each round of successful requests (AIMD)
+    A Retry-After holds back every request until it has passed
+    """
+    THROTTLED = (429, 503)
+
+    def __init__(self, rate: Optional[float] = None, burst: Optional[int] = None, concurrency: int = 8,
+                 min_concurrency: int = 1, max_concurrency: int = 64, decrease: float = 0.5,
+                 backoff: float = 1.0) -> None:
+        """
+        Initialisation
+        :param rate: Most requests per second, None for no limit
+        :param burst: Requests that can be sent at once after being idle, defaults to one second of the rate
+        :param concurrency: Requests in flight to start with
+        :param min_concurrency: Fewest requests in flight when throttled
+        :param max_concurrency: Most requests in flight after sustained success
+        :param decrease: Factor the requests in flight are reduced by when throttled
+        :param backoff: Seconds to hold back when throttled without a Retry-After, doubled for each throttle in a row
+        """
+        self._rate: Optional[float] = rate
+        self._burst: float = float(burst or max(1, int(rate or 1)))
+        self._tokens: float = self._burst
+        self._refilled: float = time.monotonic()
+
+        self._limit: float = float(concurrency)
+        self._min_concurrency: int = min_concurrency
+        self._max_concurrency: int = max_concurrency
+        self._decrease: float = decrease
+        self._backoff: float = backoff
+        self._in_flight: int = 0
+        self._paused_until: float = 0.0
+        self._decreased: float = 0.0
+        self._throttled_in_row: int = 0
+        self._condition = threading.Condition()
+
+        self.throttled: int = 0
+        self.waited: float = 0.0
+
+    @property
+    def concurrency(self) -> int:
+        """
+        Requests allowed in flight
+        :return: Requests
+        """
+        return max(self._min_concurrency, int(self._limit))
+
+    @property
+    def in_flight(self) -> int:
+        """
+        Requests in flight
+        :return: Requests
+        """
+        return self._in_flight
+
+    def acquire(self) -> float:
+        """
+        Wait for a turn to send a request, every acquire must be followed by a release
+        :return: Seconds waited
+        """
+        start = time.monotonic()
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    self._condition.wait(self._paused_until - now)
+                    continue
+                if self._in_flight >= self.concurrency:
+                    self._condition.wait()
+                    continue
+                if self._rate:
+                    self._tokens = min(self._burst, self._tokens + (now - self._refilled) * self._rate)
+                    self._refilled = now
+                    if self._tokens < 1:
+                        self._condition.wait((1 - self._tokens) / self._rate)
+                        continue
+                    self._tokens -= 1
+                self._in_flight += 1
+                waited = time.monotonic() - start
+                self.waited += waited
+                return waited
+
+    def release(self, status: Optional[int] = None, delay: Optional[float] = None) -> Optional[float]:
+        """
+        Finish a request, adjusting the limit from its status
+        :param status: HTTP status, None if the request failed without a response
+        :param delay: Seconds from the Retry-After of the response
+        :return: Seconds requests are held back for when throttled, otherwise None
+        """
+        with self._condition:
+            self._in_flight -= 1
+            now = time.monotonic()
+            pause = None
+            if status in self.THROTTLED:
+                self.throttled += 1
+                # Responses to requests sent before the last decrease were already accounted for
+                if now - self._decreased > self._backoff:
+                    self._limit = max(float(self._min_concurrency), self._limit * self._decrease)
+                    self._decreased = now
+                self._throttled_in_row += 1
+                pause = delay if delay is not None else self._backoff * 2 ** (self._throttled_in_row - 1)
+                self._paused_until = max(self._paused_until, now + pause)
+            elif status is not None and status < 500:
+                self._throttled_in_row = 0
+                self._limit = min(float(self._max_concurrency), self._limit + 1 / self._limit)
+            self._condition.notify_all()
+            return pause
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Current state of the limiter
+        :return: Dictionary of concurrency, in_flight, throttled and waited (seconds)
+        """
+        return {
+            'concurrency': self.concurrency,
+            'in_flight': self._in_flight,
+            'throttled': self.throttled,
+            'waited': self.waited,
+        }
+
+
+class Hedger:
+    """
+    Hedged GETs, a second copy of a request is sent once it has taken longer than most requests to the same endpoint
+    and whichever answers first is used, the other is closed when it finishes
+    The delay is a percentile of the recent latencies of the endpoint, no copies are sent until enough are known
+    """
+
+    def __init__(self, percentile: float = 95.0, min_delay: float = 0.05, max_delay: float = 30.0,
+                 samples: int = 200, min_samples: int = 20, max_workers: int = 64) -> None:
+        """
+        Initialisation
+        :param percentile: Percentile of the latencies to wait for before sending a copy
+        :param min_delay: Fewest seconds to wait
+        :param max_delay: Most seconds to wait
+        :param samples: Latencies kept per endpoint
+        :param min_samples: Latencies needed before an endpoint is hedged
+        :param max_workers: Threads sending requests and their copies
+        """
+        self._percentile: float = percentile
+        self._min_delay: float = min_delay
+        self._max_delay: float = max_delay
+        self._samples: int = samples
+        self._min_samples: int = min_samples
+        self._latencies: Dict[str, deque] = {}
+        self._delays: Dict[str, Optional[float]] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='jamf-hedge')
+
+        self.requests: Counter = Counter()
+        self.hedged: Counter = Counter()
+        self.won: Counter = Counter()
+
+    def delay(self, name: str) -> Optional[float]:
+        """
+        Seconds to wait before sending a copy of a request
+        :param name: Endpoint name
+        :return: Seconds, None if too few latencies are known
+        """
+        return self._delays.get(name)
+
+    def observe(self, name: str, seconds: float) -> None:
+        """
+        Add the latency of a request
+        :param name: Endpoint name
+        :param seconds: Seconds
+        :return: None
+        """
+        with self._lock:
+            latencies = self._latencies.get(name)
+            if latencies is None:
+                latencies = self._latencies[name] = deque(maxlen=self._samples)
+            latencies.append(seconds)
+            if len(latencies) >= self._min_samples:
+                ordered = sorted(latencies)
+                value = ordered[min(len(ordered) - 1, int(len(ordered) * self._percentile / 100))]
+                self._delays[name] = min(self._max_delay, max(self._min_delay, value))
+
+    def send(self, name: str, send: Callable[[], requests.Response]) -> requests.Response:
+        """
+        Send a request, hedged once the endpoint has enough latencies
+        :param name: Endpoint name
+        :param send: Function sending the request, called again for the copy
+        :return: The first response
+        """
+        def timed() -> requests.Response:
+            start = time.perf_counter()
+            response = send()
+            self.observe(name, time.perf_counter() - start)
+            return response
+
+        self.requests[name] += 1
+        delay = self._delays.get(name)
+        if delay is None:
+            return timed()
+
+        primary = self._executor.submit(timed)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+
+        self.hedged[name] += 1
+        futures = [primary, self._executor.submit(timed)]
+        pending = set(futures)
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in futures:
+                if future not in done:
+                    continue
+                if future.exception() is not None:
+                    error = error or future.exception()
+                    continue
+                if future is futures[1]:
+                    self.won[name] += 1
+                for other in pending:
+                    other.add_done_callback(self._close)
+                return future.result()
+        raise error
+
+    @staticmethod
+    def _close(future: Future) -> None:
+        """
+        Close the response of the request that lost
+        :param future: Request
+        :return: None
+        """
+        if future.exception() is None:
+            future.result().close()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Requests, copies sent and copies that answered first by endpoint, with the current delay
+        :return: Endpoint name: stats
+        """
+        return {name: {'requests': self.requests[name], 'hedged': self.hedged[name], 'won': self.won[name],
+                       'delay': self._delays.get(name)} for name in self.requests}
+
+
+class CircuitBreaker:
+    """
+    Fails the calls to an endpoint fast while it keeps failing
+    After a number of failures in a row the circuit of the endpoint opens and calls raise CircuitOpenError, once the
+    reset timeout has passed one call is let through to test it, closing the circuit if it succeeds
+    Errors without a response (timeouts, connection errors) and server errors are failures, throttling is left to the
+    rate limiter
+    """
+    FAILURES = (500, 502, 503, 504)
+
+    def __init__(self, failures: int = 5, reset_timeout: float = 30.0,
+                 statuses: Collection[int] = FAILURES) -> None:
+        """
+        Initialisation
+        :param failures: Failures in a row that open a circuit
+        :param reset_timeout: Seconds a circuit is open before a call is let through
+        :param statuses: HTTP statuses that are failures
+        """
+        self._failures: int = failures
+        self._reset_timeout: float = reset_timeout
+        self._statuses: FrozenSet[int] = frozenset(statuses)
+        self._lock = threading.Lock()
+        # Endpoint name: [failures in a row, opened at (0 when closed), testing, times opened, calls rejected]
+        self._circuits: Dict[str, list] = {}
+
+    def before(self, name: str) -> None:
+        """
+        Check a call can be made
+        :param name: Endpoint name
+        :return: None
+        """
+        circuit = self._circuits.get(name)
+        if circuit is None or not circuit[1]:
+            return
+        with self._lock:
+            if circuit[1] and (circuit[2] or time.monotonic() - circuit[1] < self._reset_timeout):
+                circuit[4] += 1
+                raise CircuitOpenError(f'{name} is failing, {circuit[0]} failures in a row, calls are stopped for '
+                                       f'{max(0.0, self._reset_timeout - (time.monotonic() - circuit[1])):.1f}s')
+            circuit[2] = True
+
+    def record(self, name: str, status: Optional[int]) -> None:
+        """
+        Add the result of a call
+        :param name: Endpoint name
+        :param status: HTTP status, None if it failed without a response
+        :return: None
+        """
+        failed = status is None or status in self._statuses
+        circuit = self._circuits.get(name)
+        if circuit is None:
+            if not failed:
+                return
+            with self._lock:
+                circuit = self._circuits.setdefault(name, [0, 0.0, False, 0, 0])
+        with self._lock:
+            circuit[2] = False
+            if not failed:
+                circuit[0] = 0
+                circuit[1] = 0.0
+                return
+            circuit[0] += 1
+            if circuit[1] or circuit[0] >= self._failures:
+                if not circuit[1]:
+                    circuit[3] += 1
+                circuit[1] = time.monotonic()
+
+    def release(self, name: str) -> None:
+        """
+        Let another call through to test an endpoint, when the call let through was never sent (ie. it failed to
+        authenticate or was cancelled), a result is not recorded
+        :param name: Endpoint name
+        :return: None
+        """
+        circuit = self._circuits.get(name)
+        if circuit is None:
+            return
+        with self._lock:
+            circuit[2] = False
+
+    def state(self, name: str) -> str:
+        """
+        State of the circuit of an endpoint
+        :param name: Endpoint name
+        :return: closed, open or half_open (letting a call through)
+        """
+        circuit = self._circuits.get(name)
+        if circuit is None or not circuit[1]:
+            return 'closed'
+        if circuit[2] or time.monotonic() - circuit[1] >= self._reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def reset(self, name: Optional[str] = None) -> None:
+        """
+        Close circuits
+        :param name: Endpoint name, None for all
+        :return: None
+        """
+        with self._lock:
+            if name is None:
+                self._circuits.clear()
+            else:
+                self._circuits.pop(name, None)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        State, failures in a row, times opened and calls rejected by endpoint
+        :return: Endpoint name: stats
+        """
+        return {name: {'state': self.state(name), 'failures': circuit[0], 'opened': circuit[3],
+                       'rejected': circuit[4]} for name, circuit in self._circuits.items()}
+
+
+# Upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Metrics:
+    """
+    Counts, latency histograms, response sizes, retries and status codes of the requests, by endpoint
+    Can be shared by clients, every request recorded is one that was sent or served from the cache
+    """
+
+    def __init__(self, buckets: Iterable[float] = LATENCY_BUCKETS) -> None:
+        """
+        Initialisation
+        :param buckets: Upper bounds in seconds of the latency histogram buckets
+        """
+        self._buckets: Tuple[float, ...] = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._endpoints: Dict[str, Dict[str, Any]] = {}
+
+    def _endpoint(self, name: str, tag: str) -> Dict[str, Any]:
+        """
+        Get the counters of an endpoint, call with the lock held
+        :param name: Method name
+        :param tag: Endpoint tag
+        :return: Counters
+        """
+        endpoint = self._endpoints.get(name)
+        if endpoint is None:
+            endpoint = self._endpoints[name] = {
+                'tag': tag,
+                'requests': 0,
+                'errors': 0,
+                'cached': 0,
+                'coalesced': 0,
+                'retries': 0,
+                'status_codes': Counter(),
+                'seconds': 0.0,
+                'seconds_max': 0.0,
+                'buckets': [0] * (len(self._buckets) + 1),
+                'bytes': 0,
+                'bytes_max': 0,
+            }
+        return endpoint
+
+    def record(self, name: str, tag: str, seconds: float, status: Optional[int], size: int = 0,
+               retries: int = 0) -> None:
+        """
+        Record a request sent to the server
+        :param name: Method name
+        :param tag: Endpoint tag
+        :param seconds: Time taken
+        :param status: HTTP status, None if it failed without a response
+        :param size: Bytes in the response body
+        :param retries: Times the request was retried
+        :return: None
+        """
+        index = len(self._buckets)
+        for position, bound in enumerate(self._buckets):
+            if seconds <= bound:
+                index = position
+                break
+
+        with self._lock:
+            endpoint = self._endpoint(name, tag)
+            endpoint['requests'] += 1
+            if status is None or not 200 <= status < 400:
+                endpoint['errors'] += 1
+            endpoint['retries'] += retries
+            endpoint['status_codes'][status or 0] += 1
+            endpoint['seconds'] += seconds
+            endpoint['seconds_max'] = max(endpoint['seconds_max'], seconds)
+            endpoint['buckets'][index] += 1
+            endpoint['bytes'] += size
+            endpoint['bytes_max'] = max(endpoint['bytes_max'], size)
+
+    def record_cached(self, name: str, tag: str) -> None:
+        """
+        Record a request served from the cache
+        :param name: Method name
+        :param tag: Endpoint tag
+        :return: None
+        """
+        with self._lock:
+            self._endpoint(name, tag)['cached'] += 1
+
+    def record_coalesced(self, name: str, tag: str) -> None:
+        """
+        Record a request answered by the response of an identical request already in flight
+        :param name: Method name
+        :param tag: Endpoint tag
+        :return: None
+        """
+        with self._lock:
+            self._endpoint(name, tag)['coalesced'] += 1
+
+    def reset(self) -> None:
+        """
+        Clear the counters
+        :return: None
+        """
+        with self._lock:
+            self._endpoints.clear()
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Copy of the counters by method name
+        Latency buckets are cumulative, as in prometheus, keyed by their upper bound
+        :return: {name: {tag, requests, errors, cached, coalesced, retries, status_codes, latency, bytes}}
+        """
+        with self._lock:
+            endpoints = {name: dict(endpoint, status_codes=dict(endpoint['status_codes']),
+                                    buckets=list(endpoint['buckets']))
+                         for name, endpoint in self._endpoints.items()}
+
+        snapshot = {}
+        for name, endpoint in endpoints.items():
+            cumulative, buckets = 0, {}
+            for bound, count in zip(self._buckets + (float('inf'),), endpoint['buckets']):
+                cumulative += count
+                buckets[bound] = cumulative
+            requests = endpoint['requests']
+            snapshot[name] = {
+                'tag': endpoint['tag'],
+                'requests': requests,
+                'errors': endpoint['errors'],
+                'cached': endpoint['cached'],
+                'coalesced': endpoint['coalesced'],
+                'retries': endpoint['retries'],
+                'status_codes': endpoint['status_codes'],
+                'latency': {
+                    'sum': endpoint['seconds'],
+                    'mean': endpoint['seconds'] / requests if requests else 0.0,
+                    'max': endpoint['seconds_max'],
+                    'buckets': buckets,
+                },
+                'bytes': {
+                    'sum': endpoint['bytes'],
+                    'mean': endpoint['bytes'] / requests if requests else 0.0,
+                    'max': endpoint['bytes_max'],
+                },
+            }
+        return snapshot
+
+    def prometheus(self, token_manager: Optional['TokenManager'] = None, prefix: str = 'jamf') -> str:
+        """
+        Counters in the prometheus text format
+        :param token_manager: Token manager to include the auth refreshes of
+        :param prefix: Prefix of the metric names
+        :return: Text
+        """
+        def labels(**values: Any) -> str:
+            escaped = {key: str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+                       for key, value in values.items()}
+            return '{' + ','.join(f'{key}="{value}"' for key, value in escaped.items()) + '}'
+
+        snapshot = self.snapshot()
+        lines = [
+            f'# HELP {prefix}_requests_total Requests sent, by endpoint and status code',
+            f'# TYPE {prefix}_requests_total counter',
+        ]
+        for name, endpoint in snapshot.items():
+            for code, count in sorted(endpoint['status_codes'].items()):
+                lines.append(f'{prefix}_requests_total{labels(endpoint=name, tag=endpoint["tag"], code=code)} {count}')
+
+        lines += [
+            f'# HELP {prefix}_request_duration_seconds Request latency, by endpoint',
+            f'# TYPE {prefix}_request_duration_seconds histogram',
+        ]
+        for name, endpoint in snapshot.items():
+            for bound, count in endpoint['latency']['buckets'].items():
+                bound = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{prefix}_request_duration_seconds_bucket'
+                             f'{labels(endpoint=name, tag=endpoint["tag"], le=bound)} {count}')
+            lines.append(f'{prefix}_request_duration_seconds_sum'
+                         f'{labels(endpoint=name, tag=endpoint["tag"])} {endpoint["latency"]["sum"]}')
+            lines.append(f'{prefix}_request_duration_seconds_count'
+                         f'{labels(endpoint=name, tag=endpoint["tag"])} {endpoint["requests"]}')
+
+        for metric, key, help_text in (('response_bytes_total', ('bytes', 'sum'), 'Response body bytes'),
+                                       ('retries_total', ('retries',), 'Requests retried'),
+                                       ('cache_hits_total', ('cached',), 'Requests served from the cache'),
+                                       ('coalesced_total', ('coalesced',),
+                                        'Requests answered by an identical request in flight')):
+            lines += [
+                f'# HELP {prefix}_{metric} {help_text}, by endpoint',
+                f'# TYPE {prefix}_{metric} counter',
+            ]
+            for name, endpoint in snapshot.items():
+                value = endpoint[key[0]] if len(key) == 1 else endpoint[key[0]][key[1]]
+                lines.append(f'{prefix}_{metric}{labels(endpoint=name, tag=endpoint["tag"])} {value}')
+
+        if token_manager is not None:
+            lines += [
+                f'# HELP {prefix}_auth_refreshes_total Tokens fetched',
+                f'# TYPE {prefix}_auth_refreshes_total counter',
+                f'{prefix}_auth_refreshes_total {token_manager.refreshes}',
+                f'# HELP {prefix}_auth_refresh_seconds_total Time spent fetching tokens',
+                f'# TYPE {prefix}_auth_refresh_seconds_total counter',
+                f'{prefix}_auth_refresh_seconds_total {token_manager.refresh_time}',
+            ]
+        return '\n'.join(lines) + '\n'
+
+
+# Seconds spent opening connections (and the TLS handshake) by the current thread
+_connect_time = threading.local()
+
+
+class _TimedHTTPConnection(urllib3.connection.HTTPConnection):
+    """
+    Connection that adds the time taken to connect to _connect_time
+    """
+
+    def connect(self) -> None:
+        start = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _connect_time.value = getattr(_connect_time, 'value', 0.0) + time.perf_counter() - start
+
+
+class _TimedHTTPSConnection(urllib3.connection.HTTPSConnection):
+    """
+    Connection that adds the time taken to connect and complete the TLS handshake to _connect_time
+    """
+
+    def connect(self) -> None:
+        start = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _connect_time.value = getattr(_connect_time, 'value', 0.0) + time.perf_counter() - start
+
+
+class _TimedHTTPConnectionPool(urllib3.HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(urllib3.HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimedAdapter(HTTPAdapter):
+    """
+    Adapter whose connections record the time taken to connect
+    """
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {'http': _TimedHTTPConnectionPool,
+                                                   'https': _TimedHTTPSConnectionPool}
+
+
+class Cassette:
+    """
+    Requests and responses recorded to a file, so a run can be replayed later without a server
+    The swagger docs and the auth exchanges are recorded with the rest, tokens are redacted and no request headers
+    are kept, but the responses are, so treat a cassette like the data it holds
+    """
+    MODES = ('record', 'replay')
+
+    def __init__(self, path: str, mode: str = 'replay', keep_timing: bool = False) -> None:
+        """
+        Initialisation
+        :param path: Cassette file, gzipped json
+        :param mode: record to send requests and record them, replay to answer them from the file
+        :param keep_timing: When replaying, take as long as the recorded response took
+        """
+        if mode not in self.MODES:
+            raise ValueError(f'mode must be one of {", ".join(self.MODES)}')
+        self._path: str = path
+        self._mode: str = mode
+        self._keep_timing: bool = keep_timing
+        self._lock = threading.Lock()
+        self._interactions: list = []
+        self._queues: Dict[str, list] = {}
+        # Interactions in the file, so a save with nothing new (ie. logout again from __del__) does not write it
+        self._saved: int = -1
+
+        if mode == 'replay':
+            with gzip.open(path, 'rt', encoding='utf-8') as file:
+                data = json.load(file)
+            if data.get('version') != 1:
+                raise CassetteError(f'Unknown cassette version {data.get("version")} in {path}')
+            self._interactions = data['interactions']
+            for interaction in self._interactions:
+                self._queues.setdefault(interaction['key'], []).append(interaction)
+
+    @property
+    def recording(self) -> bool:
+        """
+        Get if requests are being recorded
+        :return: Recording
+        """
+        return self._mode == 'record'
+
+    @staticmethod
+    def key(request: requests.PreparedRequest) -> str:
+        """
+        Key a request is matched on, its method, url, the headers that change the response and a hash of its body
+        :param request: Request
+        :return: Key
+        """
+        body = request.body
+        if isinstance(body, str):
+            body = body.encode()
+        digest = hashlib.sha1(body).hexdigest() if isinstance(body, bytes) else ''
+        return (f'{request.method} {request.url} {request.headers.get("Accept", "")} '
+                f'{request.headers.get("If-None-Match", "")} {digest}')
+
+    def record(self, request: requests.PreparedRequest, status: int, reason: str, headers: Dict[str, str],
+               body: bytes, elapsed: float, total: float) -> Dict[str, Any]:
+        """
+        Record a response
+        :param request: Request
+        :param status: HTTP status
+        :param reason: HTTP reason
+        :param headers: Response headers
+        :param body: Response body, decoded
+        :param elapsed: Seconds until the headers were read
+        :param total: Seconds until the body was read
+        :return: Interaction
+        """
+        if '/auth/' in (request.url or '') and body[:1] == b'{':
+            try:
+                data = json.loads(body)
+                if isinstance(data, dict) and 'token' in data:
+                    body = json.dumps({**data, 'token': 'redacted'}).encode()
+            except ValueError:
+                pass
+
+        headers = {name: value for name, value in headers.items()
+                   if name.lower() not in ('content-encoding', 'transfer-encoding', 'content-length')}
+        try:
+            encoded, encoding = body.decode('utf-8'), 'utf-8'
+        except UnicodeDecodeError:
+            encoded, encoding = base64.b64encode(body).decode(), 'base64'
+        interaction = {
+            'key': self.key(request),
+            'status': status,
+            'reason': reason,
+            'headers': headers,
+            'body': encoded,
+            'encoding': encoding,
+            'elapsed': elapsed,
+            'total': total,
+        }
+        with self._lock:
+            self._interactions.append(interaction)
+        return interaction
+
+    def play(self, request: requests.PreparedRequest) -> Dict[str, Any]:
+        """
+        Find the recorded response to a request, repeated requests get the responses in the order they were recorded
+        and the last one once they run out
+        :param request: Request
+        :return: Interaction
+        """
+        key = self.key(request)
+        with self._lock:
+            queue = self._queues.get(key)
+            if not queue:
+                raise CassetteError(f'No recorded response for {request.method} {request.url}')
+            interaction = queue.pop(0) if len(queue) > 1 else queue[0]
+        if self._keep_timing:
+            time.sleep(interaction['total'])
+        return interaction
+
+    @staticmethod
+    def body(interaction: Dict[str, Any]) -> bytes:
+        """
+        Get the body of an interaction
+        :param interaction: Interaction
+        :return: Body
+        """
+        if interaction['encoding'] == 'base64':
+            return base64.b64decode(interaction['body'])
+        return interaction['body'].encode('utf-8')
+
+    def save(self) -> None:
+        """
+        Write the recorded requests to the file
+        :return: None
+        """
+        if not self.recording:
+            return
+        with self._lock:
+            if len(self._interactions) == self._saved:
+                return
+            data = {'version': 1, 'interactions': list(self._interactions)}
+        temporary = f'{self._path}.{os.getpid()}.tmp'
+        with gzip.open(temporary, 'wt', encoding='utf-8') as file:
+            json.dump(data, file, separators=(',', ':'))
+        os.replace(temporary, self._path)
+        self._saved = len(data['interactions'])
+
+    def __enter__(self) -> 'Cassette':
+        return self
+
+    def __exit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
+        self.save()
+
+
+class _CassetteAdapter(HTTPAdapter):
+    """
+    Adapter that records the responses of another adapter to a cassette, or replays them without sending anything
+    """
+
+    def __init__(self, cassette: Cassette, adapter: HTTPAdapter) -> None:
+        super().__init__()
+        self._cassette = cassette
+        self._adapter = adapter
+
+    def send(self, request: requests.PreparedRequest, stream: bool = False, timeout: Any = None,
+             verify: Union[bool, str] = True, cert: Any = None, proxies: Any = None) -> requests.Response:
+        retries = None
+        if self._cassette.recording:
+            start = time.perf_counter()
+            response = self._adapter.send(request, stream=stream, timeout=timeout, verify=verify, cert=cert,
+                                          proxies=proxies)
+            body = response.content
+            retries = getattr(response.raw, 'retries', None)
+            interaction = self._cassette.record(request, response.status_code, response.reason or '',
+                                                dict(response.headers), body, response.elapsed.total_seconds()
+                                                if response.elapsed else 0.0, time.perf_counter() - start)
+            response.close()
+        else:
+            interaction = self._cassette.play(request)
+            body = Cassette.body(interaction)
+
+        # Responses are rebuilt from the recording, so a stream can still be read after it was recorded
+        raw = urllib3.HTTPResponse(body=io.BytesIO(body), headers=interaction['headers'],
+                                   status=interaction['status'], reason=interaction['reason'],
+                                   preload_content=False, decode_content=False, retries=retries)
+        return self.build_response(request, raw)
+
+    def close(self) -> None:
+        self._adapter.close()
+
+
+class Multipart:
+    """
+    A multipart/form-data body read from disk as it is sent, so memory use does not grow with the size of the files
+    Its length is known up front, so it is sent with a Content-Length rather than chunked
+    """
+
+    def __init__(self, files: Dict[str, Any], fields: Optional[Dict[str, Any]] = None,
+                 progress: Optional[Callable[[int, int], None]] = None, chunk_size: int = 1 << 16) -> None:
+        """
+        Initialisation
+        :param files: Files by field name, a path, a file object or (filename, file object or path[, content type])
+        :param fields: Form fields by name
+        :param progress: Called with (bytes sent, total bytes) as the body is read
+        :param chunk_size: Bytes read at a time when iterated
+        """
+        self.boundary: str = os.urandom(16).hex()
+        self.content_type: str = f'multipart/form-data; boundary={self.boundary}'
+        self._progress = progress
+        self._chunk_size: int = chunk_size
+        self._opened: list = []
+        # Each segment is bytes or (file object, start, length)
+        self._segments: list = []
+
+        for name, value in (fields or {}).items():
+            self._segments.append(f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'
+                                  f'{value}\r\n'.encode())
+        for name, value in files.items():
+            filename, file, content_type = (value + (None,))[:3] if isinstance(value, tuple) else (None, value, None)
+            if isinstance(file, (str, os.PathLike)):
+                filename = filename or os.path.basename(file)
+                file = open(file, 'rb')
+                self._opened.append(file)
+            filename = filename or os.path.basename(getattr(file, 'name', name))
+            start = file.tell()
+            length = file.seek(0, os.SEEK_END) - start
+            file.seek(start)
+            self._segments.append(f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"; '
+                                  f'filename="{filename}"\r\nContent-Type: '
+                                  f'{content_type or "application/octet-stream"}\r\n\r\n'.encode())
+            self._segments.append((file, start, length))
+            self._segments.append(b'\r\n')
+        self._segments.append(f'--{self.boundary}--\r\n'.encode())
+
+        self.len: int = sum(len(segment) if isinstance(segment, bytes) else segment[2] for segment in self._segments)
+        self._position: int = 0
+
+    def __len__(self) -> int:
+        return self.len
+
+    def read(self, size: int = -1) -> bytes:
+        """
+        Read the next part of the body
+        :param size: Most bytes to read, all if negative
+        :return: Bytes, empty at the end
+        """
+        remaining = self.len - self._position if size is None or size < 0 else min(size, self.len - self._position)
+        chunks = []
+        offset = 0
+        for segment in self._segments:
+            length = len(segment) if isinstance(segment, bytes) else segment[2]
+            if remaining <= 0:
+                break
+            if self._position < offset + length:
+                within = self._position - offset
+                count = min(length - within, remaining)
+                if isinstance(segment, bytes):
+                    chunk = segment[within:within + count]
+                else:
+                    file, start, _ = segment
+                    file.seek(start + within)
+                    chunk = file.read(count)
+                chunks.append(chunk)
+                self._position += len(chunk)
+                remaining -= len(chunk)
+            offset += length
+
+        if self._progress is not None and chunks:
+            self._progress(self._position, self.len)
+        return b''.join(chunks)
+
+    def __iter__(self) -> Iterator[bytes]:
+        while True:
+            chunk = self.read(self._chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        """
+        Move to a position in the body, so it can be sent again on a retry
+        :param offset: Offset
+        :param whence: os.SEEK_SET, os.SEEK_CUR or os.SEEK_END
+        :return: Position
+        """
+        base = {os.SEEK_SET: 0, os.SEEK_CUR: self._position, os.SEEK_END: self.len}[whence]
+        self._position = max(0, min(self.len, base + offset))
+        return self._position
+
+    def close(self) -> None:
+        """
+        Close the files opened from paths
+        :return: None
+        """
+        for file in self._opened:
+            file.close()
+        self._opened = []
+
+
+# Keywords of the api methods that are not query parameters
+BODY_KWARGS: FrozenSet[str] = frozenset(('data', 'files', 'download', 'progress'))
+
+
+class Endpoint:
+    """
+    An endpoint of the swagger docs, compiled once so a call only has to fill in the url and send it
+    """
+    __slots__ = ('name', 'tag', 'path', 'method', 'url', 'keys', 'query', 'resource', 'details', 'deprecated',
+                 'warned')
+
+    def __init__(self, name: str, path: str, method: str, url: str, details: Dict[str, Any],
+                 parameters: Iterable[Dict[str, Any]] = ()) -> None:
+        """
+        Initialisation
+        :param name: Method name
+        :param path: Path to the api endpoint
+        :param method: Method (get, etc)
+        :param url: Full url of the path, with its {parameters}
+        :param details: All details of the end point
+        :param parameters: Parameters of the endpoint, with references resolved, None if they could not be
+        """
+        self.name: str = name
+        self.tag: str = details.get('tags', ['jamf'])[0].replace('-', '_')
+        self.path: str = path
+        self.method: str = method.upper()
+        self.url: str = url
+        self.keys: FrozenSet[str] = frozenset(re.findall(r'{([A-z]+)}', path))
+        # Query parameters accepted, None when the docs do not say
+        self.query: Optional[FrozenSet[str]] = None
+        if parameters is not None:
+            self.query = frozenset(parameter['name'] for parameter in parameters
+                                   if parameter.get('in') == 'query' and 'name' in parameter)
+        self.resource: str = Jamf._resource(path)
+        self.details: Dict[str, Any] = details
+        self.deprecated: bool = bool(details.get('deprecated', False))
+        self.warned: bool = False
+
+    def format_url(self, kwargs: Dict[str, Any]) -> str:
+        """
+        Fill in the path parameters
+        :param kwargs: Arguments passed to the api method
+        :return: url
+        """
+        if not self.keys:
+            return self.url
+        try:
+            return self.url.format_map(kwargs)
+        except KeyError as err:
+            raise ValueError(f'Missing parameter for URL: {err}')
+
+    def check_params(self, params: Collection[str]) -> None:
+        """
+        Check that the query parameters are ones the endpoint accepts
+        :param params: Names of the query parameters
+        :return: None
+        """
+        if self.query is None:
+            return
+        unknown = [param for param in params if param not in self.query]
+        if unknown:
+            accepted = ', '.join(sorted(self.query)) or 'none'
+            raise ValueError(f'Unknown parameter for {self.name}: {", ".join(unknown)} (accepts {accepted})')
+
+    def __repr__(self) -> str:
+        return f'<Endpoint({self.name}: {self.method} {self.path})>'
+
+
+# Options holding state of one process, a client rebuilt from its config gets new ones
+PROCESS_LOCAL = ('cache', 'rate_limiter', 'metrics', 'hedge', 'circuit_breaker')
+# Clients of this process, given their own session and a borrowed token in the child after a fork
+_CLIENTS: 'weakref.WeakSet[Jamf]' = weakref.WeakSet()
+# The client of a process_map worker
+_WORKER_CLIENT: Optional['Jamf'] = None
+
+
+def _after_fork() -> None:
+    """
+    Make the clients inherited by a forked child safe to use
+    :return: None
+    """
+    for client in list(_CLIENTS):
+        client._after_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork)
+
+
+def _init_worker(config: Dict[str, Any]) -> None:
+    """
+    Create the client of a process_map worker
+    :param config: Client config
+    :return: None
+    """
+    global _WORKER_CLIENT
+    _WORKER_CLIENT = Jamf.from_config(config)
+
+
+def _run_in_worker(function: Union[str, Callable[..., Any]], item: Any) -> Any:
+    """
+    Run one item of a process_map in a worker
+    :param function: The api method name, or a function called with the client and the item
+    :param item: Item
+    :return: Result
+    """
+    if isinstance(function, str):
+        response = getattr(_WORKER_CLIENT, function)(**item)
+        _ = response.json
+        return item, response
+    return function(_WORKER_CLIENT, item)
+
+
+class Jamf:
+    """
+    Parent class for shared Jamf API logic.
+    """
+
+    def __init__(self, api_url: str, username: str, password: str,
+                 timeout: float = 240.0, verify: bool = True,
+                 disable_warnings: bool = False, return_format: str = 'json',
+                 **kwargs: Any) -> None:
+        """
+        Shared initialization logic for Jamf classes.
+        """
+        self._logger = logging.getLogger(__name__)
+
+        self._api_url: str = self._format_api_url(api_url)
+        self._username: str = username
+        self._password: str = password
+        self._token_manager: Optional[TokenManager] = kwargs.get('token_manager')
+        if self._token_manager is not None:
+            self._token_manager.attach()
+
+        self._timeout: float = timeout
+        self._verify: bool = verify
+        self._disable_warnings: bool = disable_warnings
+        self._return_format: str = return_format
+        self._hide_deprecated: bool = kwargs.get('hide_deprecated', False)
+        # A cassette holds the swagger docs of the run, so the spec cache is not used unless asked for
+        self._cassette: Optional[Cassette] = kwargs.get('cassette')
+        self._spec_cache_dir: Optional[str] = kwargs.get('spec_cache_dir',
+                                                         SPEC_CACHE_DIR if self._cassette is None else None)
+        self._spec_cache_ttl: float = kwargs.get('spec_cache_ttl', 24 * 60 * 60)
+        self._refresh_spec: bool = kwargs.get('refresh_spec', self._cassette is not None)
+        # A module written by jamf_codegen.py, used in place of the swagger docs of the server
+        self._generated: Any = kwargs.get('generated')
+        if isinstance(self._generated, str):
+            self._generated = importlib.import_module(self._generated)
+        self._max_connections: int = kwargs.get('max_connections', 25)
+        self._response_bytes: bool = kwargs.get('response_bytes', False)
+        self._cache: Optional[ResponseCache] = kwargs.get('cache')
+        if self._cache is True:
+            self._cache = ResponseCache()
+        conditional_requests = kwargs.get('conditional_requests', False)
+        self._conditional_requests: int = 256 if conditional_requests is True else int(conditional_requests)
+        self._validators: 'OrderedDict[str, Tuple[Optional[str], Optional[str], Union[str, bytes]]]' = OrderedDict()
+        self._validators_lock = threading.Lock()
+
+        self._headers: Dict[str, str] = {}
+
+        if self._return_format not in ('json', 'xml'):
+            raise ValueError('return_format must be "json" or "xml"')
+
+        # Throttled requests are retried by the rate limiter, which holds back every request, not just the one
+        self._rate_limiter: Optional[RateLimiter] = kwargs.get('rate_limiter')
+        if self._rate_limiter is True:
+            self._rate_limiter = RateLimiter()
+        self._throttle_retries: int = 3
+        self._metrics: Optional[Metrics] = kwargs.get('metrics', True)
+        if self._metrics is True:
+            self._metrics = Metrics()
+        elif not self._metrics:
+            self._metrics = None
+        self._slow_call_threshold: Optional[float] = kwargs.get('slow_call_threshold')
+        self._hedger: Optional[Hedger] = kwargs.get('hedge')
+        if self._hedger is True:
+            self._hedger = Hedger()
+        elif not self._hedger:
+            self._hedger = None
+        self._circuit_breaker: Optional[CircuitBreaker] = kwargs.get('circuit_breaker')
+        if self._circuit_breaker is True:
+            self._circuit_breaker = CircuitBreaker()
+        elif not self._circuit_breaker:
+            self._circuit_breaker = None
+        self._validate_params: bool = kwargs.get('validate_params', True)
+        # Identical GETs in flight share one request
+        self._coalesce: bool = kwargs.get('coalesce', True)
+        self._flights: Dict[str, Future] = {}
+        self._flights_lock = threading.Lock()
+        self._endpoints: Dict[str, Endpoint] = {}
+        self._methods: Dict[str, Callable[..., Any]] = {}
+        self._hooks: Dict[str, list] = {'request': [], 'response': []}
+
+        self._session: requests.Session = self._build_session()
+        # Kept to rebuild the client in another process
+        self._options: Dict[str, Any] = kwargs
+        _CLIENTS.add(self)
+
+        if self._disable_warnings:
+            urllib3.disable_warnings()
+
+        # Child classes should define these
+        self._swagger_path = ''
+        self._auth_base = ''
+        self._base_path = ''
+        self._auth_path = ''
+
+        # Filled by _load_api_methods, operation name: (path, method, deprecated)
+        self._spec_entry: Dict[str, Any] = {}
+        self._swagger: Dict[str, Any] = {}
+        self._operations: Dict[str, Tuple[str, str, bool]] = {}
+
+        self._post_init()
+
+    def _build_session(self) -> requests.Session:
+        """
+        Create the session, with the retry strategy
+        :return: Session
+        """
+        retry_strategy = Retry(
+            total=3,
+            backoff_factor=1,
+            status_forcelist=[500, 502, 504] if self._rate_limiter else [429, 500, 502, 503, 504],
+            allowed_methods=["HEAD", "GET", "OPTIONS", "POST", "PUT", "DELETE"]
+        )
+        adapter = _TimedAdapter(max_retries=retry_strategy, pool_connections=10, pool_maxsize=self._max_connections)
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", _TimedAdapter(pool_connections=10, pool_maxsize=self._max_connections))
+        if self._cassette is not None:
+            for prefix in ('https://', 'http://'):
+                session.mount(prefix, _CassetteAdapter(self._cassette, session.get_adapter(prefix)))
+        return session
+
+    def _after_fork(self) -> None:
+        """
+        Called in the child after a fork, so it does not use the connections of the parent or invalidate its token
+        The child gets its own session and borrows the token
+        :return: None
+        """
+        self._session = self._build_session()
+        self._validators_lock = threading.Lock()
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+        token_manager = self._token_manager
+        if token_manager is not None:
+            self._token_manager = TokenManager.borrow(token_manager._auth_url, token_manager._username,
+                                                      token_manager._password, token_manager._token,
+                                                      token_manager.expires, session=self._session,
+                                                      timeout=self._timeout, verify=self._verify).attach()
+
+    def config(self) -> Dict[str, Any]:
+        """
+        Get the settings of the client and its current token, picklable so a worker process can rebuild the client
+        with from_config without logging in again
+        The cache, rate limiter, metrics, hedger and circuit breaker are not shared, each process gets its own, except
+        a cache kept in a sqlite file which the process opens again
+        No request is sent, the token is taken as it is
+        :return: Config
+        """
+        options = {}
+        for key, value in self._options.items():
+            if key in ('token_manager', 'cassette'):
+                continue
+            if key in PROCESS_LOCAL and not isinstance(value, bool) and \
+                    not (isinstance(value, ResponseCache) and value.path is not None):
+                value = value is not None
+            if key == 'generated' and not isinstance(value, str):
+                value = value.__name__
+            options[key] = value
+
+        token_manager = self._token_manager
+        if token_manager is not None:
+            token, expires = token_manager.state()
+            auth_url, username, password = token_manager._auth_url, token_manager._username, token_manager._password
+        else:
+            # Not authenticated yet, the rebuilt client logs in with the credentials
+            token, expires = None, 0
+            auth_url, username, password = f'{self._api_url}{self._auth_base}{self._auth_path}', self._username, \
+                self._password
+        return {
+            'class': type(self),
+            'api_url': self._api_url,
+            'username': username,
+            'password': password,
+            'timeout': self._timeout,
+            'verify': self._verify,
+            'disable_warnings': self._disable_warnings,
+            'return_format': self._return_format,
+            'auth_url': auth_url,
+            'token': token,
+            'expires': expires,
+            'options': options,
+        }
+
+    @staticmethod
+    def from_config(config: Dict[str, Any]) -> 'Jamf':
+        """
+        Create a client from the config of another, borrowing its token
+        :param config: Config, from config()
+        :return: Client
+        """
+        token_manager = TokenManager.borrow(config['auth_url'], config['username'], config['password'],
+                                            config['token'], config['expires'], timeout=config['timeout'],
+                                            verify=config['verify'])
+        return config['class'](config['api_url'], None, None, timeout=config['timeout'], verify=config['verify'],
+                               disable_warnings=config['disable_warnings'], return_format=config['return_format'],
+                               token_manager=token_manager, **config['options'])
+
+    def __reduce__(self) -> Tuple[Callable[..., 'Jamf'], Tuple[Dict[str, Any]]]:
+        """
+        Pickle the client as its config, so it can be passed to a worker process
+        :return: Function and arguments to rebuild the client
+        """
+        return Jamf.from_config, (self.config(),)
+
+    def process_map(self, function: Union[str, Callable[..., Any]], items: Iterable[Any],
+                    processes: Optional[int] = None, chunksize: int = 1) -> Iterator[Any]:
+        """
+        Run calls and the parsing of their responses on a pool of processes, for work the GIL would hold back
+        Each process rebuilds the client once from its config and borrows the token
+        api.process_map('computers_find_computers_by_id', ({'id': i} for i in ids)) returns (item, API response), with
+        the response already parsed, in the order of the items
+        api.process_map(diff_computer, ids) returns diff_computer(api, id) for each id, the function must be
+        picklable (defined at the top level of a module)
+        :param function: The api method name, or a function called with the client and an item
+        :param items: Items, keyword arguments when function is an api method name
+        :param processes: Processes, defaults to the number of cpus
+        :param chunksize: Items sent to a process at a time
+        :return: Each result
+        """
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                                 initargs=(self.config(),)) as executor:
+            yield from executor.map(_run_in_worker, itertools.repeat(function), items, chunksize=chunksize)
+
+    def _post_init(self):
+        """
+        Hook for subclasses to add extra initialization after the parent constructor.
+        """
+        pass
+
+    def __del__(self) -> None:
+        """
+        Destructor for the class.
+        """
+        self.logout()
+
+    def __getattr__(self, name: str) -> Any:
+        """
+        Create the method for an endpoint the first time it is used
+        :param name: Attribute name
+        :return: The api method
+        """
+        operation = self.__dict__.get('_operations', {}).get(name)
+        if operation is None or (self._hide_deprecated and operation[2]):
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+        api_method = self._generate_method(self._endpoint(name))
+        setattr(self, name, api_method)
+        return api_method
+
+    def __dir__(self) -> list:
+        """
+        List the attributes, including the endpoint methods not yet created
+        :return: Attribute names
+        """
+        operations = (name for name, (_, _, deprecated) in self._operations.items()
+                      if not self._hide_deprecated or not deprecated)
+        return sorted(set(super().__dir__()).union(operations))
+
+    def __enter__(self) -> 'JamfClassic':
+        """
+        Enter method for context management.
+
+        Enables the use of 'with' statements, returning the class instance
+        :return: The current class instance.
+        """
+        return self
+
+    def __exit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
+        """
+        Exit method for context management.
+        :param exc_type: Exception type (if any).
+        :param exc_val: Exception value (if any).
+        :param exc_tb: Traceback object (if any).
+        """
+        self.logout()
+
+    @property
+    def timeout(self) -> int:
+        """
+        Get the timeout
+        :return: timeout value
+        """
+        return self._timeout
+
+    @timeout.setter
+    def timeout(self, timeout: float) -> None:
+        """
+        Set the timeout
+        :param: timeout
+        """
+        if timeout < 0:
+            raise ValueError('Value cannot be negative.')
+        self._timeout = float(timeout)
+
+    @property
+    def verify_ssl(self) -> bool:
+        """
+        Get the ssl validation
+        :return: setting
+        """
+        return self._verify
+
+    @verify_ssl.setter
+    def verify_ssl(self, verify: bool) -> None:
+        """
+        Set the ssl validation
+        :param: validation
+        """
+        if not isinstance(verify, bool):
+            raise ValueError('Bool value expected.')
+        self._verify = verify
+
+    @staticmethod
+    def disable_warnings() -> None:
+        """
+        Disable ssl warnings
+        :return: None
+        """
+        urllib3.disable_warnings()
+
+    @staticmethod
+    def _format_api_url(url: str) -> str:
+        """
+        Reformat the api url so that it can tolerate innocents with / and missing http
+        :return: Consistent api url
+        """
+        if not url.startswith('http'):
+            url = f'https://{url}'
+        return url.rstrip('/')
+
+    @staticmethod
+    def _to_snake_case(name: str) -> str:
+        """
+        Convert str from camelCase to snake_case
+        :return: Reformatted string
+        """
+        return re.sub(r'([a-z0-9])([A-Z])', r'\1_\2', name).lower()
+
+    @staticmethod
+    def _warn_deprecated(function_name: str, details: Dict[str, Any]) -> None:
+        """
+        Warn when calling a deprecated endpoint
+        :param function_name: Name of the endpoint
+        :param details: All details of the end point,
+        :return: None
+        """
+        if details.get('deprecated', False):
+            deprecation_date = details.get('x-deprecation-date', 'Unknown date')
+            warnings.warn(
+                f'⚠️ WARNING: The endpoint `{function_name}` is DEPRECATED as of {deprecation_date}.',
+                DeprecationWarning,
+                stacklevel=3
+            )
+
+    @property
+    def token_manager(self) -> TokenManager:
+        """
+        Get the token manager, pass it to other clients of the same server to share the token
+        JamfUAPI(url, None, None, token_manager=api.token_manager)
+        :return: Token manager
+        """
+        self._authenticate()
+        return self._token_manager
+
+    def _authenticate(self) -> None:
+        """
+        Authenticate to the api if pass the expiry time
+        :return: None
+        """
+        if self._token_manager is None:
+            self._token_manager = TokenManager(
+                f'{self._api_url}{self._auth_base}{self._auth_path}',
+                self._username,
+                self._password,
+                session=self._session,
+                timeout=self._timeout,
+                verify=self._verify
+            ).attach()
+
+        authorization = f'Bearer {self._token_manager.token()}'
+        if self._headers.get('Authorization') != authorization:
+            self._headers['Authorization'] = authorization
+
+    def logout(self):
+        """
+         De-authenticate, the token is invalidated once no other client is sharing it
+         A token borrowed from another process is left for its owner
+         :return: None
+         """
+        token_manager, self._token_manager = getattr(self, '_token_manager', None), None
+        if token_manager is not None:
+            _ = self._headers.pop('Authorization', None)
+            token_manager.release()
+
+        cassette = getattr(self, '_cassette', None)
+        if cassette is not None and cassette.recording:
+            cassette.save()
+
+        self._username = None
+        self._password = None
+
+    @property
+    def cache(self) -> Optional[ResponseCache]:
+        """
+        Get the response cache
+        :return: Cache, None if not caching
+        """
+        return self._cache
+
+    @staticmethod
+    def _retry_count(response: requests.Response) -> int:
+        """
+        Times the session retried a request before the response
+        :param response: Response
+        :return: Retries
+        """
+        retries = getattr(response.raw, 'retries', None)
+        return len(retries.history) if retries is not None else 0
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Snapshot of the request metrics
+        :return: {'endpoints': {name: {...}}, 'auth': {'refreshes': ..., 'refresh_time': ...}}, with 'hedging' and
+        'circuits' ({name: {...}}) when hedging or the circuit breaker are on
+        """
+        token_manager = getattr(self, '_token_manager', None)
+        metrics = {
+            'endpoints': self._metrics.snapshot() if self._metrics is not None else {},
+            'auth': {
+                'refreshes': token_manager.refreshes if token_manager else 0,
+                'refresh_time': token_manager.refresh_time if token_manager else 0.0,
+            },
+        }
+        if self._hedger is not None:
+            metrics['hedging'] = self._hedger.stats()
+        if self._circuit_breaker is not None:
+            metrics['circuits'] = self._circuit_breaker.stats()
+        return metrics
+
+    def prometheus_metrics(self, prefix: str = 'jamf') -> str:
+        """
+        Request metrics in the prometheus text format
+        :param prefix: Prefix of the metric names
+        :return: Text
+        """
+        if self._metrics is None:
+            return ''
+        return self._metrics.prometheus(getattr(self, '_token_manager', None), prefix)
+
+    @property
+    def hedger(self) -> Optional[Hedger]:
+        """
+        Get the hedger, None if GETs are not hedged
+        :return: Hedger
+        """
+        return self._hedger
+
+    @property
+    def circuit_breaker(self) -> Optional[CircuitBreaker]:
+        """
+        Get the circuit breaker, pass it to other clients of the same server to share the circuits
+        :return: Circuit breaker, None if not breaking
+        """
+        return self._circuit_breaker
+
+    @property
+    def rate_limiter(self) -> Optional[RateLimiter]:
+        """
+        Get the rate limiter, pass it to other clients of the same server to share the limit
+        :return: Rate limiter, None if not limiting
+        """
+        return self._rate_limiter
+
+    @staticmethod
+    def _resource(path: str) -> str:
+        """
+        Resource an endpoint path belongs to, /v1/scripts/{id} and /scripts/id/{id} are both scripts
+        :param path: Path to the api endpoint
+        :return: Resource
+        """
+        parts = [part for part in path.split('/') if part and not re.fullmatch(r'v\d+|preview', part)]
+        return parts[0] if parts else ''
+
+    def _request(self, endpoint: Endpoint, url: str, request_args: Dict[str, Any]) -> APIResponse:
+        """
+        Send a request for an endpoint, shared by all the generated methods
+        :param endpoint: Endpoint
+        :param url: url
+        :param request_args: Request arguments from _request_args
+        :return: API response
+        """
+        name, tag, method = endpoint.name, endpoint.tag, endpoint.method
+        for hook in self._hooks['request']:
+            hook(name, method, url, request_args)
+        begin = time.perf_counter()
+
+        download = progress = extra_headers = None
+        if 'download' in request_args or 'headers' in request_args:
+            request_args = dict(request_args)
+            download = request_args.pop('download', None)
+            progress = request_args.pop('progress', None)
+            extra_headers = request_args.pop('headers', None)
+
+        cache_key = None
+        if self._cache is not None and method == 'GET' and download is None:
+            cache_key = self._cache.key(method, url, request_args.get('params'), self._headers.get('Accept'))
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                cached.list_tags = self._xml_lists
+                cached.elapsed = {'total': time.perf_counter() - begin}
+                if self._metrics is not None:
+                    self._metrics.record_cached(name, tag)
+                return self._finish(name, method, cached)
+
+        if not self._coalesce or method != 'GET' or download is not None:
+            return self._finish(name, method, self._fetch(endpoint, url, request_args, begin, cache_key, download,
+                                                          progress, extra_headers))
+
+        # Wait for an identical request in flight rather than sending another
+        flight_key = cache_key or ResponseCache.key(method, url, request_args.get('params'),
+                                                    self._headers.get('Accept'))
+        with self._flights_lock:
+            flight = self._flights.get(flight_key)
+            if flight is None:
+                leader = self._flights[flight_key] = Future()
+        if flight is not None:
+            shared = flight.result()
+            if self._metrics is not None:
+                self._metrics.record_coalesced(name, tag)
+            wait_time = time.perf_counter() - begin
+            return self._finish(name, method, shared.copy(elapsed={'coalesced': wait_time, 'total': wait_time}))
+
+        try:
+            api_response = self._fetch(endpoint, url, request_args, begin, cache_key, None, None, extra_headers)
+        except BaseException as err:
+            with self._flights_lock:
+                del self._flights[flight_key]
+            leader.set_exception(err)
+            raise
+        with self._flights_lock:
+            del self._flights[flight_key]
+        leader.set_result(api_response)
+        return self._finish(name, method, api_response)
+
+    def _fetch(self, endpoint: Endpoint, url: str, request_args: Dict[str, Any], begin: float,
+               cache_key: Optional[str], download: Any, progress: Optional[Callable[[int, Optional[int]], None]],
+               extra_headers: Optional[Dict[str, str]]) -> APIResponse:
+        """
+        Send a request for an endpoint to the server, the part of _request after the cache and in flight requests
+        :param endpoint: Endpoint
+        :param url: url
+        :param request_args: Request arguments, without download/progress/headers
+        :param begin: perf_counter the call started at
+        :param cache_key: Key to cache the response under, None if not cached
+        :param download: Path or file object to write the response to, None to read it
+        :param progress: Download progress callback
+        :param extra_headers: Headers added to those of the session
+        :return: API response
+        """
+        name, tag, method = endpoint.name, endpoint.tag, endpoint.method
+        if self._circuit_breaker is not None:
+            self._circuit_breaker.before(name)
+        try:
+            self._authenticate()
+        except BaseException:
+            if self._circuit_breaker is not None:
+                self._circuit_breaker.release(name)
+            raise
+
+        # Authenticated first, so the headers copied below carry the current token
+        # Send the validators of the last response, an unchanged resource is answered with an empty 304
+        headers = self._headers
+        validator_key = validators = None
+        if self._conditional_requests and method == 'GET' and download is None:
+            validator_key = ResponseCache.key(method, url, request_args.get('params'), self._headers.get('Accept'))
+            with self._validators_lock:
+                validators = self._validators.get(validator_key)
+            if validators is not None:
+                headers = dict(self._headers)
+                if validators[0]:
+                    headers['If-None-Match'] = validators[0]
+                if validators[1]:
+                    headers['If-Modified-Since'] = validators[1]
+        if extra_headers:
+            headers = {**headers, **extra_headers}
+
+        elapsed = {'queue': 0.0, 'auth': time.perf_counter() - begin, 'connect': 0.0, 'ttfb': 0.0, 'download': 0.0}
+        trace = {'retries': 0}
+        start = time.perf_counter()
+        try:
+            response = self._send(method, url, headers, request_args, trace, elapsed, name)
+        except Exception:
+            if self._metrics is not None:
+                self._metrics.record(name, tag, time.perf_counter() - start, None)
+            if self._circuit_breaker is not None:
+                self._circuit_breaker.record(name, None)
+            raise
+        except BaseException:
+            if self._circuit_breaker is not None:
+                self._circuit_breaker.release(name)
+            raise
+        finally:
+            if isinstance(request_args.get('data'), Multipart):
+                request_args['data'].close()
+
+        if self._circuit_breaker is not None:
+            self._circuit_breaker.record(name, response.status_code)
+
+        size = None
+        if download is not None and 200 <= response.status_code < 300:
+            download_start = time.perf_counter()
+            size = self._write_download(response, download, progress)
+            elapsed['download'] += time.perf_counter() - download_start
+            path = os.fspath(download) if isinstance(download, (str, os.PathLike)) else None
+            api_response = APIResponse(True, response.url, {'path': path, 'bytes': size}, response.status_code,
+                                       elapsed=elapsed)
+        elif response.status_code == 304 and validators is not None:
+            api_response = APIResponse(True, response.url, validators[2], response.status_code,
+                                       list_tags=self._xml_lists, not_modified=True, elapsed=elapsed)
+        else:
+            success = 200 <= response.status_code < 300
+            api_response = APIResponse(success, response.url, self._response_body(response), response.status_code,
+                                       list_tags=self._xml_lists, elapsed=elapsed)
+            if validator_key is not None and response.status_code == 200:
+                self._store_validators(validator_key, response, api_response.data)
+
+        if self._metrics is not None:
+            self._metrics.record(name, tag, time.perf_counter() - start, response.status_code,
+                                 len(response.content) if size is None else size, trace['retries'])
+        if self._cache is not None:
+            if cache_key is not None:
+                if api_response.success:
+                    self._cache.set(cache_key, tag, endpoint.resource, api_response)
+            elif method != 'GET':
+                # Only writes change the resource, a GET that is not cached (ie. a download) leaves it alone
+                self._cache.invalidate(endpoint.resource)
+
+        elapsed['total'] = time.perf_counter() - begin
+        return api_response
+
+    def _finish(self, name: str, method: str, api_response: APIResponse) -> APIResponse:
+        """
+        Log a slow call and pass the response to the response hooks
+        :param name: Method name
+        :param method: Method (GET, etc)
+        :param api_response: API response
+        :return: API response
+        """
+        elapsed = api_response.elapsed or {}
+        if self._slow_call_threshold is not None and elapsed.get('total', 0.0) >= self._slow_call_threshold:
+            timings = ', '.join(f'{key} {value:.3f}s' for key, value in elapsed.items() if key != 'total')
+            self._logger.warning(f'Slow call {name} {method} {api_response.url} {api_response.http_code} '
+                                 f'took {elapsed["total"]:.3f}s: {timings}')
+        for hook in self._hooks['response']:
+            hook(name, method, api_response)
+        return api_response
+
+    def _send(self, method: str, url: str, headers: Dict[str, str], request_args: Dict[str, Any],
+              trace: Optional[Dict[str, Any]] = None, elapsed: Optional[Dict[str, float]] = None,
+              name: Optional[str] = None) -> requests.Response:
+        """
+        Send a request on the session, through the rate limiter if there is one
+        A GET is hedged if there is a hedger, a copy sent if it is slow counts as the same request to the limiter
+        :param method: Method (GET, etc)
+        :param url: url
+        :param headers: Headers
+        :param request_args: Request arguments from _request_args
+        :param trace: Dictionary to add the retries to
+        :param elapsed: Dictionary to add the seconds waiting for the limiter (queue), connecting, to the first byte
+        of the response (ttfb) and reading the body (download) to
+        :param name: Endpoint name, the latencies of GETs are kept by it to decide when to hedge
+        :return: Response
+        """
+        trace = {} if trace is None else trace
+        trace.setdefault('retries', 0)
+        elapsed = {} if elapsed is None else elapsed
+        for key in ('queue', 'connect', 'ttfb', 'download'):
+            elapsed.setdefault(key, 0.0)
+
+        # A streamed body is rewound to send it again, one that cannot be (an iterator) is only sent once
+        body = request_args.get('data')
+        streamed = hasattr(body, 'read') or hasattr(body, '__next__')
+        position = body.tell() if streamed and hasattr(body, 'seek') and hasattr(body, 'tell') else None
+
+        def request() -> requests.Response:
+            # The connect time is kept with the response, a hedged request runs on another thread
+            _connect_time.value = 0.0
+            sent = self._session.request(method, url, headers=headers, timeout=self._timeout, verify=self._verify,
+                                         **request_args)
+            sent.connect_time = _connect_time.value
+            return sent
+
+        hedge = self._hedger is not None and method == 'GET' and name is not None and not request_args.get('stream')
+        attempts = self._throttle_retries + 1 if self._rate_limiter is not None else 1
+        for attempt in range(attempts):
+            if self._rate_limiter is not None:
+                elapsed['queue'] += self._rate_limiter.acquire()
+            start = time.perf_counter()
+            try:
+                response = self._hedger.send(name, request) if hedge else request()
+            except Exception:
+                if self._rate_limiter is not None:
+                    self._rate_limiter.release()
+                raise
+
+            # requests measures up to the headers being read, before the body is
+            sent = time.perf_counter() - start
+            headers_read = response.elapsed.total_seconds()
+            elapsed['connect'] += response.connect_time
+            elapsed['ttfb'] += max(0.0, headers_read - response.connect_time)
+            elapsed['download'] += max(0.0, sent - headers_read)
+            trace['retries'] += self._retry_count(response)
+
+            if self._rate_limiter is None:
+                return response
+            pause = self._rate_limiter.release(response.status_code, retry_after(response.headers.get('Retry-After')))
+            if pause is None or attempt == self._throttle_retries or (streamed and position is None):
+                return response
+            if position is not None:
+                body.seek(position)
+            response.close()
+            trace['retries'] += 1
+            self._logger.debug(f'Throttled {response.status_code} on {url}, holding requests for {pause:.2f}s')
+        return response
 
-        if self._disable_warnings:
-            urllib3.disable_warnings()
+    @staticmethod
+    def _body_args(kwargs: Dict[str, Any], json_body: bool) -> Dict[str, Any]:
+        """
+        Request arguments for the body of a call, and where to write the response
+        files= is sent as multipart/form-data with data as the form fields, a file object or iterator in data is
+        streamed rather than read into memory, download= writes the response to a path or file object as it arrives
+        :param kwargs: Arguments passed to the api method
+        :param json_body: Send other data as json, otherwise as is
+        :return: Request arguments
+        """
+        data = kwargs.get('data')
+        progress = kwargs.get('progress')
+        if kwargs.get('files') is not None:
+            body = Multipart(kwargs['files'], data, progress)
+            args = {'data': body, 'headers': {'Content-Type': body.content_type}}
+        elif json_body and not (isinstance(data, (bytes, bytearray)) or hasattr(data, 'read') or
+                                hasattr(data, '__next__')):
+            args = {'json': data}
+        else:
+            args = {'data': data}
+        if kwargs.get('download') is not None:
+            args.update(stream=True, download=kwargs['download'], progress=progress)
+            args['headers'] = {**args.get('headers', {}), 'Accept': '*/*'}
+        return args
 
-        # Child classes should define these
-        self._auth_base = ''
-        self._base_path = ''
-        self._auth_path = ''
+    @staticmethod
+    def _iter_chunks(response: requests.Response, chunk_size: int = 1 << 20,
+                     progress: Optional[Callable[[int, Optional[int]], None]] = None) -> Iterator[bytes]:
+        """
+        Read a streamed response a chunk at a time
+        :param response: Response, sent with stream=True
+        :param chunk_size: Bytes per chunk
+        :param progress: Called with (bytes received, Content-Length or None) after each chunk
+        :return: Each chunk
+        """
+        total = int(response.headers.get('Content-Length') or 0) or None
+        received = 0
+        for chunk in response.iter_content(chunk_size):
+            # Counted on the wire, so it matches the Content-Length of a compressed response
+            received = response.raw.tell() if hasattr(response.raw, 'tell') else received + len(chunk)
+            if progress is not None:
+                progress(received, total)
+            yield chunk
+
+    @classmethod
+    def _write_download(cls, response: requests.Response, target: Any,
+                        progress: Optional[Callable[[int, Optional[int]], None]] = None) -> int:
+        """
+        Write a streamed response to a file
+        A path is written to path.part and moved into place once complete
+        :param response: Response, sent with stream=True
+        :param target: Path or file object
+        :param progress: Called with (bytes received, Content-Length or None) after each chunk
+        :return: Bytes written
+        """
+        written = 0
+        try:
+            if isinstance(target, (str, os.PathLike)):
+                partial = f'{os.fspath(target)}.part'
+                try:
+                    with open(partial, 'wb') as file:
+                        for chunk in cls._iter_chunks(response, progress=progress):
+                            written += file.write(chunk)
+                    os.replace(partial, target)
+                except BaseException:
+                    if os.path.exists(partial):
+                        os.remove(partial)
+                    raise
+            else:
+                for chunk in cls._iter_chunks(response, progress=progress):
+                    target.write(chunk)
+                    written += len(chunk)
+        finally:
+            response.close()
+        return written
+
+    def _stream(self, endpoint: Endpoint, url: str, request_args: Dict[str, Any], accept: str,
+                chunk_size: int = 1 << 20, progress: Optional[Callable[[int, Optional[int]], None]] = None
+                ) -> Iterator[bytes]:
+        """
+        Send a request for an endpoint with stream=True and read the response a chunk at a time
+        Sent through _send like any other call, so the hooks, rate limiter, circuit breaker, metrics and slow call log
+        apply, the response hooks are passed the bytes read once the response is
+        :param endpoint: Endpoint
+        :param url: url
+        :param request_args: Request arguments from _request_args
+        :param accept: Accept header
+        :param chunk_size: Bytes per chunk
+        :param progress: Called with (bytes received, Content-Length or None) after each chunk
+        :return: Each chunk
+        """
+        name, tag, method = endpoint.name, endpoint.tag, endpoint.method
+        for hook in self._hooks['request']:
+            hook(name, method, url, request_args)
+        begin = time.perf_counter()
+        request_args = dict(request_args)
+        request_args.pop('download', None)
+        request_args.pop('progress', None)
+        extra_headers = request_args.pop('headers', None) or {}
+        request_args['stream'] = True
+
+        if self._circuit_breaker is not None:
+            self._circuit_breaker.before(name)
+        try:
+            self._authenticate()
+        except BaseException:
+            if self._circuit_breaker is not None:
+                self._circuit_breaker.release(name)
+            raise
+        headers = {**self._headers, 'Accept': accept, **extra_headers}
+        elapsed = {'queue': 0.0, 'auth': time.perf_counter() - begin, 'connect': 0.0, 'ttfb': 0.0, 'download': 0.0}
+        trace = {'retries': 0}
+        start = time.perf_counter()
+        try:
+            response = self._send(method, url, headers, request_args, trace, elapsed, name)
+        except Exception:
+            if self._metrics is not None:
+                self._metrics.record(name, tag, time.perf_counter() - start, None)
+            if self._circuit_breaker is not None:
+                self._circuit_breaker.record(name, None)
+            raise
+        except BaseException:
+            if self._circuit_breaker is not None:
+                self._circuit_breaker.release(name)
+            raise
+        finally:
+            if isinstance(request_args.get('data'), Multipart):
+                request_args['data'].close()
+
+        if self._circuit_breaker is not None:
+            self._circuit_breaker.record(name, response.status_code)
+
+        size = 0
+        try:
+            if not 200 <= response.status_code < 300:
+                size = len(response.content)
+                elapsed['total'] = time.perf_counter() - begin
+                self._finish(name, method, APIResponse(False, response.url, self._response_body(response),
+                                                       response.status_code, elapsed=elapsed))
+                raise StreamError(f'Failed to stream {url}: {response.status_code} {response.text}')
+
+            download_start = time.perf_counter()
+            for chunk in self._iter_chunks(response, chunk_size, progress):
+                size += len(chunk)
+                yield chunk
+            elapsed['download'] += time.perf_counter() - download_start
+        finally:
+            response.close()
+            if self._metrics is not None:
+                self._metrics.record(name, tag, time.perf_counter() - start, response.status_code, size,
+                                     trace['retries'])
+
+        elapsed['total'] = time.perf_counter() - begin
+        self._finish(name, method, APIResponse(True, response.url, {'path': None, 'bytes': size},
+                                               response.status_code, elapsed=elapsed))
+
+    def iter_download(self, endpoint: Union[str, Callable[..., APIResponse]], chunk_size: int = 1 << 20,
+                      progress: Optional[Callable[[int, Optional[int]], None]] = None,
+                      **kwargs: Any) -> Iterator[bytes]:
+        """
+        Stream the response of an endpoint, returning it a chunk at a time so it is never held in memory
+        for chunk in api.iter_download('icon_get_v1_icon_download_by_id', id=1): ...
+        :param endpoint: The api method or its name
+        :param chunk_size: Bytes per chunk
+        :param progress: Called with (bytes received, Content-Length or None) after each chunk
+        :param kwargs: Parameters for the endpoint
+        :return: Each chunk
+        """
+        endpoint = self._endpoint(endpoint if isinstance(endpoint, str) else endpoint.__name__)
 
-        self._post_init()
+        url, request_args = self._request_args(endpoint, kwargs)
+        yield from self._stream(endpoint, url, request_args, '*/*', chunk_size, progress)
 
-    def _post_init(self):
+    def add_hook(self, event: str, hook: Callable[..., None]) -> None:
         """
-        Hook for subclasses to add extra initialization after the parent constructor.
+        Add a function called before every request or after every response
+        request: hook(name, method, url, request_args), the request arguments (params, json, data) can be changed
+        response: hook(name, method, response), the response has the timings in elapsed
+        :param event: request or response
+        :param hook: Function
+        :return: None
         """
-        pass
+        if event not in self._hooks:
+            raise ValueError(f'Unknown hook event {event}, must be "request" or "response"')
+        self._hooks[event].append(hook)
 
-    def __del__(self) -> None:
+    def remove_hook(self, event: str, hook: Callable[..., None]) -> None:
         """
-        Destructor for the class.
+        Remove a hook added with add_hook
+        :param event: request or response
+        :param hook: Function
+        :return: None
         """
-        self.logout()
+        if event not in self._hooks:
+            raise ValueError(f'Unknown hook event {event}, must be "request" or "response"')
+        self._hooks[event].remove(hook)
 
-    def __enter__(self) -> 'JamfClassic':
+    def _store_validators(self, key: str, response: requests.Response, body: Union[str, bytes]) -> None:
         """
-        Enter method for context management.
-
-        Enables the use of 'with' statements, returning the class instance
-        :return: The current class instance.
+        Keep the ETag/Last-Modified and body of a response for the next conditional request
+        :param key: Request key
+        :param response: Response
+        :param body: Response body
+        :return: None
         """
-        return self
-
-    def __exit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        with self._validators_lock:
+            if etag is None and last_modified is None:
+                self._validators.pop(key, None)
+                return
+            self._validators[key] = (etag, last_modified, body)
+            self._validators.move_to_end(key)
+            while len(self._validators) > self._conditional_requests:
+                self._validators.popitem(last=False)
+
+    def _response_body(self, response: Any) -> Union[str, bytes]:
         """
-        Exit method for context management.
-        :param exc_type: Exception type (if any).
-        :param exc_val: Exception value (if any).
-        :param exc_tb: Traceback object (if any).
+        Body to keep from a response, bytes skip decoding and are smaller for non ascii payloads
+        :param response: Response
+        :return: Text or bytes
         """
-        self.logout()
+        return response.content if self._response_bytes else response.text
 
-    @property
-    def timeout(self) -> int:
+    def map(self, endpoint: Union[str, Callable[..., APIResponse]], items: Iterable[Dict[str, Any]],
+            concurrency: int = 8, ordered: bool = True,
+            progress: Optional[Callable[[int, int], None]] = None) -> Iterator[Tuple[Dict[str, Any], APIResponse]]:
         """
-        Get the timeout
-        :return: timeout value
+        Call an endpoint for many sets of parameters on a pool of threads sharing the session
+        A failed call does not stop the others, its response has success False and the error in err
+        :param endpoint: The api method or its name, ie. computers_find_computers_by_id
+        :param items: Parameters for each call, ie. [{'id': 1}, {'id': 2}]
+        :param concurrency: Calls in flight at once
+        :param ordered: Return in the order of items, otherwise as they complete
+        :param progress: Called with (completed, total) after each call
+        :return: (parameters, response) for each call
         """
-        return self._timeout
+        api_method = getattr(self, endpoint) if isinstance(endpoint, str) else endpoint
+        items = list(items)
+        total = len(items)
 
-    @timeout.setter
-    def timeout(self, timeout: float) -> None:
+        def call(kwargs: Dict[str, Any]) -> APIResponse:
+            try:
+                return api_method(**kwargs)
+            except Exception as err:
+                return APIResponse(False, err=f'{type(err).__name__}: {err}')
+
+        # Authenticate once up front rather than in every thread
+        self._authenticate()
+
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        futures: Dict[Future, int] = {}
+        finished: Dict[int, APIResponse] = {}
+        submitted = completed = returned = 0
+        try:
+            while submitted < total or futures:
+                # Keep a bounded window of calls queued so results are not all held at once
+                while submitted < total and len(futures) < concurrency * 2:
+                    futures[executor.submit(call, items[submitted])] = submitted
+                    submitted += 1
+
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = futures.pop(future)
+                    completed += 1
+                    if progress:
+                        progress(completed, total)
+                    if ordered:
+                        finished[index] = future.result()
+                    else:
+                        yield items[index], future.result()
+
+                while returned in finished:
+                    yield items[returned], finished.pop(returned)
+                    returned += 1
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def project(self, endpoint: Union[str, Callable[..., APIResponse]],
+                sections: Iterable[str]) -> Callable[..., APIResponse]:
         """
-        Set the timeout
-        :param: timeout
+        Get an api method that only returns some sections of the records, so less is sent and parsed
+        Sections can be named as in the response (general, operatingSystem, extension_attributes), or as the api
+        does (GENERAL, OPERATING_SYSTEM, ExtensionAttributes), fields are reduced to their section (general.name)
+        api.project('computers_find_computers_by_id', ['general', 'hardware'])(id=1)
+        api.iter_results(api.project('computer_inventory_get_v1_computers_inventory', ['general', 'hardware']))
+        :param endpoint: The api method or its name
+        :param sections: Sections or fields wanted
+        :return: The api method
         """
-        if timeout < 0:
-            raise ValueError('Value cannot be negative.')
-        self._timeout = float(timeout)
-
-    @property
-    def verify_ssl(self) -> bool:
+        name = endpoint if isinstance(endpoint, str) else endpoint.__name__
+        sections = list(dict.fromkeys(section.split('.')[0] for section in sections))
+        if not sections:
+            raise ValueError('No sections given')
+        api_method, params = self._projection(self._endpoint(name), sections)
+
+        def projected(*args: Any, **kwargs: Any) -> APIResponse:
+            return api_method(*args, **params, **kwargs)
+
+        projected.__name__ = projected.__qualname__ = api_method.__name__
+        projected.__doc__ = api_method.__doc__
+        # Kept so iter_bulk can ask the other endpoints of the resource for the same sections
+        projected.sections = sections
+        return projected
+
+    def sections(self, endpoint: Union[str, Callable[..., APIResponse]]) -> List[str]:
         """
-        Get the ssl validation
-        :return: setting
+        Get the sections an endpoint can be projected to, as named by the api
+        :param endpoint: The api method or its name
+        :return: Sections, empty if the docs do not list them
         """
-        return self._verify
+        return []
 
-    @verify_ssl.setter
-    def verify_ssl(self, verify: bool) -> None:
+    def _projection(self, endpoint: Endpoint, sections: List[str]) -> Tuple[Callable[..., APIResponse], Dict[str, Any]]:
         """
-        Set the ssl validation
-        :param: validation
+        Work out how to ask an endpoint for some sections
+        :param endpoint: Endpoint
+        :param sections: Sections wanted
+        :return: The api method to call and the parameters to add
         """
-        if not isinstance(verify, bool):
-            raise ValueError('Bool value expected.')
-        self._verify = verify
+        raise ValueError(f'{endpoint.name} cannot be projected')
 
-    @staticmethod
-    def disable_warnings() -> None:
+    def bulk_get(self, endpoint: Union[str, Callable[..., APIResponse]], ids: Iterable[Any],
+                 **kwargs: Any) -> Dict[Any, Any]:
         """
-        Disable ssl warnings
-        :return: None
+        Get the records for many ids in as few requests as possible, see iter_bulk
+        :param endpoint: The api method or its name, by id or the list endpoint
+        :param ids: Ids of the records
+        :param kwargs: Options of iter_bulk and parameters for the endpoint
+        :return: Records by id, ids that were not found are left out
         """
-        urllib3.disable_warnings()
+        return dict(self.iter_bulk(endpoint, ids, **kwargs))
 
-    @staticmethod
-    def _format_api_url(url: str) -> str:
+    def iter_bulk(self, endpoint: Union[str, Callable[..., APIResponse]], ids: Iterable[Any], batch_size: int = 100,
+                  concurrency: int = 8, id_field: str = 'id', **kwargs: Any) -> Iterator[Tuple[Any, Any]]:
         """
-        Reformat the api url so that it can tolerate innocents with / and missing http
-        :return: Consistent api url
+        Get the records for many ids in as few requests as possible, rather than one call per id
+        Where the list endpoint takes a filter the ids are fetched in batches with id=in=(...), otherwise the endpoint
+        is called for each id on a pool of threads
+        :param endpoint: The api method or its name, by id or the list endpoint
+        :param ids: Ids of the records
+        :param batch_size: Ids per filtered request
+        :param concurrency: Requests in flight at once
+        :param id_field: Field of the records with the id, for the filter
+        :param kwargs: Parameters for the endpoint, ie. section
+        :return: (id, record) as each is returned, ids that were not found are left out
         """
-        if not url.startswith('http'):
-            url = f'https://{url}'
-        return url.rstrip('/')
+        ids = list(dict.fromkeys(ids))
+        list_name, by_id_name, batches, items = self._bulk_plan(endpoint, ids, batch_size, id_field, kwargs)
+        if list_name is None:
+            yield from self._iter_each(by_id_name, ids, concurrency, kwargs)
+            return
+
+        by_text = {str(record_id): record_id for record_id in ids}
+        for params, response in self.map(list_name, items, concurrency, ordered=False):
+            if not response.success:
+                batch = batches[params['filter']]
+                if response.http_code == 400 and by_id_name is not None:
+                    # The field cannot be filtered on, get this batch one at a time
+                    self._logger.debug(f'Filter not accepted by {list_name}, fetching {len(batch)} ids one at a time')
+                    yield from self._iter_each(by_id_name, batch, concurrency, kwargs)
+                    continue
+                raise PageError(f'Failed to get page: {response.http_code} {response.url} {response.data}')
+            for record in response.json.get('results', []):
+                record_id = by_text.get(str(record.get(id_field)) if isinstance(record, dict) else None)
+                if record_id is not None:
+                    yield record_id, record
+
+    def _bulk_plan(self, endpoint: Union[str, Callable[..., APIResponse]], ids: List[Any], batch_size: int,
+                   id_field: str, kwargs: Dict[str, Any]) -> Tuple[Optional[str], Any, Dict[str, List[Any]],
+                                                                   List[Dict[str, Any]]]:
+        """
+        Work out the requests of iter_bulk
+        :param endpoint: The api method or its name, by id or the list endpoint
+        :param ids: Ids of the records, without duplicates
+        :param batch_size: Ids per filtered request
+        :param id_field: Field of the records with the id, for the filter
+        :param kwargs: Parameters for the endpoint, the filter is taken out
+        :return: List endpoint (None to call the endpoint by id for each id), the endpoint by id, the ids of each
+        filter and the parameters of each filtered request
+        """
+        list_name, by_id_name = self._bulk_endpoints(endpoint if isinstance(endpoint, str) else endpoint.__name__)
+        sections = getattr(endpoint, 'sections', None)
+        if by_id_name is not None and not isinstance(endpoint, str) and endpoint.__name__ == by_id_name:
+            # Keep the method given, it may be projected
+            by_id_name = endpoint
+        elif by_id_name is not None and sections is not None:
+            try:
+                by_id_name = self.project(by_id_name, sections)
+            except ValueError:
+                # Without the sections the records by id would not match, so there is no fetching them one at a time
+                by_id_name = None
+        if list_name is None:
+            if by_id_name is None:
+                raise ValueError(f'{endpoint} cannot be fetched by id')
+            return None, by_id_name, {}, []
+
+        # A projected method is projected on the list endpoint too, raising if it cannot be
+        projection = self._projection(self._endpoint(list_name), sections)[1] if sections is not None else {}
+        extra_filter = kwargs.pop('filter', None)
+        batches = {}
+        for index in range(0, len(ids), batch_size):
+            batch = ids[index:index + batch_size]
+            rsql = f'{id_field}=in=({",".join(str(record_id) for record_id in batch)})'
+            batches[f'{rsql};{extra_filter}' if extra_filter else rsql] = batch
+        items = [{**projection, **kwargs, 'filter': rsql, 'page': 0, 'page-size': len(batch)}
+                 for rsql, batch in batches.items()]
+        return list_name, by_id_name, batches, items
+
+    def _iter_each(self, endpoint: Union[str, Callable[..., APIResponse]], ids: List[Any], concurrency: int,
+                   kwargs: Dict[str, Any]) -> Iterator[Tuple[Any, Any]]:
+        """
+        Get the records for many ids with a call per id
+        :param endpoint: The api method or its name
+        :param ids: Ids of the records
+        :param concurrency: Calls in flight at once
+        :param kwargs: Parameters for the endpoint
+        :return: (id, record) as each is returned, ids that were not found are left out
+        """
+        keys = self._endpoint(endpoint if isinstance(endpoint, str) else endpoint.__name__).keys
+        key = 'id' if 'id' in keys or len(keys) != 1 else next(iter(keys))
+        items = [{**kwargs, key: record_id} for record_id in ids]
+        for params, response in self.map(endpoint, items, concurrency, ordered=False):
+            if response.success:
+                data = response.json
+                # Classic records are wrapped in their type, ie. {'computer': {...}}
+                if isinstance(data, dict) and len(data) == 1:
+                    data = next(iter(data.values()))
+                yield params[key], data
+            elif response.http_code != 404:
+                raise PageError(f'Failed to get {params[key]}: {response.http_code} {response.url} '
+                                f'{response.err or response.data}')
+
+    def _bulk_endpoints(self, name: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Find the endpoints to get many records by id with
+        :param name: Method name, by id or the list endpoint
+        :return: Filterable list endpoint and the endpoint by id, None for those there are not
+        """
+        endpoint = self._endpoint(name)
+        return None, name if endpoint.keys else None
 
-    @staticmethod
-    def _to_snake_case(name: str) -> str:
+    def _spec_cache_file(self) -> Optional[str]:
         """
-        Convert str from camelCase to snake_case
-        :return: Reformatted string
+        Path of the spec cache entry for this server and api
+        Marshal data is only readable by the python version that wrote it, so that is part of the name
+        :return: Path or None if the cache is disabled
         """
-        return re.sub(r'([a-z0-9])([A-Z])', r'\1_\2', name).lower()
+        if not self._spec_cache_dir:
+            return None
+        key = hashlib.sha1(f'{self._api_url}{self._swagger_path}'.encode()).hexdigest()
+        return os.path.join(self._spec_cache_dir,
+                            f'{key}-py{sys.version_info[0]}{sys.version_info[1]}-v{SPEC_CACHE_FORMAT}.marshal')
 
-    def _authenticate(self) -> None:
+    def _read_spec_cache(self, cache_file: str) -> Optional[Dict[str, Any]]:
         """
-        Authenticate to the api if pass the expiry time
+        Read a spec cache entry
+        :param cache_file: Path to the entry
+        :return: Entry or None if missing/unreadable
+        """
+        try:
+            with open(cache_file, 'rb') as cache:
+                entry = marshal.load(cache)
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        if not isinstance(entry, dict) or entry.get('url') != self._api_url or 'spec' not in entry:
+            return None
+        return entry
+
+    def _write_spec_cache(self, cache_file: str, entry: Dict[str, Any]) -> None:
+        """
+        Write a spec cache entry, failures only lose the cache
+        :param cache_file: Path to the entry
+        :param entry: Entry
         :return: None
         """
-        if self._token_expiry == 0 or 'Authorization' not in self._headers:
-            auth_url = f'{self._api_url}{self._auth_base}{self._auth_path}'
-            self._logger.debug(f'Authenticating to {auth_url}')
-
-            response = requests.post(
-                auth_url,
-                auth=(self._username, self._password),
-                headers={'Accept': 'application/json'},
-                timeout=self._timeout,
-                verify=self._verify
-            )
-            if response.status_code == 200:
-                token = response.json().get('token')
-                self._headers['Authorization'] = f'Bearer {token}'
-                self._session.headers.update(self._headers)
-                self._token_expiry = time.time() + (30 * 60)
-            else:
-                raise AuthenticationError(f'Authentication failed: {response.status_code} {response.text}')
-        elif time.time() >= self._token_expiry:
-            auth_url = f'{self._api_url}{self._auth_base}{self._auth_path}'.replace('/token', '/keep-alive')
-            self._logger.debug(f'Authenticating to {auth_url}')
-
-            response = requests.post(
-                auth_url,
-                headers=self._headers,
-                timeout=self._timeout,
-                verify=self._verify
-            )
-            if response.status_code == 200:
-                token = response.json().get('token')
-                self._headers['Authorization'] = f'Bearer {token}'
-                self._session.headers.update(self._headers)
-                self._token_expiry = time.time() + (30 * 60)
-            else:
-                raise AuthenticationError(f'Authentication failed: {response.status_code} {response.text}')
+        temp_file = f'{cache_file}.{os.getpid()}.tmp'
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            with open(temp_file, 'wb') as cache:
+                marshal.dump(entry, cache)
+            os.replace(temp_file, cache_file)
+        except (OSError, ValueError) as err:
+            self._logger.debug(f'Unable to write spec cache {cache_file}: {err}')
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+
+    def _load_swagger(self) -> Dict[str, Any]:
+        """
+        Load the swagger docs from memory or the spec cache while it is fresh, otherwise from the api url
+        A stale entry is revalidated with its ETag/Last-Modified so an unchanged spec is not parsed again
+        :return: Spec cache entry, with the swagger definition and operation index
+        """
+        key = f'{self._api_url}{self._swagger_path}'
+        cache_file = self._spec_cache_file()
+        entry = None
+        if not self._refresh_spec:
+            entry = _SPEC_ENTRIES.get(key)
+            if entry is None and cache_file:
+                entry = self._read_spec_cache(cache_file)
+
+        if entry is not None and time.time() - entry['fetched'] < self._spec_cache_ttl:
+            self._logger.debug(f'Using cached swagger docs for {self._api_url} ({entry.get("version")})')
+        else:
+            entry = self._fetch_swagger_yaml(entry)
+            if 'operations' not in entry:
+                entry['operations'] = self._index_operations(entry['spec'])
+            if cache_file:
+                self._write_spec_cache(cache_file, entry)
+
+        _SPEC_ENTRIES[key] = entry
+        if entry.get('digest'):
+            _SPEC_DIGESTS.setdefault(entry['digest'], entry)
+        self._read_swagger(entry['spec'])
+        return entry
+
+    def _load_generated(self) -> Dict[str, Any]:
+        """
+        Load the swagger docs from a module written by jamf_codegen.py, without fetching them
+        :return: Spec cache entry, with the swagger definition and operation index
+        """
+        module = self._generated
+        if getattr(module, 'SWAGGER_PATH', None) != self._swagger_path:
+            raise SwaggerDocsError(f'{module.__name__} was not generated from {self._swagger_path}')
+        self._logger.debug(f'Using the swagger docs in {module.__name__} ({module.VERSION})')
+        entry = {'url': self._api_url, 'version': module.VERSION, 'fetched': time.time(), 'spec': module.SPEC,
+                 'operations': module.OPERATIONS}
+        self._read_swagger(entry['spec'])
+        return entry
+
+    def _call(self, name: str, kwargs: Dict[str, Any]) -> Any:
+        """
+        Call the api method for an endpoint, the methods of a generated module call this
+        Parameters left as None are not sent
+        :param name: Method name
+        :param kwargs: Arguments for the api method
+        :return: API response
+        """
+        api_method = self._methods.get(name)
+        if api_method is None:
+            api_method = self._methods[name] = self._generate_method(self._endpoint(name))
+        return api_method(**{key: value for key, value in kwargs.items() if value is not None})
 
-    def logout(self):
+    def _fetch_swagger_yaml(self, cached: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
-         De-authenticate
-         :return: None
-         """
-        if 'Authorization' in self._headers:
-            de_auth_url = f'{self._api_url}{self._auth_base}{self._auth_path}'.replace('/token', '/invalidate-token')
-            response = self._session.post(
-                de_auth_url,
-                headers={
-                    'Authorization': self._headers['Authorization'],
-                    'Accept': '*/*'
-                },
-                timeout=self._timeout,
-                verify=self._verify
-            )
-            if response.status_code != 204:
-                raise AuthenticationError(f'De-Authentication failed: {response.status_code} {response.text}')
+        Fetch the swagger docs from the api url
+        :param cached: Spec cache entry to revalidate, if any
+        :return: Spec cache entry
+        """
+        swagger_url = f'{self._api_url}{self._swagger_path}'
+        headers = {}
+        if cached is not None:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+
+        self._logger.debug(f'Fetching swagger docs from {swagger_url}')
+        response = self._session.get(swagger_url, headers=headers, timeout=self._timeout, verify=self._verify)
+        if response.status_code == 304 and cached is not None:
+            cached['fetched'] = time.time()
+            return cached
+        if response.status_code == 200:
+            entry = {
+                'url': self._api_url,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'fetched': time.time(),
+                'digest': hashlib.sha1(response.content).hexdigest(),
+            }
+            # Another server with identical docs has already parsed them, its spec and operations are shared
+            with _SPEC_LOCK:
+                digest_lock = _SPEC_DIGEST_LOCKS.setdefault(entry['digest'], threading.Lock())
+            with digest_lock:
+                shared = _SPEC_DIGESTS.get(entry['digest'])
+                if shared is not None and 'operations' in shared:
+                    self._logger.debug(f'Sharing the parsed swagger docs of {shared["url"]} ({shared["version"]})')
+                    return {**entry, 'version': shared['version'], 'spec': shared['spec'],
+                            'operations': shared['operations']}
+
+                # Round trip through json so the entry only holds types marshal can store (yaml can produce dates)
+                swagger_data = json.loads(json.dumps(self._parse_swagger(response.text), default=str))
+                entry.update(version=str(swagger_data.get('info', {}).get('version', '')), spec=swagger_data,
+                             operations=self._index_operations(swagger_data))
+                _SPEC_DIGESTS[entry['digest']] = entry
+                return entry
+        raise SwaggerDocsError(f'Failed to fetch Swagger YAML: {response.status_code} {response.text}')
 
-            self._logger.debug(f'De-authenticating to {de_auth_url}')
-            _ = self._headers.pop('Authorization', None)
+    @classmethod
+    def _index_operations(cls, swagger_data: Dict[str, Any]) -> Dict[str, Tuple[str, str, bool]]:
+        """
+        Name each endpoint in the swagger docs
+        :param swagger_data: Swagger defination
+        :return: Operation name: (path, method, deprecated)
+        """
+        operations = {}
+        for path, methods in swagger_data.get('paths', {}).items():
+            for method, details in methods.items():
+                if method.lower() in ('get', 'put', 'post', 'patch', 'delete'):
+                    name = cls._operation_name(path, method, details)
+                    operations[name] = (path, method, bool(details.get('deprecated', False)))
+        return operations
 
-        self._username = None
-        self._password = None
+    def _endpoint(self, name: str) -> Endpoint:
+        """
+        Get the compiled endpoint for a method name
+        :param name: Method name
+        :return: Endpoint
+        """
+        endpoint = self._endpoints.get(name)
+        if endpoint is None:
+            if name not in self._operations:
+                raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+            path, method, _ = self._operations[name]
+            path_item = self._swagger['paths'][path]
+            details = path_item[method]
+            endpoint = Endpoint(name, path, method, f'{self._api_url}{self._base_path}{path}', details,
+                                self._parameters(path_item, details))
+            self._endpoints[name] = endpoint
+        return endpoint
+
+    def _parameters(self, path_item: Dict[str, Any], details: Dict[str, Any]) -> Optional[list]:
+        """
+        Parameters of an endpoint, those of the path and the operation, with references resolved
+        :param path_item: Swagger definition of the path
+        :param details: All details of the end point
+        :return: Parameters, None if a reference could not be resolved
+        """
+        parameters = []
+        for parameter in path_item.get('parameters', []) + details.get('parameters', []):
+            reference = parameter.get('$ref') if isinstance(parameter, dict) else None
+            if reference is not None:
+                parameter = self._swagger
+                for part in reference.lstrip('#/').split('/'):
+                    parameter = parameter.get(part) if isinstance(parameter, dict) else None
+                if not isinstance(parameter, dict):
+                    return None
+            parameters.append(parameter)
+        return parameters
 
     def _load_api_methods(self) -> None:
         """
-        For each endpoint in the swagger docs, create a method
+        Load the index of endpoints in the swagger docs, each method is created when first used
         :return: None
         """
-        swagger_dict = self._fetch_swagger_yaml()
-        for path, methods in swagger_dict.get('paths', {}).items():
-            for method, details in methods.items():
-                if method.lower() in ('get', 'put', 'post', 'patch', 'delete'):
-                    self._generate_method(path, method, details)
+        entry = self._load_swagger() if self._generated is None else self._load_generated()
+        self._spec_entry = entry
+        self._swagger = entry['spec']
+        self._operations = entry['operations']
+
+    @property
+    def _xml_lists(self) -> FrozenSet[str]:
+        """
+        Get the tags of xml elements that are lists
+        :return: Tags
+        """
+        return frozenset()
 
 
 class JamfClassic(Jamf):
@@ -321,6 +3057,7 @@ class JamfClassic(Jamf):
             'User-Agent': 'lynx',
         }
 
+        self._swagger_path = '/classicapi/doc/swagger.yaml'
         self._load_api_methods()
 
         self._auth_base = '/api'
@@ -328,56 +3065,184 @@ class JamfClassic(Jamf):
 
         self._authenticate()
 
-    def _fetch_swagger_yaml(self) -> Dict[str, Any]:
+    @staticmethod
+    def _parse_swagger(text: str) -> Dict[str, Any]:
         """
-        Fetch the swagger docs from teh api url
+        Parse the swagger docs
+        :param text: swagger.yaml contents
         :return: Swagger defination
         """
-        swagger_url = f'{self._api_url}/classicapi/doc/swagger.yaml'
-        response = self._session.get(swagger_url)
-        if response.status_code == 200:
-            swagger_data = yaml.safe_load(response.text)
-            self._base_path = swagger_data['basePath'].rstrip('/')
-            return swagger_data
-        raise SwaggerDocsError(f'Failed to fetch Swagger YAML: {response.status_code} {response.text}')
+        return yaml.safe_load(text)
 
-    def _generate_method(self, path: str, method: str, details: Dict[str, Any]) -> None:
+    def _read_swagger(self, swagger_data: Dict[str, Any]) -> None:
         """
-        Generate a function for each url path
-        Create a doc string with parameters
+        Read the paths needed from the swagger docs
+        :param swagger_data: Swagger defination
+        :return: None
+        """
+        self._base_path = swagger_data['basePath'].rstrip('/')
+
+    @classmethod
+    def _operation_name(cls, path: str, method: str, details: Dict[str, Any]) -> str:
+        """
+        Name the method for an endpoint
         :param path: Path to the api endpoint
         :param method: Method (get, etc)
         :param details: All details of the end point,
-        :return: None
+        :return: Method name
         """
         operation_id = details.get('operationId', f'{method}_{path.replace("/", "_")}').replace('-', '_')
-        operation_id = self._to_snake_case(operation_id)
+        operation_id = cls._to_snake_case(operation_id)
         tag = details.get('tags', ['jamf'])[0]
+        return f'{tag}_{operation_id}'
 
-        def api_method(*args: Any, **kwargs: Any) -> APIResponse:
-            self._authenticate()
-            try:
-                url = f'{self._api_url}{self._base_path}{path}'.format_map(kwargs)
-            except KeyError as err:
-                raise ValueError(f'Missing parameter for URL: {err}')
-            response = self._session.request(
-                method.upper(),
-                url,
-                headers=self._headers,
-                data=kwargs.get('data'),
-                timeout=self._timeout,
-                verify=self._verify
-            )
-            success = 200 <= response.status_code < 300
-            return APIResponse(success, response.url, response.text, response.status_code)
+    @property
+    def _xml_lists(self) -> FrozenSet[str]:
+        """
+        Get the tags of xml elements that are lists, from the definitions in the swagger docs
+        Worked out on first use and kept with the swagger docs
+        :return: Tags
+        """
+        xml_lists = self._spec_entry.get('xml_lists')
+        if xml_lists is None:
+            xml_lists = set()
+
+            def walk(name: str, schema: Dict[str, Any]) -> None:
+                if not isinstance(schema, dict):
+                    return
+                if schema.get('type') == 'array':
+                    xml_lists.add(schema.get('xml', {}).get('name', name))
+                    walk(name, schema.get('items', {}))
+                for property_name, property_schema in schema.get('properties', {}).items():
+                    walk(property_name, property_schema)
+
+            for definition_name, definition in self._swagger.get('definitions', {}).items():
+                walk(definition_name, definition)
+            xml_lists = self._spec_entry['xml_lists'] = frozenset(xml_lists)
+        return xml_lists
+
+    def sections(self, endpoint: Union[str, Callable[..., APIResponse]]) -> List[str]:
+        """
+        Get the subsets an endpoint can be projected to, from the definition of its response
+        :param endpoint: The api method or its name
+        :return: Subsets, ie. ['General', 'Hardware', 'ExtensionAttributes']
+        """
+        endpoint = self._endpoint(endpoint if isinstance(endpoint, str) else endpoint.__name__)
+        definitions = self._swagger.get('definitions', {})
+        schema = endpoint.details.get('responses', {}).get('200', {}).get('schema', {})
+        reference = schema.get('$ref', '') if isinstance(schema, dict) else ''
+        definition = definitions.get(reference.split('/')[-1]) or definitions.get(endpoint.resource[:-1], {})
+        return [self._subset_name(name) for name in definition.get('properties', {})]
+
+    @staticmethod
+    def _subset_name(section: str) -> str:
+        """
+        Name a section as the classic subset paths do
+        :param section: Section, ie. extension_attributes or ExtensionAttributes
+        :return: Subset, ie. ExtensionAttributes
+        """
+        return ''.join(part[:1].upper() + part[1:] for part in section.split('_'))
+
+    def _projection(self, endpoint: Endpoint, sections: List[str]) -> Tuple[Callable[..., APIResponse], Dict[str, Any]]:
+        """
+        Find the /subset/{subset} version of an endpoint
+        :param endpoint: Endpoint
+        :param sections: Sections wanted
+        :return: The subset api method and its subset parameter
+        """
+        subset_path = f'{endpoint.path.rstrip("/")}/subset/{{subset}}'
+        method = endpoint.method.lower()
+        name = next((name for name, (path, operation_method, _) in self._operations.items()
+                     if path == subset_path and operation_method == method), None)
+        if name is None:
+            raise ValueError(f'{endpoint.name} has no subset endpoint')
+        return getattr(self, name), {'subset': '&'.join(self._subset_name(section) for section in sections)}
+
+    def iter_xml(self, endpoint: Union[str, Callable[..., APIResponse]], item_tag: Optional[str] = None,
+                 **kwargs: Any) -> Iterator[Any]:
+        """
+        Stream an endpoint as xml, returning each item as it is read so large lists are held in constant memory
+        api.iter_xml('computers_find_computers_basic') returns each computer in /computers/subset/basic
+        :param endpoint: The api method or its name
+        :param item_tag: Tag of the items to return, at any depth, otherwise each child of the root element
+        :param kwargs: Parameters for the endpoint
+        :return: Each item
+        """
+        endpoint = self._endpoint(endpoint if isinstance(endpoint, str) else endpoint.__name__)
+        list_tags = self._xml_lists
+
+        url, request_args = self._request_args(endpoint, kwargs)
+        parser = ET.XMLPullParser(events=('start', 'end'))
+        depth = 0
+        root = None
+        # The None after the last chunk closes the parser, which raises if the document was cut short
+        for chunk in itertools.chain(self._stream(endpoint, url, request_args, 'application/xml', 1 << 16), [None]):
+            if chunk is None:
+                parser.close()
+            else:
+                parser.feed(chunk)
+            for event, element in parser.read_events():
+                if event == 'start':
+                    depth += 1
+                    if root is None:
+                        root = element
+                    continue
+
+                depth -= 1
+                if item_tag is not None:
+                    if element.tag == item_tag:
+                        yield xml_to_dict(element, list_tags)
+                        element.clear()
+                elif depth == 1 and element.tag != 'size':
+                    yield xml_to_dict(element, list_tags)
+                if depth == 1:
+                    # Drop the items already returned
+                    root.clear()
+
+    def _request_args(self, endpoint: Endpoint, kwargs: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        """
+        Build the url and request arguments for a call to an endpoint
+        :param endpoint: Endpoint
+        :param kwargs: Arguments passed to the api method
+        :return: url and request arguments
+        """
+        url = endpoint.format_url(kwargs)
+        if self._validate_params and len(kwargs) > len(endpoint.keys):
+            endpoint.check_params([key for key in kwargs if key not in endpoint.keys and key not in BODY_KWARGS])
+        return url, self._body_args(kwargs, False)
 
-        api_method._name__ = f'{tag}_{operation_id}'
-        api_method._doc__ = f'{details.get("summary", "No description available.")}\n{self._api_url}JSSResource{path}\n'
+    def _method_doc(self, path: str, details: Dict[str, Any]) -> str:
+        """
+        Create a doc string with parameters
+        :param path: Path to the api endpoint
+        :param details: All details of the end point,
+        :return: Doc string
+        """
+        doc = f'{details.get("summary", "No description available.")}\n{self._api_url}JSSResource{path}\n'
         for param in details.get('parameters', []):
-            api_method._doc__ += f':param {param["name"]}: {param.get("description", "")}\n'
-        api_method._doc__ += ':return: API response'
+            doc += f':param {param["name"]}: {param.get("description", "")}\n'
+        doc += ':return: API response'
+        return doc
+
+    def _generate_method(self, endpoint: Endpoint) -> Callable[..., APIResponse]:
+        """
+        Generate a function for the url path
+        :param endpoint: Endpoint
+        :return: The api method
+        """
+        request_args = self._request_args
+        request = self._request
+
+        def api_method(*args: Any, **kwargs: Any) -> APIResponse:
+            if endpoint.deprecated and not endpoint.warned:
+                endpoint.warned = True
+                self._warn_deprecated(endpoint.name, endpoint.details)
+            return request(endpoint, *request_args(endpoint, kwargs))
+
+        api_method.__name__ = api_method.__qualname__ = endpoint.name
+        api_method.__doc__ = self._method_doc(endpoint.path, endpoint.details)
 
-        setattr(self, f'{tag}_{operation_id}', api_method)
+        return api_method
 
 
 class JamfUAPI(Jamf):
@@ -394,36 +3259,149 @@ class JamfUAPI(Jamf):
             'Content-Type': 'application/json',
             'User-Agent': 'lynx',
         }
+        self._swagger_path = '/api/schema/'
         self._load_api_methods()
 
         self._auth_base = self._base_path
 
         self._authenticate()
 
-    def _fetch_swagger_yaml(self) -> Dict[str, Any]:
+    @staticmethod
+    def _parse_swagger(text: str) -> Dict[str, Any]:
         """
-        Fetch the swagger docs from teh api url
+        Parse the swagger docs
+        :param text: Schema json
         :return: Swagger defination
         """
-        swagger_url = f'{self._api_url}/api/schema/'
-        response = self._session.get(swagger_url)
-        if response.status_code == 200:
-            swagger_data = json.loads(response.text)
-            self._base_path = swagger_data['servers'][0]['url']
-            self._auth_path = next((security[key][0] for security in swagger_data['security'] for key in security if len(security[key]) > 0), None)
-            return swagger_data
-        raise SwaggerDocsError(f'Failed to fetch Swagger YAML: {response.status_code} {response.text}')
+        return json.loads(text)
 
-    def _generate_method(self, path: str, method: str, details: Dict[str, Any]) -> None:
+    def _read_swagger(self, swagger_data: Dict[str, Any]) -> None:
         """
-        Generate a function for each url path
-        Create a doc string with parameters
-        :param path: Path to the api endpoint
-        :param method: Method (get, etc)
-        :param details: All details of the end point,
+        Read the paths needed from the swagger docs
+        :param swagger_data: Swagger defination
         :return: None
         """
+        self._base_path = swagger_data['servers'][0]['url']
+        self._auth_path = next((security[key][0] for security in swagger_data['security'] for key in security if len(security[key]) > 0), None)
+
+    def _bulk_endpoints(self, name: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Find the endpoints to get many records by id with, /v1/computers-inventory and /v1/computers-inventory/{id}
+        :param name: Method name, by id or the list endpoint
+        :return: Filterable list endpoint and the endpoint by id, None for those there are not
+        """
+        endpoint = self._endpoint(name)
+        list_path = endpoint.path[:-len('/{id}')] if endpoint.path.endswith('/{id}') else endpoint.path
+        names = {(path, method): operation_name for operation_name, (path, method, _) in self._operations.items()}
+        list_name = names.get((list_path, 'get'))
+        by_id_name = names.get((f'{list_path}/{{id}}', 'get'))
+        if list_name is not None and 'filter' not in (self._endpoint(list_name).query or ()):
+            list_name = None
+        return list_name, by_id_name
+
+    def sections(self, endpoint: Union[str, Callable[..., APIResponse]]) -> List[str]:
+        """
+        Get the sections an endpoint can be projected to, from its section parameter
+        :param endpoint: The api method or its name
+        :return: Sections, ie. ['GENERAL', 'HARDWARE']
+        """
+        endpoint = self._endpoint(endpoint if isinstance(endpoint, str) else endpoint.__name__)
+        parameter = self._section_parameter(endpoint)
+        if parameter is None:
+            return []
+        schema = parameter.get('schema', parameter)
+        return list(schema.get('items', {}).get('enum', schema.get('enum', [])))
+
+    def _section_parameter(self, endpoint: Endpoint) -> Optional[Dict[str, Any]]:
+        """
+        Get the section parameter of an endpoint
+        :param endpoint: Endpoint
+        :return: Parameter, None if it has none
+        """
+        parameters = self._parameters(self._swagger['paths'][endpoint.path], endpoint.details) or []
+        return next((parameter for parameter in parameters
+                     if parameter.get('name') == 'section' and parameter.get('in') == 'query'), None)
+
+    def _projection(self, endpoint: Endpoint, sections: List[str]) -> Tuple[Callable[..., APIResponse], Dict[str, Any]]:
+        """
+        Map the sections to the section parameter of an endpoint
+        :param endpoint: Endpoint
+        :param sections: Sections wanted
+        :return: The api method and its section parameter
+        """
+        if self._section_parameter(endpoint) is None:
+            raise ValueError(f'{endpoint.name} has no section parameter')
+        available = self.sections(endpoint.name)
+        wanted = [self._to_snake_case(section).upper() for section in sections]
+        unknown = [section for section in wanted if available and section not in available]
+        if unknown:
+            raise ValueError(f'Unknown section for {endpoint.name}: {", ".join(unknown)} '
+                             f'(accepts {", ".join(available)})')
+        return getattr(self, endpoint.name), {'section': wanted}
+
+    def iter_pages(self, endpoint: Union[str, Callable[..., APIResponse]], page_size: int = 100,
+                   prefetch: bool = True, **kwargs: Any) -> Iterator[APIResponse]:
+        """
+        Walk the pages of a list endpoint, following totalCount
+        While a page is being consumed the next one is fetched on a background thread
+        :param endpoint: The api method or its name, ie. scripts_get_v1_scripts
+        :param page_size: Results per page
+        :param prefetch: Fetch the next page while the current one is consumed
+        :param kwargs: Parameters for the endpoint, ie. sort, filter
+        :return: Each page, a failed page is the last one returned
+        """
+        api_method = getattr(self, endpoint) if isinstance(endpoint, str) else endpoint
+        page = int(kwargs.pop('page', 0))
+        page_size = int(kwargs.pop('page-size', page_size))
+
+        def fetch(number: int) -> APIResponse:
+            return api_method(**kwargs, **{'page': number, 'page-size': page_size})
+
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        try:
+            served = 0
+            response = fetch(page)
+            while True:
+                results = response.json.get('results', []) if response.success and isinstance(response.json, dict) else []
+                total = response.json.get('totalCount', 0) if results else 0
+                # The server can cap page-size, so the size of the first page is the size of the pages that follow
+                served = served or len(results)
+                more = bool(results) and len(results) == served and (page + 1) * served < total
+
+                upcoming = executor.submit(fetch, page + 1) if more and executor else None
+                yield response
+                if not more:
+                    break
+
+                page += 1
+                response = upcoming.result() if upcoming else fetch(page)
+        finally:
+            if executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    def iter_results(self, endpoint: Union[str, Callable[..., APIResponse]], page_size: int = 100,
+                     prefetch: bool = True, **kwargs: Any) -> Iterator[Dict[str, Any]]:
+        """
+        Walk the results of a list endpoint one record at a time, only a page is held in memory
+        :param endpoint: The api method or its name, ie. computer_inventory_get_v1_computers_inventory
+        :param page_size: Results per page
+        :param prefetch: Fetch the next page while the current one is consumed
+        :param kwargs: Parameters for the endpoint, ie. sort, filter, section
+        :return: Each record
+        """
+        for response in self.iter_pages(endpoint, page_size, prefetch, **kwargs):
+            if not response.success:
+                raise PageError(f'Failed to get page: {response.http_code} {response.url} {response.data}')
+            yield from response.json.get('results', [])
 
+    @classmethod
+    def _function_name(cls, path: str, method: str) -> str:
+        """
+        Name the method for an endpoint, without the tag
+        :param path: Path to the api endpoint
+        :param method: Method (get, etc)
+        :return: Function name
+        """
         # Use friendly names
         methods = {
             'post': 'create',
@@ -434,53 +3412,76 @@ class JamfUAPI(Jamf):
 
         function_name = f'{methods.get(method, method)}{path.replace("/", "_").replace("-", "_")}'
         function_name = re.sub(r'(_*\{[A-z]+\})', '', function_name)
-        function_name = self._to_snake_case(function_name)
+        function_name = cls._to_snake_case(function_name)
         if len(keys) > 0:
             function_name += '_by_' + '_'.join(keys)
+        return function_name
 
+    @classmethod
+    def _operation_name(cls, path: str, method: str, details: Dict[str, Any]) -> str:
+        """
+        Name the method for an endpoint
+        :param path: Path to the api endpoint
+        :param method: Method (get, etc)
+        :param details: All details of the end point,
+        :return: Method name
+        """
         tag = details.get('tags', ['jamf'])[0].replace("-", "_")
+        return f'{tag}_{cls._function_name(path, method)}'
 
-        def api_method(*args: Any, **kwargs: Any) -> APIResponse:
-            self._authenticate()
-            if details.get('deprecated', False):
-                deprecation_date = details.get('x-deprecation-date', 'Unknown date')
-                warnings.warn(
-                    f'⚠️ WARNING: The endpoint `{function_name}` is DEPRECATED as of {deprecation_date}.',
-                    DeprecationWarning,
-                    stacklevel=2
-                )
+    def _request_args(self, endpoint: Endpoint, kwargs: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        """
+        Build the url and request arguments for a call to an endpoint
+        :param endpoint: Endpoint
+        :param kwargs: Arguments passed to the api method
+        :return: url and request arguments
+        """
+        url = endpoint.format_url(kwargs)
 
-            try:
-                url = f'{self._api_url}{self._base_path}{path}'.format_map(kwargs)
-            except KeyError as err:
-                raise ValueError(f'Missing parameter for URL: {err}')
-
-            # Get optional params, passed as keywords
-            params = kwargs.copy()
-            for key in keys:
-                params.pop(key, None)
-            params.pop('data', None)
-
-            response = self._session.request(
-                method.upper(),
-                url,
-                params=params,
-                headers=self._headers,
-                json=kwargs.get('data'),
-                timeout=self._timeout,
-                verify=self._verify
-            )
-            success = 200 <= response.status_code < 300
-            return APIResponse(success, response.url, response.text, response.status_code)
+        # Get optional params, passed as keywords
+        if endpoint.keys or not BODY_KWARGS.isdisjoint(kwargs):
+            params = {key: value for key, value in kwargs.items()
+                      if key not in endpoint.keys and key not in BODY_KWARGS}
+        else:
+            params = kwargs
+        if self._validate_params and params:
+            endpoint.check_params(params)
 
-        api_method._name__ = function_name
-        api_method._doc__ = f'{details.get("summary", "No description available.")}\n'
-        api_method._doc__ += f'{self._api_url}{self._base_path}{path}\n'
-        api_method._doc__ += f'Requires permissions: {",".join(details.get("x-required-privileges", []))}\n'
+        return url, {'params': params, **self._body_args(kwargs, True)}
+
+    def _method_doc(self, path: str, details: Dict[str, Any]) -> str:
+        """
+        Create a doc string with parameters
+        :param path: Path to the api endpoint
+        :param details: All details of the end point,
+        :return: Doc string
+        """
+        doc = f'{details.get("summary", "No description available.")}\n'
+        doc += f'{self._api_url}{self._base_path}{path}\n'
+        doc += f'Requires permissions: {",".join(details.get("x-required-privileges", []))}\n'
         for param in details.get('parameters', []):
             if 'name' in param:
-                api_method._doc__ += f':param {param["name"]}: {param.get("description", "")}\n'
-        api_method._doc__ += ':return: API response'
+                doc += f':param {param["name"]}: {param.get("description", "")}\n'
+        doc += ':return: API response'
+        return doc
+
+    def _generate_method(self, endpoint: Endpoint) -> Callable[..., APIResponse]:
+        """
+        Generate a function for the url path
+        :param endpoint: Endpoint
+        :return: The api method
+        """
+        function_name = self._function_name(endpoint.path, endpoint.method.lower())
+        request_args = self._request_args
+        request = self._request
+
+        def api_method(*args: Any, **kwargs: Any) -> APIResponse:
+            if endpoint.deprecated and not endpoint.warned:
+                endpoint.warned = True
+                self._warn_deprecated(function_name, endpoint.details)
+            return request(endpoint, *request_args(endpoint, kwargs))
+
+        api_method.__name__ = api_method.__qualname__ = endpoint.name
+        api_method.__doc__ = self._method_doc(endpoint.path, endpoint.details)
 
-        if not self._hide_deprecated or not details.get('deprecated', False):
-            setattr(self, f'{tag}_{function_name}', api_method)
+        return api_method
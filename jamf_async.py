@@ -0,0 +1,497 @@
+#!/usr/bin/env python3
+
+"""
+Script:	jamf_async.py
+Date:	2026-10-16
+Platform: macOS/Linux
+Description:
+asyncio versions of the Jamf classes, the generated methods are coroutines sharing one connection pool
+Requires httpx
+"""
+__author__ = 'thedzy'
+__copyright__ = 'Copyright 2020, thedzy'
+__license__ = 'GPL'
+__version__ = '2.0'
+__maintainer__ = 'thedzy'
+__email__ = 'thedzy@hotmail.com'
+__status__ = 'Development'
+
+import asyncio
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+from jamf import (APIResponse, AuthenticationError, Endpoint, JamfClassic, JamfUAPI, Multipart, PageError,
+                  token_lifetime)
+
+# Same statuses and back off as the retry strategy of the synchronous session
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+RETRY_TOTAL = 3
+RETRY_BACKOFF = 1.0
+# Seconds before expiry the token is renewed
+TOKEN_MARGIN = 60
+
+
+async def _aiter_body(body: Any, chunk_size: int = 1 << 16) -> AsyncIterator[bytes]:
+    """
+    Read a file object or iterator as an async iterator, the only kind of stream httpx.AsyncClient sends
+    :param body: File object or iterator of bytes
+    :param chunk_size: Bytes read at a time from a file object
+    :return: Each chunk
+    """
+    if hasattr(body, 'read'):
+        while True:
+            chunk = body.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    else:
+        for chunk in body:
+            yield chunk
+
+
+class AsyncJamf:
+    """
+    Shared asyncio logic, makes the generated methods coroutines
+    The swagger docs are loaded when the class is created, authentication happens on the first call
+    """
+
+    def _post_init(self):
+        """
+        Extra initialization
+        """
+        if httpx is None:
+            raise ImportError('The async Jamf classes require httpx: pip install httpx')
+        # Options only the synchronous classes have, rejected rather than silently ignored
+        # The token is fetched and renewed on the event loop, so a TokenManager cannot be shared with these classes,
+        # and a RateLimiter blocks the thread waiting for a turn, which here would be the event loop
+        unsupported = [key for key in ('cache', 'conditional_requests', 'coalesce', 'hedge', 'token_manager',
+                                       'rate_limiter') if self._options.get(key)]
+        if unsupported:
+            # The token manager given was attached to before this check
+            token_manager, self._token_manager = self._token_manager, None
+            if token_manager is not None:
+                token_manager.release()
+            raise ValueError(f'{", ".join(unsupported)} not supported by the async classes')
+        self._coalesce = False
+
+        self._client: Optional['httpx.AsyncClient'] = None
+        self._auth_lock = asyncio.Lock()
+        self._token_expiry: float = 0
+
+        super()._post_init()
+
+    async def __aenter__(self) -> 'AsyncJamf':
+        """
+        Enter method for async context management.
+        :return: The current class instance.
+        """
+        return self
+
+    async def __aexit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
+        """
+        Exit method for async context management.
+        :param exc_type: Exception type (if any).
+        :param exc_val: Exception value (if any).
+        :param exc_tb: Traceback object (if any).
+        """
+        await self.logout_async()
+
+    def _authenticate(self) -> None:
+        """
+        Authentication is done on the event loop by _authenticate_async
+        :return: None
+        """
+        pass
+
+    def _get_client(self) -> 'httpx.AsyncClient':
+        """
+        Get the connection pool, created on first use so it belongs to the running loop
+        :return: Client
+        """
+        if self._client is None:
+            limits = httpx.Limits(max_connections=self._max_connections,
+                                  max_keepalive_connections=self._max_connections)
+            self._client = httpx.AsyncClient(
+                timeout=self._timeout,
+                verify=self._verify,
+                transport=httpx.AsyncHTTPTransport(retries=RETRY_TOTAL, verify=self._verify, limits=limits)
+            )
+        return self._client
+
+    async def _authenticate_async(self) -> None:
+        """
+        Authenticate to the api if pass the expiry time
+        Only one coroutine refreshes the token, the others wait for it
+        :return: None
+        """
+        if 'Authorization' in self._headers and time.time() < self._token_expiry:
+            return
+
+        async with self._auth_lock:
+            if 'Authorization' in self._headers and time.time() < self._token_expiry:
+                return
+
+            client = self._get_client()
+            if self._token_expiry == 0 or 'Authorization' not in self._headers:
+                auth_url = f'{self._api_url}{self._auth_base}{self._auth_path}'
+                self._logger.debug(f'Authenticating to {auth_url}')
+                response = await client.post(auth_url, auth=(self._username, self._password),
+                                             headers={'Accept': 'application/json'})
+            else:
+                auth_url = f'{self._api_url}{self._auth_base}{self._auth_path}'.replace('/token', '/keep-alive')
+                self._logger.debug(f'Authenticating to {auth_url}')
+                response = await client.post(auth_url, headers=self._headers)
+
+            if response.status_code != 200:
+                raise AuthenticationError(f'Authentication failed: {response.status_code} {response.text}')
+            data = response.json()
+            self._headers['Authorization'] = f'Bearer {data.get("token")}'
+            self._token_expiry = time.time() + token_lifetime(data, response.headers.get('Date')) - TOKEN_MARGIN
+
+    async def logout_async(self) -> None:
+        """
+        De-authenticate and close the connection pool
+        :return: None
+        """
+        if 'Authorization' in self._headers:
+            de_auth_url = f'{self._api_url}{self._auth_base}{self._auth_path}'.replace('/token', '/invalidate-token')
+            self._logger.debug(f'De-authenticating to {de_auth_url}')
+            response = await self._get_client().post(de_auth_url, headers={
+                'Authorization': self._headers['Authorization'],
+                'Accept': '*/*'
+            })
+            if response.status_code != 204:
+                raise AuthenticationError(f'De-Authentication failed: {response.status_code} {response.text}')
+            _ = self._headers.pop('Authorization', None)
+
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+        self._username = None
+        self._password = None
+
+    async def _request_async(self, method: str, url: str, request_args: Dict[str, Any],
+                             trace: Optional[Dict[str, Any]] = None) -> 'httpx.Response':
+        """
+        Send a request, retrying throttled and failed requests
+        :param method: Method (GET, etc)
+        :param url: url
+        :param request_args: Request arguments from _request_args
+        :param trace: Dictionary to add the retries to
+        :return: Response
+        """
+        trace = {} if trace is None else trace
+        trace.setdefault('retries', 0)
+        if request_args.get('download') is not None:
+            raise ValueError('download= is not supported by the async classes')
+        headers = {**self._headers, **request_args.get('headers', {})}
+        body = request_args.get('data')
+        # A streamed body is sent once, it is not retried
+        streamed = hasattr(body, 'read') or hasattr(body, '__next__')
+        if streamed and hasattr(body, '__len__'):
+            headers['Content-Length'] = str(len(body))
+        args = {}
+        if request_args.get('params'):
+            args['params'] = {key: value for key, value in request_args['params'].items() if value is not None}
+        if request_args.get('json') is not None:
+            args['json'] = request_args['json']
+        if body is not None:
+            args['content'] = _aiter_body(body) if streamed else body
+
+        client = self._get_client()
+        for attempt in range(RETRY_TOTAL + 1):
+            response = await client.request(method, url, headers=headers, **args)
+            if response.status_code not in RETRY_STATUSES or attempt == RETRY_TOTAL or streamed:
+                return response
+
+            retry_after = response.headers.get('Retry-After', '')
+            delay = float(retry_after) if retry_after.isdigit() else RETRY_BACKOFF * (2 ** attempt)
+            self._logger.debug(f'Retrying {url} in {delay}s after {response.status_code}')
+            trace['retries'] += 1
+            await asyncio.sleep(delay)
+
+    async def map(self, endpoint: Union[str, Callable[..., Awaitable[APIResponse]]], items: Iterable[Dict[str, Any]],
+                  concurrency: int = 8, ordered: bool = True,
+                  progress: Optional[Callable[[int, int], None]] = None
+                  ) -> AsyncIterator[Tuple[Dict[str, Any], APIResponse]]:
+        """
+        Call an endpoint for many sets of parameters as tasks on the event loop
+        A failed call does not stop the others, its response has success False and the error in err
+        :param endpoint: The api method or its name, ie. computers_find_computers_by_id
+        :param items: Parameters for each call, ie. [{'id': 1}, {'id': 2}]
+        :param concurrency: Calls in flight at once
+        :param ordered: Return in the order of items, otherwise as they complete
+        :param progress: Called with (completed, total) after each call
+        :return: (parameters, response) for each call
+        """
+        api_method = getattr(self, endpoint) if isinstance(endpoint, str) else endpoint
+        items = list(items)
+        total = len(items)
+
+        async def call(kwargs: Dict[str, Any]) -> APIResponse:
+            try:
+                return await api_method(**kwargs)
+            except Exception as err:
+                return APIResponse(False, err=f'{type(err).__name__}: {err}')
+
+        # Authenticate once up front rather than in every task
+        await self._authenticate_async()
+
+        tasks: Dict[asyncio.Task, int] = {}
+        finished: Dict[int, APIResponse] = {}
+        submitted = completed = returned = 0
+        try:
+            while submitted < total or tasks:
+                while submitted < total and len(tasks) < concurrency:
+                    tasks[asyncio.ensure_future(call(items[submitted]))] = submitted
+                    submitted += 1
+
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    index = tasks.pop(task)
+                    completed += 1
+                    if progress:
+                        progress(completed, total)
+                    if ordered:
+                        finished[index] = task.result()
+                    else:
+                        yield items[index], task.result()
+
+                while returned in finished:
+                    yield items[returned], finished.pop(returned)
+                    returned += 1
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def bulk_get(self, endpoint: Union[str, Callable[..., Awaitable[APIResponse]]], ids: Iterable[Any],
+                       **kwargs: Any) -> Dict[Any, Any]:
+        """
+        Get the records for many ids in as few requests as possible, see iter_bulk
+        :param endpoint: The api method or its name, by id or the list endpoint
+        :param ids: Ids of the records
+        :param kwargs: Options of iter_bulk and parameters for the endpoint
+        :return: Records by id, ids that were not found are left out
+        """
+        return {record_id: record async for record_id, record in self.iter_bulk(endpoint, ids, **kwargs)}
+
+    async def iter_bulk(self, endpoint: Union[str, Callable[..., Awaitable[APIResponse]]], ids: Iterable[Any],
+                        batch_size: int = 100, concurrency: int = 8, id_field: str = 'id',
+                        **kwargs: Any) -> AsyncIterator[Tuple[Any, Any]]:
+        """
+        Get the records for many ids in as few requests as possible, rather than one call per id
+        Where the list endpoint takes a filter the ids are fetched in batches with id=in=(...), otherwise the endpoint
+        is called for each id
+        :param endpoint: The api method or its name, by id or the list endpoint
+        :param ids: Ids of the records
+        :param batch_size: Ids per filtered request
+        :param concurrency: Requests in flight at once
+        :param id_field: Field of the records with the id, for the filter
+        :param kwargs: Parameters for the endpoint, ie. section
+        :return: (id, record) as each is returned, ids that were not found are left out
+        """
+        ids = list(dict.fromkeys(ids))
+        list_name, by_id_name, batches, items = self._bulk_plan(endpoint, ids, batch_size, id_field, kwargs)
+        if list_name is None:
+            async for record_id, record in self._iter_each(by_id_name, ids, concurrency, kwargs):
+                yield record_id, record
+            return
+
+        by_text = {str(record_id): record_id for record_id in ids}
+        async for params, response in self.map(list_name, items, concurrency, ordered=False):
+            if not response.success:
+                batch = batches[params['filter']]
+                if response.http_code == 400 and by_id_name is not None:
+                    # The field cannot be filtered on, get this batch one at a time
+                    self._logger.debug(f'Filter not accepted by {list_name}, fetching {len(batch)} ids one at a time')
+                    async for record_id, record in self._iter_each(by_id_name, batch, concurrency, kwargs):
+                        yield record_id, record
+                    continue
+                raise PageError(f'Failed to get page: {response.http_code} {response.url} {response.data}')
+            for record in response.json.get('results', []):
+                record_id = by_text.get(str(record.get(id_field)) if isinstance(record, dict) else None)
+                if record_id is not None:
+                    yield record_id, record
+
+    async def _iter_each(self, endpoint: Union[str, Callable[..., Awaitable[APIResponse]]], ids: List[Any],
+                         concurrency: int, kwargs: Dict[str, Any]) -> AsyncIterator[Tuple[Any, Any]]:
+        """
+        Get the records for many ids with a call per id
+        :param endpoint: The api method or its name
+        :param ids: Ids of the records
+        :param concurrency: Calls in flight at once
+        :param kwargs: Parameters for the endpoint
+        :return: (id, record) as each is returned, ids that were not found are left out
+        """
+        keys = self._endpoint(endpoint if isinstance(endpoint, str) else endpoint.__name__).keys
+        key = 'id' if 'id' in keys or len(keys) != 1 else next(iter(keys))
+        items = [{**kwargs, key: record_id} for record_id in ids]
+        async for params, response in self.map(endpoint, items, concurrency, ordered=False):
+            if response.success:
+                data = response.json
+                # Classic records are wrapped in their type, ie. {'computer': {...}}
+                if isinstance(data, dict) and len(data) == 1:
+                    data = next(iter(data.values()))
+                yield params[key], data
+            elif response.http_code != 404:
+                raise PageError(f'Failed to get {params[key]}: {response.http_code} {response.url} '
+                                f'{response.err or response.data}')
+
+    def process_map(self, function: Union[str, Callable[..., Any]], items: Iterable[Any],
+                    processes: Optional[int] = None, chunksize: int = 1) -> Iterator[Any]:
+        """
+        Not available, the methods of the async classes are coroutines that cannot be run in the worker processes
+        Use map, or JamfClassic/JamfUAPI.process_map
+        """
+        raise TypeError(f'process_map is only available on the synchronous classes, not {type(self).__name__}')
+
+    def iter_download(self, endpoint: Union[str, Callable[..., Any]], chunk_size: int = 1 << 20,
+                      progress: Optional[Callable[[int, Optional[int]], None]] = None,
+                      **kwargs: Any) -> Iterator[bytes]:
+        """
+        Not available, streaming a response is only done by the synchronous classes
+        """
+        raise TypeError(f'iter_download is only available on the synchronous classes, not {type(self).__name__}')
+
+    def _generate_method(self, endpoint: Endpoint) -> Callable[..., Awaitable[APIResponse]]:
+        """
+        Generate a coroutine for the url path
+        :param endpoint: Endpoint
+        :return: The api coroutine
+        """
+        name, tag, method = endpoint.name, endpoint.tag, endpoint.method
+
+        async def api_method(*args: Any, **kwargs: Any) -> APIResponse:
+            if endpoint.deprecated and not endpoint.warned:
+                endpoint.warned = True
+                self._warn_deprecated(name, endpoint.details)
+            url, request_args = self._request_args(endpoint, kwargs)
+            for hook in self._hooks['request']:
+                hook(name, method, url, request_args)
+            begin = time.perf_counter()
+            if self._circuit_breaker is not None:
+                self._circuit_breaker.before(name)
+            try:
+                await self._authenticate_async()
+            except BaseException:
+                if self._circuit_breaker is not None:
+                    self._circuit_breaker.release(name)
+                raise
+            elapsed = {'auth': time.perf_counter() - begin}
+            trace = {'retries': 0}
+            start = time.perf_counter()
+            try:
+                response = await self._request_async(method, url, request_args, trace)
+            except Exception:
+                if self._metrics is not None:
+                    self._metrics.record(name, tag, time.perf_counter() - start, None)
+                if self._circuit_breaker is not None:
+                    self._circuit_breaker.record(name, None)
+                raise
+            except BaseException:
+                if self._circuit_breaker is not None:
+                    self._circuit_breaker.release(name)
+                raise
+            finally:
+                if isinstance(request_args.get('data'), Multipart):
+                    request_args['data'].close()
+            if self._circuit_breaker is not None:
+                self._circuit_breaker.record(name, response.status_code)
+            success = 200 <= response.status_code < 300
+            api_response = APIResponse(success, str(response.url), self._response_body(response),
+                                       response.status_code, list_tags=self._xml_lists, elapsed=elapsed)
+            if self._metrics is not None:
+                self._metrics.record(name, tag, time.perf_counter() - start, response.status_code,
+                                     len(response.content), trace['retries'])
+            elapsed['total'] = time.perf_counter() - begin
+            return self._finish(name, method, api_response)
+
+        api_method.__name__ = api_method.__qualname__ = name
+        api_method.__doc__ = self._method_doc(endpoint.path, endpoint.details)
+
+        return api_method
+
+
+class AsyncJamfClassic(AsyncJamf, JamfClassic):
+    """
+    JamfClassic with coroutine methods
+
+    async with AsyncJamfClassic(url, username, password) as api:
+        responses = await asyncio.gather(*(api.computers_find_computers_by_id(id=i) for i in ids))
+    """
+
+    def iter_xml(self, endpoint: Union[str, Callable[..., Any]], item_tag: Optional[str] = None,
+                 **kwargs: Any) -> Iterator[Any]:
+        """
+        Not available, streaming a response is only done by the synchronous classes
+        """
+        raise TypeError(f'iter_xml is only available on the synchronous classes, not {type(self).__name__}')
+
+
+class AsyncJamfUAPI(AsyncJamf, JamfUAPI):
+    """
+    JamfUAPI with coroutine methods and async paging
+    """
+
+    async def iter_pages(self, endpoint: Union[str, Callable[..., Awaitable[APIResponse]]], page_size: int = 100,
+                         prefetch: bool = True, **kwargs: Any) -> AsyncIterator[APIResponse]:
+        """
+        Walk the pages of a list endpoint, following totalCount
+        While a page is being consumed the next one is fetched as a task
+        :param endpoint: The api method or its name, ie. scripts_get_v1_scripts
+        :param page_size: Results per page
+        :param prefetch: Fetch the next page while the current one is consumed
+        :param kwargs: Parameters for the endpoint, ie. sort, filter
+        :return: Each page, a failed page is the last one returned
+        """
+        api_method = getattr(self, endpoint) if isinstance(endpoint, str) else endpoint
+        page = int(kwargs.pop('page', 0))
+        page_size = int(kwargs.pop('page-size', page_size))
+
+        def fetch(number: int) -> Awaitable[APIResponse]:
+            return api_method(**kwargs, **{'page': number, 'page-size': page_size})
+
+        upcoming: Optional[asyncio.Task] = None
+        try:
+            served = 0
+            response = await fetch(page)
+            while True:
+                results = response.json.get('results', []) if response.success and isinstance(response.json, dict) else []
+                total = response.json.get('totalCount', 0) if results else 0
+                # The server can cap page-size, so the size of the first page is the size of the pages that follow
+                served = served or len(results)
+                more = bool(results) and len(results) == served and (page + 1) * served < total
+
+                upcoming = asyncio.ensure_future(fetch(page + 1)) if more and prefetch else None
+                yield response
+                if not more:
+                    break
+
+                page += 1
+                response = await upcoming if upcoming else await fetch(page)
+                upcoming = None
+        finally:
+            if upcoming is not None and not upcoming.done():
+                upcoming.cancel()
+
+    async def iter_results(self, endpoint: Union[str, Callable[..., Awaitable[APIResponse]]], page_size: int = 100,
+                           prefetch: bool = True, **kwargs: Any) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Walk the results of a list endpoint one record at a time, only a page is held in memory
+        :param endpoint: The api method or its name, ie. computer_inventory_get_v1_computers_inventory
+        :param page_size: Results per page
+        :param prefetch: Fetch the next page while the current one is consumed
+        :param kwargs: Parameters for the endpoint, ie. sort, filter, section
+        :return: Each record
+        """
+        async for response in self.iter_pages(endpoint, page_size, prefetch, **kwargs):
+            if not response.success:
+                raise PageError(f'Failed to get page: {response.http_code} {response.url} {response.data}')
+            for result in response.json.get('results', []):
+                yield result
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+
+"""
+Script:	jamf_codegen.py
+Date:	2026-10-16
+Platform: macOS/Linux
+Description:
+Write a python module with a method per endpoint from a saved swagger.yaml (classic) or schema json (Jamf Pro API)
+The module holds the swagger docs, so its class starts without fetching them and editors can complete the methods
+"""
+__author__ = 'thedzy'
+__copyright__ = 'Copyright 2020, thedzy'
+__license__ = 'GPL'
+__version__ = '1.0'
+__maintainer__ = 'thedzy'
+__email__ = 'thedzy@hotmail.com'
+__status__ = 'Development'
+
+import argparse
+import json
+import keyword
+import os
+import pprint
+import re
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+import yaml
+
+import jamf
+
+# Class and swagger path by the kind of docs, the swagger path is checked when the module is loaded
+APIS: Dict[str, Tuple[Type[jamf.Jamf], str]] = {
+    'classic': (jamf.JamfClassic, '/classicapi/doc/swagger.yaml'),
+    'uapi': (jamf.JamfUAPI, '/api/schema/'),
+}
+TYPES = {'integer': 'int', 'number': 'float', 'boolean': 'bool', 'string': 'str'}
+# Names that cannot be parameters of the generated methods, they are still accepted through kwargs
+RESERVED = frozenset(('self', 'kwargs')) | jamf.BODY_KWARGS
+
+
+def load_spec(path: str) -> Dict[str, Any]:
+    """
+    Read saved swagger docs, json or yaml
+    :param path: File
+    :return: Swagger definition
+    """
+    with open(path) as file:
+        text = file.read()
+    try:
+        spec = json.loads(text)
+    except ValueError:
+        spec = yaml.safe_load(text)
+    # Round trip through json so only plain types are written (yaml can produce dates)
+    return json.loads(json.dumps(spec, default=str))
+
+
+def resolve(spec: Dict[str, Any], parameter: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Resolve a parameter that is a $ref
+    :param spec: Swagger definition
+    :param parameter: Parameter
+    :return: Parameter, None if the reference could not be resolved
+    """
+    reference = parameter.get('$ref')
+    if reference is None:
+        return parameter
+    for part in reference.lstrip('#/').split('/'):
+        spec = spec.get(part) if isinstance(spec, dict) else None
+    return spec if isinstance(spec, dict) else None
+
+
+def annotation(parameter: Dict[str, Any]) -> str:
+    """
+    Python type of a parameter
+    :param parameter: Parameter, swagger 2 (type) or OpenAPI 3 (schema)
+    :return: Annotation
+    """
+    schema = parameter.get('schema', parameter)
+    if schema.get('type') == 'array':
+        return f'List[{TYPES.get(schema.get("items", {}).get("type"), "Any")}]'
+    return TYPES.get(schema.get('type'), 'Any')
+
+
+def clean(text: Any) -> str:
+    """
+    Make text safe for a docstring, on one line
+    :param text: Text
+    :return: Text
+    """
+    return ' '.join(str(text).split()).replace('\\', '\\\\').replace('"""', "'''")
+
+
+def method_source(spec: Dict[str, Any], name: str, path: str, method: str) -> str:
+    """
+    Write the method for an endpoint
+    :param spec: Swagger definition
+    :param name: Method name
+    :param path: Path to the api endpoint
+    :param method: Method (get, etc)
+    :return: Source, indented for a class
+    """
+    path_item = spec['paths'][path]
+    details = path_item[method]
+    parameters = [resolve(spec, parameter) for parameter in path_item.get('parameters', []) +
+                  details.get('parameters', [])]
+    parameters = {parameter['name']: parameter for parameter in parameters if parameter and 'name' in parameter}
+
+    arguments: List[str] = []
+    keyword_arguments: List[str] = []
+    passed: List[str] = []
+    docs: List[str] = []
+    for key in re.findall(r'{([A-z]+)}', path):
+        if key.isidentifier() and not keyword.iskeyword(key) and key not in RESERVED:
+            arguments.append(f'{key}: {annotation(parameters.get(key, {}))}')
+            passed.append(key)
+        docs.append(f':param {key}: {clean(parameters.get(key, {}).get("description", ""))}')
+    for parameter in parameters.values():
+        key = parameter['name']
+        if parameter.get('in') != 'query':
+            continue
+        default = parameter.get('schema', parameter).get('default')
+        description = clean(parameter.get('description', ''))
+        if default is not None:
+            description = f'{description} (default {clean(default)})'.strip()
+        docs.append(f':param {key}: {description}')
+        if key.isidentifier() and not keyword.iskeyword(key) and key not in RESERVED:
+            keyword_arguments.append(f'{key}: Optional[{annotation(parameter)}] = None')
+            passed.append(key)
+    if method in ('post', 'put', 'patch'):
+        keyword_arguments.append('data: Any = None')
+        passed.append('data')
+        docs.append(':param data: Request body')
+
+    signature = ['self'] + arguments + (['*'] + keyword_arguments if keyword_arguments else []) + ['**kwargs: Any']
+    start = f'    def {name}('
+    end = ') -> jamf.APIResponse:'
+    if len(start) + len(', '.join(signature)) + len(end) > 120:
+        signature = f',\n{" " * len(start)}'.join(signature)
+    else:
+        signature = ', '.join(signature)
+    lines = [clean(details.get('summary', 'No description available.')), f'{method.upper()} {path}']
+    if details.get('x-required-privileges'):
+        lines.append(f'Requires permissions: {clean(", ".join(details["x-required-privileges"]))}')
+    if details.get('deprecated'):
+        since = details.get('x-deprecation-date')
+        lines.append(f'Deprecated since {clean(since)}' if since else 'Deprecated')
+    lines += docs + [':return: API response']
+    arguments_dict = ', '.join([f"'{key}': {key}" for key in passed] + ['**kwargs'])
+
+    source = f'{start}{signature}{end}\n'
+    source += '        """\n' + ''.join(f'        {line}'.rstrip() + '\n' for line in lines) + '        """\n'
+    source += f"        return self._call('{name}', {{{arguments_dict}}})\n"
+    return source
+
+
+def generate(spec: Dict[str, Any], source: str) -> str:
+    """
+    Write the module for swagger docs
+    :param spec: Swagger definition
+    :param source: Name of the file the docs were read from, for the header
+    :return: Module source
+    """
+    api = 'uapi' if 'openapi' in spec else 'classic'
+    cls, swagger_path = APIS[api]
+    operations = cls._index_operations(spec)
+    version = str(spec.get('info', {}).get('version', ''))
+
+    methods = '\n'.join(method_source(spec, name, path, method) for name, (path, method, _) in
+                        sorted(operations.items()))
+    return f'''#!/usr/bin/env python3
+
+"""
+Generated by jamf_codegen.py from {os.path.basename(source)}, {clean(spec.get('info', {}).get('title', ''))} {version}
+Do not edit, generate it again for a new version of the server
+"""
+
+import sys
+from typing import Any, List, Optional
+
+import jamf
+
+SWAGGER_PATH = {swagger_path!r}
+VERSION = {version!r}
+
+
+class {cls.__name__}(jamf.{cls.__name__}):
+    """
+    {cls.__name__} with a method per endpoint, using the swagger docs in this module rather than fetching them
+    """
+
+    def __init__(self, api_url: str, username: str, password: str, **kwargs: Any) -> None:
+        kwargs.setdefault('generated', sys.modules[__name__])
+        super().__init__(api_url, username, password, **kwargs)
+
+{methods}
+
+# Operation name: (path, method, deprecated)
+OPERATIONS = {pprint.pformat(operations, width=120)}
+
+SPEC = {pprint.pformat(spec, width=120, sort_dicts=False)}
+'''
+
+
+def main():
+    spec = load_spec(options.spec)
+    output = options.output or f'jamf_{"uapi" if "openapi" in spec else "classic"}_generated.py'
+    source = generate(spec, options.spec)
+    # Compiled before it is written, so a bad spec does not leave a broken module
+    compile(source, output, 'exec')
+    with open(output, 'w') as file:
+        file.write(source)
+    print(f'Wrote {output}')
+
+
+if __name__ == '__main__':
+    # Create argument parser
+    parser = argparse.ArgumentParser(description='Write a python module with a method per endpoint from swagger docs')
+
+    parser.add_argument('spec', help='saved swagger.yaml (classic) or schema json (Jamf Pro API)')
+    parser.add_argument('-o', '--output', default=None, dest='output',
+                        help='module to write, default jamf_classic_generated.py or jamf_uapi_generated.py')
+
+    options = parser.parse_args()
+    main()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+
+"""
+Script:	jamf_fleet.py
+Date:	2026-10-16
+Platform: macOS/Linux
+Description:
+Run the same call across many Jamf servers at once, the results are tagged with the tenant they came from
+Servers running the same version share one parsed copy of the swagger docs
+"""
+__author__ = 'thedzy'
+__copyright__ = 'Copyright 2020, thedzy'
+__license__ = 'GPL'
+__version__ = '1.0'
+__maintainer__ = 'thedzy'
+__email__ = 'thedzy@hotmail.com'
+__status__ = 'Development'
+
+import argparse
+import concurrent.futures
+import json
+import logging
+import queue
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple, Type
+
+import jamf
+
+# Marks the end of a tenants records in the iter_results queue
+_DONE = object()
+
+
+class JamfFleet:
+    """
+    A client per tenant, with calls run across all of them concurrently
+
+    fleet = JamfFleet({'east': {'url': ..., 'username': ..., 'password': ...}, 'west': {...}})
+    scripts = fleet.call('scripts_get_v1_scripts', **{'page-size': 200})  # {'east': APIResponse, 'west': APIResponse}
+    for tenant, computer in fleet.iter_results('computer_inventory_get_v1_computers_inventory'):
+        print(tenant, computer['general']['name'])
+    """
+
+    def __init__(self, tenants: Dict[str, Dict[str, Any]], cls: Type[jamf.Jamf] = jamf.JamfUAPI,
+                 concurrency: int = 16, tenant_concurrency: int = 4, **kwargs: Any) -> None:
+        """
+        Initialisation
+        The clients are created concurrently, a tenant that cannot be reached is left out and its error kept in errors
+        :param tenants: Tenant name: url, username, password and any options for its client
+        :param cls: Class of the clients, JamfUAPI or JamfClassic
+        :param concurrency: Tenants called at once
+        :param tenant_concurrency: Requests in flight to one tenant, unless it is given its own rate_limiter
+        :param kwargs: Options for every client, ie. timeout, spec_cache_dir
+        """
+        self._logger = logging.getLogger(__name__)
+        self._concurrency: int = concurrency
+        self.clients: Dict[str, jamf.Jamf] = {}
+        self.errors: Dict[str, Exception] = {}
+
+        def create(name: str) -> jamf.Jamf:
+            options = {**kwargs, **tenants[name]}
+            # A limiter per tenant caps the requests to that server, however many calls share the client
+            options.setdefault('rate_limiter', jamf.RateLimiter(concurrency=tenant_concurrency,
+                                                                max_concurrency=tenant_concurrency))
+            return cls(options.pop('url'), options.pop('username'), options.pop('password'), **options)
+
+        for name, client in self._run(create, tenants).items():
+            self.clients[name] = client
+        self._logger.info(f'Connected to {len(self.clients)} of {len(tenants)} tenants')
+
+    def _run(self, function: Callable[[str], Any], names: Iterable[str]) -> Dict[str, Any]:
+        """
+        Call a function for each tenant on a pool of threads, the errors are kept rather than raised
+        :param function: Function, called with the tenant name
+        :param names: Tenant names
+        :return: Tenant name: result, for those that succeeded
+        """
+        self.errors = {}
+        results = {}
+        names = list(names)
+        if not names:
+            return results
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(self._concurrency, len(names))) as executor:
+            futures = {executor.submit(function, name): name for name in names}
+            for future in concurrent.futures.as_completed(futures):
+                name = futures[future]
+                try:
+                    results[name] = future.result()
+                except Exception as err:
+                    self._logger.warning(f'{name} failed: {err}')
+                    self.errors[name] = err
+        return {name: results[name] for name in names if name in results}
+
+    def _tenants(self, tenants: Optional[Iterable[str]]) -> Iterable[str]:
+        """
+        Tenants to call
+        :param tenants: Tenant names, defaults to all
+        :return: Tenant names
+        """
+        return self.clients if tenants is None else [name for name in tenants if name in self.clients]
+
+    def run(self, function: Callable[[jamf.Jamf], Any], tenants: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """
+        Run a function against each tenants client concurrently
+        fleet.run(lambda api: api.sections('computer_inventory_get_v1_computers_inventory'))
+        :param function: Function, called with the client
+        :param tenants: Tenant names, defaults to all
+        :return: Tenant name: result, failed tenants are in errors
+        """
+        return self._run(lambda name: function(self.clients[name]), self._tenants(tenants))
+
+    def call(self, endpoint: str, tenants: Optional[Iterable[str]] = None,
+             **kwargs: Any) -> Dict[str, jamf.APIResponse]:
+        """
+        Call an api method on each tenant
+        :param endpoint: Method name, ie. scripts_get_v1_scripts
+        :param tenants: Tenant names, defaults to all
+        :param kwargs: Parameters for the endpoint
+        :return: Tenant name: API response
+        """
+        return self.run(lambda api: getattr(api, endpoint)(**kwargs), tenants)
+
+    def iter_results(self, endpoint: str, tenants: Optional[Iterable[str]] = None, page_size: int = 100,
+                     buffer: int = 1000, **kwargs: Any) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Walk the pages of a list endpoint on every tenant at once, returning the records as they arrive
+        A tenant that fails part way is kept in errors, the records already returned from it stand
+        :param endpoint: Method name, ie. computer_inventory_get_v1_computers_inventory
+        :param tenants: Tenant names, defaults to all
+        :param page_size: Results per page
+        :param buffer: Records held waiting to be consumed before the walks pause
+        :param kwargs: Parameters for the endpoint, ie. sort, filter, section
+        :return: (tenant name, record)
+        """
+        names = list(self._tenants(tenants))
+        records: queue.Queue = queue.Queue(maxsize=buffer)
+        stop = threading.Event()
+
+        def walk(name: str) -> None:
+            try:
+                for record in self.clients[name].iter_results(endpoint, page_size=page_size, **kwargs):
+                    if stop.is_set():
+                        return
+                    records.put((name, record))
+            finally:
+                records.put((name, _DONE))
+
+        self.errors = {}
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(self._concurrency, len(names))))
+        futures = {executor.submit(walk, name): name for name in names}
+        try:
+            remaining = len(names)
+            while remaining:
+                name, record = records.get()
+                if record is _DONE:
+                    remaining -= 1
+                    continue
+                yield name, record
+        finally:
+            # Drain the queue so walks blocked on a full queue see stop and finish
+            stop.set()
+            while any(not future.done() for future in futures):
+                try:
+                    records.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            executor.shutdown()
+            for future, name in futures.items():
+                if future.exception() is not None:
+                    self._logger.warning(f'{name} failed: {future.exception()}')
+                    self.errors[name] = future.exception()
+
+    def versions(self) -> Dict[str, Optional[str]]:
+        """
+        Version of the swagger docs each tenant is running
+        :return: Tenant name: version
+        """
+        return {name: client._spec_entry.get('version') for name, client in self.clients.items()}
+
+    def logout(self) -> None:
+        """
+        Log out of every tenant
+        :return: None
+        """
+        self._run(lambda name: self.clients[name].logout(), self.clients)
+
+    def __enter__(self) -> 'JamfFleet':
+        return self
+
+    def __exit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
+        self.logout()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO if options.verbose else logging.WARNING)
+    with open(options.tenants) as file:
+        tenants = json.load(file)
+    cls = jamf.JamfClassic if options.classic else jamf.JamfUAPI
+    parameters = dict(parameter.split('=', 1) for parameter in options.parameters)
+
+    with JamfFleet(tenants, cls, concurrency=options.concurrency) as fleet:
+        if options.all_pages:
+            for tenant, record in fleet.iter_results(options.endpoint, page_size=options.page_size, **parameters):
+                print(json.dumps({'tenant': tenant, 'record': record}))
+        else:
+            for tenant, response in fleet.call(options.endpoint, **parameters).items():
+                print(json.dumps({'tenant': tenant, 'code': response.http_code, 'response': response.json}))
+        for tenant, error in fleet.errors.items():
+            print(json.dumps({'tenant': tenant, 'error': str(error)}))
+
+
+if __name__ == '__main__':
+    # Create argument parser
+    parser = argparse.ArgumentParser(description='Run a call across many Jamf servers, printing json lines by tenant')
+
+    parser.add_argument('tenants', help='json file of tenant name: {"url", "username", "password"}')
+    parser.add_argument('endpoint', help='api method, ie. scripts_get_v1_scripts')
+    parser.add_argument('parameters', nargs='*', metavar='name=value', help='parameters for the endpoint')
+    parser.add_argument('-c', '--classic', action='store_true', default=False, dest='classic',
+                        help='use the classic api')
+    parser.add_argument('-a', '--all-pages', action='store_true', default=False, dest='all_pages',
+                        help='walk every page, printing each record')
+    parser.add_argument('-s', '--page-size', default=100, type=int, dest='page_size', help='results per page')
+    parser.add_argument('-j', '--concurrency', default=16, type=int, dest='concurrency', help='tenants called at once')
+    parser.add_argument('-v', '--verbose', action='store_true', default=False, dest='verbose', help='log progress')
+
+    options = parser.parse_args()
+    main()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+
+"""
+Script:	jamf_sync.py
+Date:	2026-10-16
+Platform: macOS/Linux
+Description:
+Incremental sync of the computer and mobile device inventory into a local sqlite database
+Only the records changed since the last sync are fetched, deleted records are found by comparing ids
+"""
+__author__ = 'thedzy'
+__copyright__ = 'Copyright 2020, thedzy'
+__license__ = 'GPL'
+__version__ = '1.0'
+__maintainer__ = 'thedzy'
+__email__ = 'thedzy@hotmail.com'
+__status__ = 'Development'
+
+import argparse
+import getpass
+import json
+import logging
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import jamf
+
+# How each kind of record is fetched and stored
+# endpoint: list endpoint, id: field with the record id, updated: field changed on each inventory update (used in the
+# filter), name/serial: fields copied to indexed columns, sections: sections fetched, id_sections: sections fetched
+# when only the ids are needed
+KINDS: Dict[str, Dict[str, Any]] = {
+    'computers': {
+        'endpoint': 'computer_inventory_get_v1_computers_inventory',
+        'id': 'id',
+        'updated': 'general.reportDate',
+        'name': 'general.name',
+        'serial': 'hardware.serialNumber',
+        'sections': ['GENERAL', 'HARDWARE', 'OPERATING_SYSTEM', 'USER_AND_LOCATION'],
+        'id_sections': ['GENERAL'],
+    },
+    'mobile_devices': {
+        'endpoint': 'mobile_devices_get_v2_mobile_devices_detail',
+        'id': 'mobileDeviceId',
+        'updated': 'general.lastInventoryUpdateDate',
+        'name': 'general.displayName',
+        'serial': 'hardware.serialNumber',
+        'sections': ['GENERAL', 'HARDWARE'],
+        'id_sections': ['GENERAL'],
+    },
+}
+
+
+def field(record: Dict[str, Any], path: str) -> Any:
+    """
+    Get a field of a record by its dotted path
+    :param record: Record
+    :param path: Path, ie. general.reportDate
+    :return: Value, None if missing
+    """
+    value: Any = record
+    for part in path.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+class InventorySync:
+    """
+    Keeps a sqlite database in step with the inventory of a server
+
+    sync = InventorySync(api, 'inventory.db')
+    sync.sync()
+    sync.query('SELECT name FROM records WHERE kind = ? AND updated < ?', ('computers', '2024-01-01'))
+    """
+
+    def __init__(self, api: jamf.JamfUAPI, path: str, kinds: Optional[Dict[str, Dict[str, Any]]] = None,
+                 page_size: int = 1000, batch_size: int = 100) -> None:
+        """
+        Initialisation
+        :param api: Jamf Pro API client
+        :param path: sqlite file
+        :param kinds: Kinds of record to sync, defaults to KINDS
+        :param page_size: Records per page
+        :param batch_size: Ids per id=in=(...) filter when fetching records missed by the date filter
+        """
+        self._logger = logging.getLogger(__name__)
+        self._api = api
+        self._kinds: Dict[str, Dict[str, Any]] = kinds or KINDS
+        self._page_size: int = page_size
+        self._batch_size: int = batch_size
+
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('CREATE TABLE IF NOT EXISTS records (kind TEXT, id TEXT, updated TEXT, name TEXT, '
+                         'serial TEXT, synced REAL, data TEXT, PRIMARY KEY (kind, id))')
+        self._db.execute('CREATE INDEX IF NOT EXISTS records_updated ON records (kind, updated)')
+        self._db.execute('CREATE INDEX IF NOT EXISTS records_name ON records (kind, name)')
+        self._db.execute('CREATE INDEX IF NOT EXISTS records_serial ON records (kind, serial)')
+        self._db.execute('CREATE TABLE IF NOT EXISTS sync_state (kind TEXT PRIMARY KEY, updated TEXT, '
+                         'synced REAL, full_synced REAL)')
+
+    def sync(self, kinds: Optional[Iterable[str]] = None, full: bool = False) -> Dict[str, Dict[str, Any]]:
+        """
+        Sync each kind of record
+        :param kinds: Kinds to sync, defaults to all
+        :param full: Fetch every record rather than the changes
+        :return: By kind, counts of the records fetched and deleted
+        """
+        return {kind: self.sync_kind(kind, full) for kind in (kinds or self._kinds)}
+
+    def sync_kind(self, kind: str, full: bool = False) -> Dict[str, Any]:
+        """
+        Sync one kind of record
+        The records updated since the newest one held are fetched, then the ids on the server are compared to those
+        held to remove the deleted records and fetch any new ones the date filter missed
+        :param kind: Kind of record, ie. computers
+        :param full: Fetch every record rather than the changes
+        :return: Counts of the records fetched and deleted, and if it was a full sync
+        """
+        config = self._kinds[kind]
+        start = time.perf_counter()
+        state = self._db.execute('SELECT updated FROM sync_state WHERE kind = ?', (kind,)).fetchone()
+        watermark = state[0] if state and not full else None
+
+        if watermark is None:
+            self._logger.info(f'Full sync of {kind}')
+            fetched = self._store(kind, self._fetch(config, section=config['sections']))
+            server_ids = set(fetched)
+        else:
+            # Compared with =ge= so records updated in the same second as the watermark are not missed
+            self._logger.info(f'Syncing {kind} updated since {watermark}')
+            fetched = self._store(kind, self._fetch(config, section=config['sections'],
+                                                    filter=f'{config["updated"]}=ge="{watermark}"'))
+            server_ids = {str(field(record, config['id'])) for record in
+                          self._fetch(config, section=config['id_sections'])}
+
+        local_ids = {row[0] for row in self._db.execute('SELECT id FROM records WHERE kind = ?', (kind,))}
+        deleted = local_ids - server_ids
+        missing = sorted(server_ids - local_ids - set(fetched), key=lambda value: (len(value), value))
+        for index in range(0, len(missing), self._batch_size):
+            batch = missing[index:index + self._batch_size]
+            fetched.update(self._store(kind, self._fetch(config, section=config['sections'],
+                                                         filter=f'{config["id"]}=in=({",".join(batch)})')))
+
+        self._db.execute('BEGIN')
+        self._db.executemany('DELETE FROM records WHERE kind = ? AND id = ?', ((kind, id_) for id_ in deleted))
+        newest = self._db.execute('SELECT MAX(updated) FROM records WHERE kind = ?', (kind,)).fetchone()[0]
+        now = time.time()
+        self._db.execute('INSERT INTO sync_state (kind, updated, synced, full_synced) VALUES (?, ?, ?, ?) '
+                         'ON CONFLICT (kind) DO UPDATE SET updated = excluded.updated, synced = excluded.synced, '
+                         'full_synced = COALESCE(excluded.full_synced, sync_state.full_synced)',
+                         (kind, newest, now, now if watermark is None else None))
+        self._db.execute('COMMIT')
+
+        result = {'fetched': len(fetched), 'deleted': len(deleted), 'full': watermark is None,
+                  'seconds': time.perf_counter() - start}
+        self._logger.info(f'Synced {kind}: {result}')
+        return result
+
+    def _fetch(self, config: Dict[str, Any], **kwargs: Any) -> Iterator[Dict[str, Any]]:
+        """
+        Walk the pages of a kinds list endpoint
+        :param config: Kind of record
+        :param kwargs: Parameters for the endpoint, ie. section, filter
+        :return: Each record
+        """
+        return self._api.iter_results(config['endpoint'], page_size=self._page_size,
+                                      sort=f'{config["id"]}:asc', **kwargs)
+
+    def _store(self, kind: str, records: Iterable[Dict[str, Any]]) -> Dict[str, None]:
+        """
+        Write records, a page at a time
+        :param kind: Kind of record
+        :param records: Records
+        :return: Ids written
+        """
+        config = self._kinds[kind]
+        written: Dict[str, None] = {}
+        rows: List[tuple] = []
+        now = time.time()
+        for record in records:
+            record_id = str(field(record, config['id']))
+            written[record_id] = None
+            rows.append((kind, record_id, field(record, config['updated']), field(record, config['name']),
+                         field(record, config['serial']), now, json.dumps(record)))
+            if len(rows) >= self._page_size:
+                self._write(rows)
+                rows = []
+        if rows:
+            self._write(rows)
+        return written
+
+    def _write(self, rows: List[tuple]) -> None:
+        """
+        Insert or replace rows in one transaction
+        :param rows: Rows of the records table
+        :return: None
+        """
+        self._db.execute('BEGIN')
+        self._db.executemany('INSERT OR REPLACE INTO records (kind, id, updated, name, serial, synced, data) '
+                             'VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+        self._db.execute('COMMIT')
+
+    def get(self, kind: str, record_id: Any) -> Optional[Dict[str, Any]]:
+        """
+        Get a record
+        :param kind: Kind of record
+        :param record_id: Record id
+        :return: Record, None if not held
+        """
+        row = self._db.execute('SELECT data FROM records WHERE kind = ? AND id = ?', (kind, str(record_id))).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def records(self, kind: str) -> Iterator[Dict[str, Any]]:
+        """
+        Get every record of a kind
+        :param kind: Kind of record
+        :return: Each record
+        """
+        for row in self._db.execute('SELECT data FROM records WHERE kind = ? ORDER BY id', (kind,)):
+            yield json.loads(row[0])
+
+    def query(self, sql: str, parameters: Iterable[Any] = ()) -> List[tuple]:
+        """
+        Run a query against the database, the records table has kind, id, updated, name, serial, synced and data
+        (the record as json, for json_extract)
+        :param sql: SQL
+        :param parameters: Parameters
+        :return: Rows
+        """
+        return self._db.execute(sql, tuple(parameters)).fetchall()
+
+    def close(self) -> None:
+        """
+        Close the database
+        :return: None
+        """
+        self._db.close()
+
+    def __enter__(self) -> 'InventorySync':
+        return self
+
+    def __exit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
+        self.close()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO if options.verbose else logging.WARNING)
+    password = options.password or getpass.getpass(f'Password for {options.username}: ')
+    with jamf.JamfUAPI(options.url, options.username, password) as api, InventorySync(api, options.database) as sync:
+        for kind, result in sync.sync(options.kinds or None, full=options.full).items():
+            print(f'{kind}: {result["fetched"]} fetched, {result["deleted"]} deleted'
+                  f'{" (full)" if result["full"] else ""} in {result["seconds"]:.1f}s')
+
+
+if __name__ == '__main__':
+    # Create argument parser
+    parser = argparse.ArgumentParser(description='Sync the inventory of a Jamf server into a sqlite database')
+
+    parser.add_argument('database', help='sqlite file')
+    parser.add_argument('-u', '--url', required=True, dest='url', help='server url')
+    parser.add_argument('-n', '--username', required=True, dest='username', help='api username')
+    parser.add_argument('-p', '--password', default=None, dest='password', help='api password, prompted if missing')
+    parser.add_argument('-k', '--kind', action='append', default=[], choices=list(KINDS), dest='kinds',
+                        help='kind of record to sync, default all')
+    parser.add_argument('-f', '--full', action='store_true', default=False, dest='full',
+                        help='fetch every record rather than the changes')
+    parser.add_argument('-v', '--verbose', action='store_true', default=False, dest='verbose', help='log progress')
+
+    options = parser.parse_args()
+    main()
@@ -0,0 +1,680 @@
+#!/usr/bin/env python3
+
+"""
+Script:	mock_jamf.py
+Date:	2026-10-16
+Platform: macOS/Linux
+Description:
+A local stand-in for a Jamf Pro server, for exercising and benchmarking the jamf classes without an instance
+"""
+__author__ = 'thedzy'
+__copyright__ = 'Copyright 2020, thedzy'
+__license__ = 'GPL'
+__version__ = '1.0'
+__maintainer__ = 'thedzy'
+__email__ = 'thedzy@hotmail.com'
+__status__ = 'Development'
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from email.parser import BytesParser
+from email.policy import default
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qs, urlsplit
+from xml.sax.saxutils import escape
+
+import yaml
+
+CLASSIC_RESOURCES = ('computers', 'mobiledevices', 'scripts', 'categories', 'buildings', 'departments', 'policies')
+UAPI_RESOURCES = ('scripts', 'categories', 'buildings', 'departments')
+INVENTORY_SECTIONS = ('GENERAL', 'HARDWARE', 'OPERATING_SYSTEM', 'USER_AND_LOCATION', 'APPLICATIONS')
+
+
+def classic_swagger() -> Dict[str, Any]:
+    """
+    Build a Classic API swagger definition in the shape Jamf serves it
+    :return: Swagger definition
+    """
+    paths = {}
+    for resource in CLASSIC_RESOURCES:
+        singular = resource[:-1] if resource.endswith('s') else resource
+        title = resource.capitalize()
+        paths[f'/{resource}'] = {
+            'get': {'tags': [resource], 'summary': f'Finds all {resource}', 'operationId': f'find{title}'},
+        }
+        paths[f'/{resource}/id/{{id}}'] = {
+            'get': {'tags': [resource], 'summary': f'Finds {resource} by ID', 'operationId': f'find{title}ById',
+                    'parameters': [{'name': 'id', 'in': 'path', 'required': True, 'type': 'integer',
+                                    'description': 'ID value to filter by'}]},
+            'post': {'tags': [resource], 'summary': f'Creates a new {singular} by ID',
+                     'operationId': f'create{singular.capitalize()}ById',
+                     'parameters': [{'name': 'id', 'in': 'path', 'required': True, 'type': 'integer'}]},
+            'put': {'tags': [resource], 'summary': f'Updates an existing {singular} by ID',
+                    'operationId': f'update{singular.capitalize()}ById',
+                    'parameters': [{'name': 'id', 'in': 'path', 'required': True, 'type': 'integer'}]},
+            'delete': {'tags': [resource], 'summary': f'Deletes a {singular} by ID',
+                       'operationId': f'delete{singular.capitalize()}ById',
+                       'parameters': [{'name': 'id', 'in': 'path', 'required': True, 'type': 'integer'}]},
+        }
+        paths[f'/{resource}/id/{{id}}/subset/{{subset}}'] = {
+            'get': {'tags': [resource], 'summary': f'Finds {resource} by ID, subset',
+                    'operationId': f'find{title}ByIdSubset',
+                    'parameters': [{'name': 'id', 'in': 'path', 'required': True, 'type': 'integer'},
+                                   {'name': 'subset', 'in': 'path', 'required': True, 'type': 'string',
+                                    'description': 'Subset values to filter by. Subset values can also be appended '
+                                                   'using an ampersand to return multiple subsets '
+                                                   '(e.g. /subsets/General&Hardware)'}]},
+        }
+    paths['/computers/subset/basic'] = {
+        'get': {'tags': ['computers'], 'summary': 'Finds all computers with basic details',
+                'operationId': 'findComputersBasic'},
+    }
+
+    definitions = {
+        'computers': {
+            'type': 'array',
+            'items': {'$ref': '#/definitions/computer'},
+            'xml': {'name': 'computers', 'wrapped': True},
+        },
+        'computer': {
+            'type': 'object',
+            'properties': {
+                'general': {'type': 'object', 'properties': {'id': {'type': 'integer'}, 'name': {'type': 'string'}}},
+                'extension_attributes': {'type': 'array', 'xml': {'wrapped': True},
+                                         'items': {'type': 'object', 'xml': {'name': 'extension_attribute'}}},
+                'software': {'type': 'object', 'properties': {
+                    'applications': {'type': 'array', 'xml': {'wrapped': True},
+                                     'items': {'type': 'object', 'xml': {'name': 'application'}}}}},
+            },
+        },
+    }
+
+    return {
+        'swagger': '2.0',
+        'info': {'title': 'Jamf Classic API', 'version': '10.50.0'},
+        'basePath': '/JSSResource/',
+        'paths': paths,
+        'definitions': definitions,
+    }
+
+
+def uapi_schema() -> Dict[str, Any]:
+    """
+    Build a Jamf Pro API OpenAPI schema in the shape Jamf serves it
+    :return: OpenAPI definition
+    """
+    paging = [
+        {'name': 'page', 'in': 'query', 'schema': {'type': 'integer', 'default': 0}},
+        {'name': 'page-size', 'in': 'query', 'schema': {'type': 'integer', 'default': 100}},
+        {'name': 'sort', 'in': 'query', 'schema': {'type': 'array', 'items': {'type': 'string'}}},
+        {'name': 'filter', 'in': 'query', 'schema': {'type': 'string'}},
+    ]
+    id_param = [{'name': 'id', 'in': 'path', 'required': True, 'schema': {'type': 'string'}}]
+    paths = {}
+    for resource in UAPI_RESOURCES:
+        tag = resource
+        paths[f'/v1/{resource}'] = {
+            'get': {'tags': [tag], 'summary': f'Search for {resource}', 'parameters': paging,
+                    'x-required-privileges': [f'Read {resource.capitalize()}']},
+            'post': {'tags': [tag], 'summary': f'Create a {resource[:-1]}',
+                     'x-required-privileges': [f'Create {resource.capitalize()}']},
+        }
+        paths[f'/v1/{resource}/{{id}}'] = {
+            'get': {'tags': [tag], 'summary': f'Get a {resource[:-1]}', 'parameters': id_param},
+            'put': {'tags': [tag], 'summary': f'Replace a {resource[:-1]}', 'parameters': id_param},
+            'delete': {'tags': [tag], 'summary': f'Delete a {resource[:-1]}', 'parameters': id_param},
+        }
+    section = {'name': 'section', 'in': 'query',
+               'schema': {'type': 'array', 'default': 'GENERAL',
+                          'items': {'type': 'string', 'enum': list(INVENTORY_SECTIONS)}}}
+    paths['/v1/computers-inventory'] = {
+        'get': {'tags': ['computer-inventory'], 'summary': 'Return paginated Computer Inventory records',
+                'parameters': [section] + paging},
+    }
+    paths['/v1/computers-inventory/{id}'] = {
+        'get': {'tags': ['computer-inventory'], 'summary': 'Return a Computer Inventory record',
+                'parameters': [section] + id_param},
+    }
+    paths['/v1/computers-inventory-detail/{id}'] = {
+        'get': {'tags': ['computer-inventory'], 'summary': 'Return all sections of a computer',
+                'parameters': id_param},
+    }
+    paths['/v2/mobile-devices/detail'] = {
+        'get': {'tags': ['mobile-devices'], 'summary': 'Return paginated Mobile Device Inventory records',
+                'parameters': [{'name': 'section', 'in': 'query',
+                                'schema': {'type': 'array', 'items': {'type': 'string',
+                                                                      'enum': ['GENERAL', 'HARDWARE']}}}] + paging},
+    }
+    paths['/v1/icon'] = {
+        'post': {'tags': ['icon'], 'summary': 'Upload an icon', 'requestBody': {
+            'content': {'multipart/form-data': {'schema': {'properties': {'file': {'format': 'binary'}}}}}}},
+    }
+    paths['/v1/icon/{id}'] = {
+        'get': {'tags': ['icon'], 'summary': 'Get an icon', 'parameters': id_param},
+    }
+    paths['/v1/icon/download/{id}'] = {
+        'get': {'tags': ['icon'], 'summary': 'Download an icon',
+                'parameters': id_param + [{'name': 'res', 'in': 'query', 'schema': {'type': 'string'}}]},
+    }
+    paths['/preview/notifications/alerts'] = {
+        'get': {'tags': ['jamf-pro-notifications-preview'], 'summary': 'Get notifications', 'deprecated': True,
+                'x-deprecation-date': '2022-09-15'},
+    }
+    for auth in ('token', 'keep-alive', 'invalidate-token'):
+        paths[f'/v1/auth/{auth}'] = {'post': {'tags': ['authentication'], 'summary': f'Auth {auth}'}}
+
+    return {
+        'openapi': '3.0.1',
+        'info': {'title': 'Jamf Pro API', 'version': '10.50.0'},
+        'servers': [{'url': '/api'}],
+        'security': [{'Bearer': []}, {'Basic': ['/v1/auth/token']}],
+        'paths': paths,
+    }
+
+
+class MockState:
+    """
+    Data held by the mock server
+    """
+
+    def __init__(self, computers: int = 1000, mobile_devices: int = 500, latency: float = 0.0,
+                 throttle_rate: float = 0.0, token_lifetime: int = 1800, seed: int = 0,
+                 max_page_size: int = 0) -> None:
+        """
+        Initialisation
+        :param computers: Number of synthetic computers
+        :param mobile_devices: Number of synthetic mobile devices
+        :param latency: Seconds added to every response
+        :param throttle_rate: Fraction of requests answered with 429
+        :param token_lifetime: Seconds a token is valid
+        :param seed: Random seed, for reproducible inventories
+        :param max_page_size: Largest page-size served, as Jamf caps some endpoints, 0 for no cap
+        """
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.token_lifetime = token_lifetime
+        self.max_page_size = max_page_size
+        self.lock = threading.Lock()
+        self.tokens: Dict[str, float] = {}
+        self.requests: List[Tuple[str, str]] = []
+        self.random = random.Random(seed)
+
+        now = datetime.now(timezone.utc)
+        self.computers = {i: self._computer(i, now) for i in range(1, computers + 1)}
+        self.mobile_devices = {i: self._mobile_device(i, now) for i in range(1, mobile_devices + 1)}
+        self.icons: Dict[int, Tuple[str, bytes]] = {}
+        self.objects: Dict[str, Dict[int, Dict[str, Any]]] = {
+            resource: {i: {'id': i, 'name': f'{resource[:-1]} {i}'} for i in range(1, 21)}
+            for resource in set(CLASSIC_RESOURCES + UAPI_RESOURCES) if resource not in ('computers', 'mobiledevices')
+        }
+        self.classic_swagger = yaml.safe_dump(classic_swagger(), sort_keys=False)
+        self.uapi_schema = json.dumps(uapi_schema())
+
+    def _computer(self, i: int, now: datetime) -> Dict[str, Any]:
+        """
+        Synthetic computer inventory record
+        :param i: ID
+        :param now: Reference time
+        :return: Inventory record
+        """
+        report = now - timedelta(minutes=self.random.randint(0, 60 * 24 * 30))
+        return {
+            'id': str(i),
+            'udid': str(uuid.UUID(int=self.random.getrandbits(128))),
+            'general': {'name': f'Mac-{i:06d}', 'platform': 'Mac',
+                        'reportDate': report.strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+                        'lastContactTime': report.strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+                        'assetTag': f'A{i:06d}', 'site': {'id': '-1', 'name': 'None'}},
+            'hardware': {'make': 'Apple', 'model': 'MacBook Pro', 'serialNumber': f'C02{i:07d}',
+                         'processorType': 'Apple M2', 'totalRamMegabytes': 16384},
+            'operatingSystem': {'name': 'macOS', 'version': '14.4.1', 'build': '23E224'},
+            'userAndLocation': {'username': f'user{i}', 'realname': f'User {i}', 'email': f'user{i}@example.com'},
+            'applications': [{'name': f'App {a}.app', 'version': f'{a}.0', 'path': f'/Applications/App {a}.app'}
+                             for a in range(10)],
+        }
+
+    def _mobile_device(self, i: int, now: datetime) -> Dict[str, Any]:
+        """
+        Synthetic mobile device inventory record
+        :param i: ID
+        :param now: Reference time
+        :return: Inventory record
+        """
+        updated = now - timedelta(minutes=self.random.randint(0, 60 * 24 * 30))
+        return {
+            'mobileDeviceId': str(i),
+            'deviceType': 'iOS',
+            'general': {'displayName': f'iPad-{i:06d}',
+                        'lastInventoryUpdateDate': updated.strftime('%Y-%m-%dT%H:%M:%S.000Z')},
+            'hardware': {'model': 'iPad Pro', 'serialNumber': f'DMP{i:07d}'},
+        }
+
+
+def _classic_xml(tag: str, value: Any) -> str:
+    """
+    Serialise a value to Classic API style xml
+    :param tag: Element name
+    :param value: Value
+    :return: XML text
+    """
+    if isinstance(value, dict):
+        return f'<{tag}>{"".join(_classic_xml(k, v) for k, v in value.items())}</{tag}>'
+    if isinstance(value, list):
+        item = tag[:-1] if tag.endswith('s') else tag
+        return f'<{tag}><size>{len(value)}</size>{"".join(_classic_xml(item, v) for v in value)}</{tag}>'
+    return f'<{tag}>{escape(str(value))}</{tag}>'
+
+
+def _rsql_match(record: Dict[str, Any], rsql: str) -> bool:
+    """
+    Evaluate the small subset of RSQL used by the clients
+    :param record: Inventory record
+    :param rsql: Filter expression
+    :return: Matches
+    """
+    for clause in rsql.split(';'):
+        match = re.match(r'([\w.]+)(=in=|=ge=|=gt=|>=|>|==)\(?([^)]*)\)?', clause)
+        if not match:
+            continue
+        field, operator, value = match.groups()
+        current: Any = record
+        for part in field.split('.'):
+            current = current.get(part) if isinstance(current, dict) else None
+        value = value.strip('"')
+        if operator == '=in=':
+            if str(current) not in value.split(','):
+                return False
+        elif operator in ('=ge=', '>='):
+            if current is None or str(current) < value:
+                return False
+        elif operator in ('=gt=', '>'):
+            if current is None or str(current) <= value:
+                return False
+        elif str(current) != value:
+            return False
+    return True
+
+
+class MockJamfHandler(BaseHTTPRequestHandler):
+    """
+    Request handler answering like Jamf Pro
+    """
+    server_version = 'MockJamf/1.0'
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    state: MockState
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _send(self, code: int, body: Union[str, bytes] = '', content_type: str = 'application/json',
+              headers: Optional[Dict[str, str]] = None) -> None:
+        """
+        Send a response
+        :param code: HTTP status
+        :param body: Body text
+        :param content_type: Content type
+        :param headers: Extra headers
+        """
+        payload = body if isinstance(body, bytes) else body.encode()
+        if code == 200 and self.command == 'GET' and 'ETag' not in (headers or {}):
+            headers = {**(headers or {}), 'ETag': f'"{hashlib.md5(payload).hexdigest()}"'}
+        if code == 200 and self.headers.get('If-None-Match') and \
+                self.headers.get('If-None-Match') == (headers or {}).get('ETag'):
+            payload = b''
+            code = 304
+        self.send_response(code)
+        self.send_header('Content-Type', content_type)
+        if code != 304:
+            self.send_header('Content-Length', str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(payload)
+
+    def _authorised(self) -> bool:
+        """
+        Check the bearer token
+        :return: Token is valid
+        """
+        token = self.headers.get('Authorization', '').replace('Bearer ', '')
+        with self.state.lock:
+            return self.state.tokens.get(token, 0) > time.time()
+
+    def _new_token(self) -> None:
+        """
+        Issue a token
+        """
+        token = uuid.uuid4().hex
+        expires = time.time() + self.state.token_lifetime
+        with self.state.lock:
+            self.state.tokens[token] = expires
+        expiry = datetime.fromtimestamp(expires, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+        self._send(200, json.dumps({'token': token, 'expires': expiry}))
+
+    def _body(self) -> bytes:
+        """
+        Read the request body
+        :return: Body
+        """
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            return self.rfile.read(length)
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            data = b''
+            while True:
+                size = int(self.rfile.readline().strip(), 16)
+                if size == 0:
+                    self.rfile.readline()
+                    return data
+                data += self.rfile.read(size)
+                self.rfile.readline()
+        return b''
+
+    def _handle(self) -> None:
+        """
+        Route a request
+        """
+        state = self.state
+        url = urlsplit(self.path)
+        query = {key: values for key, values in parse_qs(url.query).items()}
+        path = url.path
+        with state.lock:
+            state.requests.append((self.command, self.path))
+        body = self._body()
+
+        if state.latency:
+            time.sleep(state.latency)
+
+        if path == '/classicapi/doc/swagger.yaml':
+            return self._send(200, state.classic_swagger, 'application/x-yaml', {'ETag': '"classic-10.50.0"'})
+        if path == '/api/schema/':
+            return self._send(200, state.uapi_schema, 'application/json', {'ETag': '"uapi-10.50.0"'})
+
+        if path == '/api/v1/auth/token':
+            if not self.headers.get('Authorization', '').startswith('Basic '):
+                return self._send(401, '{"httpStatus": 401}')
+            return self._new_token()
+        if path == '/api/v1/auth/keep-alive':
+            if not self._authorised():
+                return self._send(401, '{"httpStatus": 401}')
+            # The token renewed is no longer valid, as on a server
+            with state.lock:
+                state.tokens.pop(self.headers.get('Authorization', '').replace('Bearer ', ''), None)
+            return self._new_token()
+        if path == '/api/v1/auth/invalidate-token':
+            token = self.headers.get('Authorization', '').replace('Bearer ', '')
+            with state.lock:
+                state.tokens.pop(token, None)
+            return self._send(204)
+
+        if state.throttle_rate and state.random.random() < state.throttle_rate:
+            return self._send(429, '{"httpStatus": 429}', headers={'Retry-After': '1'})
+        if not self._authorised():
+            return self._send(401, '{"httpStatus": 401, "errors": [{"code": "INVALID_TOKEN"}]}')
+
+        if path.startswith('/JSSResource/'):
+            return self._classic(path[len('/JSSResource/'):].strip('/').split('/'), body)
+        if path.startswith('/api/'):
+            return self._uapi(path[len('/api/'):].strip('/').split('/'), query, body)
+        return self._send(404, '{"httpStatus": 404}')
+
+    def _classic(self, parts: List[str], body: bytes) -> None:
+        """
+        Answer a Classic API request
+        :param parts: Path parts below /JSSResource
+        :param body: Request body
+        """
+        state = self.state
+        resource = parts[0]
+        as_json = 'json' in self.headers.get('Accept', '')
+        if resource == 'computers':
+            # Only the requested record is converted, the inventory can be large
+            records = {}
+            if len(parts) > 2 and parts[1] == 'id' and int(parts[2]) in state.computers:
+                records[int(parts[2])] = self._classic_computer(state.computers[int(parts[2])])
+            listing = [{'id': i, 'name': c['general']['name']} for i, c in state.computers.items()]
+        else:
+            records = {i: dict(obj) for i, obj in state.objects.get(resource, {}).items()}
+            listing = [{'id': i, 'name': obj['name']} for i, obj in state.objects.get(resource, {}).items()]
+        singular = resource[:-1] if resource.endswith('s') else resource
+
+        if len(parts) == 1 and self.command == 'GET':
+            if as_json:
+                return self._send(200, json.dumps({resource: listing}))
+            return self._send(200, _classic_xml(resource, listing), 'application/xml')
+        if len(parts) == 3 and parts[1] == 'subset' and parts[2] == 'basic':
+            if as_json:
+                return self._send(200, json.dumps({resource: listing}))
+            return self._send(200, _classic_xml(resource, listing), 'application/xml')
+        if len(parts) >= 3 and parts[1] == 'id':
+            object_id = int(parts[2])
+            if self.command == 'POST':
+                new_id = max(state.objects.setdefault(resource, {0: {}}) or [0]) + 1
+                state.objects[resource][new_id] = {'id': new_id, 'name': f'{singular} {new_id}'}
+                return self._send(201, f'<{singular}><id>{new_id}</id></{singular}>', 'application/xml')
+            if object_id not in records:
+                return self._send(404, '<html><body>Not Found</body></html>', 'text/html')
+            if self.command == 'DELETE':
+                state.objects.get(resource, {}).pop(object_id, None)
+                return self._send(200, f'<{singular}><id>{object_id}</id></{singular}>', 'application/xml')
+            if self.command == 'PUT':
+                return self._send(201, f'<{singular}><id>{object_id}</id></{singular}>', 'application/xml')
+            record = records[object_id]
+            if len(parts) == 5 and parts[3] == 'subset':
+                wanted = {s.lower() for s in parts[4].split('&')}
+                record = {key: value for key, value in record.items() if key.replace('_', '') in wanted}
+            if as_json:
+                return self._send(200, json.dumps({singular: record}))
+            return self._send(200, _classic_xml(singular, record), 'application/xml')
+        return self._send(404, '<html><body>Not Found</body></html>', 'text/html')
+
+    @staticmethod
+    def _classic_computer(computer: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Classic API shape of a computer record
+        :param computer: Inventory record
+        :return: Classic record
+        """
+        return {
+            'general': {'id': int(computer['id']), 'name': computer['general']['name'],
+                        'serial_number': computer['hardware']['serialNumber']},
+            'hardware': {'model': computer['hardware']['model']},
+            'extension_attributes': [{'id': 1, 'name': 'EA', 'value': computer['id']}],
+            'software': {'applications': [{'name': a['name'], 'version': a['version']}
+                                          for a in computer['applications']]},
+        }
+
+    def _uapi(self, parts: List[str], query: Dict[str, List[str]], body: bytes) -> None:
+        """
+        Answer a Jamf Pro API request
+        :param parts: Path parts below /api
+        :param query: Query parameters
+        :param body: Request body
+        """
+        state = self.state
+        page = int(query.get('page', ['0'])[0])
+        page_size = int(query.get('page-size', ['100'])[0])
+        if state.max_page_size:
+            page_size = min(page_size, state.max_page_size)
+        rsql = query.get('filter', [''])[0]
+
+        def paged(records: List[Dict[str, Any]]) -> None:
+            if rsql:
+                records = [record for record in records if _rsql_match(record, rsql)]
+            results = records[page * page_size:(page + 1) * page_size]
+            self._send(200, json.dumps({'totalCount': len(records), 'results': results}))
+
+        if parts[:2] == ['v1', 'computers-inventory'] or parts[:2] == ['v1', 'computers-inventory-detail']:
+            sections = {section for value in query.get('section', ['GENERAL']) for section in value.split(',')}
+            if parts[1] == 'computers-inventory-detail':
+                sections = set(INVENTORY_SECTIONS)
+            keys = {'GENERAL': 'general', 'HARDWARE': 'hardware', 'OPERATING_SYSTEM': 'operatingSystem',
+                    'USER_AND_LOCATION': 'userAndLocation', 'APPLICATIONS': 'applications'}
+
+            def project(record: Dict[str, Any]) -> Dict[str, Any]:
+                projected = {'id': record['id'], 'udid': record['udid']}
+                for section in sections:
+                    if section in keys:
+                        projected[keys[section]] = record[keys[section]]
+                return projected
+
+            if len(parts) == 3:
+                record = state.computers.get(int(parts[2]))
+                if record is None:
+                    return self._send(404, '{"httpStatus": 404}')
+                return self._send(200, json.dumps(project(record)))
+            records = list(state.computers.values())
+            if rsql:
+                records = [record for record in records if _rsql_match(record, rsql)]
+            results = [project(record) for record in records[page * page_size:(page + 1) * page_size]]
+            return self._send(200, json.dumps({'totalCount': len(records), 'results': results}))
+
+        if parts[:3] == ['v2', 'mobile-devices', 'detail']:
+            return paged(list(state.mobile_devices.values()))
+
+        if parts[:2] == ['v1', 'icon']:
+            if len(parts) == 2 and self.command == 'POST':
+                # The file part of the multipart/form-data body
+                message = BytesParser(policy=default).parsebytes(
+                    f'Content-Type: {self.headers.get("Content-Type", "")}\r\n\r\n'.encode() + body)
+                parts_by_name = {part.get_param('name', header='Content-Disposition'): part
+                                 for part in message.iter_parts()} if message.is_multipart() else {}
+                part = parts_by_name.get('file')
+                if part is None:
+                    return self._send(400, '{"httpStatus": 400, "errors": [{"code": "INVALID_FILE"}]}')
+                with state.lock:
+                    new_id = max(state.icons or [0]) + 1
+                    state.icons[new_id] = (part.get_filename(), part.get_payload(decode=True))
+                return self._send(201, json.dumps({'id': new_id, 'name': part.get_filename(),
+                                                   'url': f'/api/v1/icon/download/{new_id}'}))
+            icon_id = int(parts[-1]) if parts[-1].isdigit() else 0
+            if icon_id not in state.icons:
+                return self._send(404, '{"httpStatus": 404}')
+            filename, content = state.icons[icon_id]
+            if len(parts) == 4 and parts[2] == 'download':
+                return self._send(200, content, 'application/octet-stream')
+            return self._send(200, json.dumps({'id': icon_id, 'name': filename,
+                                               'url': f'/api/v1/icon/download/{icon_id}'}))
+
+        if parts[:2] == ['preview', 'notifications']:
+            return self._send(200, '[]')
+
+        if len(parts) >= 2 and parts[1] in state.objects:
+            objects = state.objects[parts[1]]
+            if len(parts) == 2:
+                if self.command == 'POST':
+                    new_id = max(objects or [0]) + 1
+                    data = json.loads(body or b'{}')
+                    objects[new_id] = {**data, 'id': str(new_id)}
+                    return self._send(201, json.dumps({'id': str(new_id), 'href': f'/api/v1/{parts[1]}/{new_id}'}))
+                return paged([{**obj, 'id': str(obj['id'])} for obj in objects.values()])
+            object_id = int(parts[2])
+            if object_id not in objects:
+                return self._send(404, '{"httpStatus": 404}')
+            if self.command == 'DELETE':
+                objects.pop(object_id)
+                return self._send(204)
+            if self.command == 'PUT':
+                objects[object_id] = {**json.loads(body or b'{}'), 'id': str(object_id)}
+            return self._send(200, json.dumps({**objects[object_id], 'id': str(object_id)}))
+
+        return self._send(404, '{"httpStatus": 404}')
+
+    do_GET = do_POST = do_PUT = do_DELETE = do_PATCH = do_HEAD = _handle
+
+
+class MockJamfServer:
+    """
+    Run the mock server on a background thread
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, **kwargs: Any) -> None:
+        """
+        Initialisation
+        :param host: Address to bind
+        :param port: Port to bind, 0 for any free port
+        :param kwargs: MockState options
+        """
+        self.state = MockState(**kwargs)
+        handler = type('Handler', (MockJamfHandler,), {'state': self.state})
+        server = type('Server', (ThreadingHTTPServer,), {'request_queue_size': 256})
+        self._server = server((host, port), handler)
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """
+        Get the server url
+        :return: url
+        """
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self) -> 'MockJamfServer':
+        """
+        Serve in a background thread
+        :return: The server
+        """
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        """
+        Serve on the current thread until interrupted
+        """
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            self.stop()
+
+    def stop(self) -> None:
+        """
+        Stop serving
+        """
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'MockJamfServer':
+        return self.start()
+
+    def __exit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
+        self.stop()
+
+
+def main():
+    server = MockJamfServer(options.host, options.port, computers=options.computers,
+                            mobile_devices=options.mobile_devices, latency=options.latency,
+                            throttle_rate=options.throttle_rate, max_page_size=options.max_page_size)
+    print(f'Serving mock Jamf on {server.url} (user/password: any)')
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    # Create argument parser
+    parser = argparse.ArgumentParser(description='Local mock Jamf Pro server')
+
+    parser.add_argument('--host', default='127.0.0.1', dest='host', help='address to bind')
+    parser.add_argument('--port', default=8080, type=int, dest='port', help='port to bind')
+    parser.add_argument('--computers', default=1000, type=int, dest='computers', help='synthetic computers')
+    parser.add_argument('--mobile-devices', default=500, type=int, dest='mobile_devices',
+                        help='synthetic mobile devices')
+    parser.add_argument('--latency', default=0.0, type=float, dest='latency', help='seconds added to each response')
+    parser.add_argument('--throttle-rate', default=0.0, type=float, dest='throttle_rate',
+                        help='fraction of requests answered with 429')
+    parser.add_argument('--max-page-size', default=0, type=int, dest='max_page_size',
+                        help='largest page-size served, 0 for no cap')
+
+    options = parser.parse_args()
+    main()
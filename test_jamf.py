@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+
+"""
+Script:	test_jamf.py
+Date:	2026-10-16
+Platform: macOS/Linux
+Description:
+Tests of the jamf classes against the mock server, run with python -m unittest or pytest
+"""
+__author__ = 'thedzy'
+__copyright__ = 'Copyright 2020, thedzy'
+__license__ = 'GPL'
+__version__ = '1.0'
+__maintainer__ = 'thedzy'
+__email__ = 'thedzy@hotmail.com'
+__status__ = 'Development'
+
+import asyncio
+import io
+import os
+import pickle
+import tempfile
+import time
+import unittest
+
+import requests
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+import jamf
+import jamf_async
+from mock_jamf import MockJamfServer
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """
+    A circuit that is let through to test (half open) must not stay stuck when the call fails before it is sent
+    """
+    ENDPOINT = 'scripts_get_v1_scripts'
+
+    def setUp(self) -> None:
+        self.server = MockJamfServer(computers=1, mobile_devices=1).start()
+        self.port = self.server.url.rsplit(':', 1)[1]
+        self.breaker = jamf.CircuitBreaker(failures=1, reset_timeout=0.2)
+
+    def tearDown(self) -> None:
+        self.server.stop()
+
+    def _restart(self) -> None:
+        """
+        Serve again on the same port
+        """
+        self.server = MockJamfServer(port=int(self.port), computers=1, mobile_devices=1).start()
+
+    def _expire(self, api: jamf.Jamf) -> None:
+        """
+        Expire the clients token, so the next call has to authenticate
+        """
+        if isinstance(api, jamf_async.AsyncJamf):
+            api._token_expiry = 0
+        else:
+            api._token_manager._expires = 0
+
+    def test_auth_failure_on_test_call(self) -> None:
+        api = jamf.JamfUAPI(self.server.url, 'admin', 'password', circuit_breaker=self.breaker, timeout=2)
+        self.assertTrue(getattr(api, self.ENDPOINT)().success)
+
+        # Close the kept alive connections too, the handlers of a stopped server still answer them
+        self.server.stop()
+        api._session.close()
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            getattr(api, self.ENDPOINT)()
+        self.assertEqual(self.breaker.state(self.ENDPOINT), 'open')
+        with self.assertRaises(jamf.CircuitOpenError):
+            getattr(api, self.ENDPOINT)()
+
+        # The call let through fails on the token request, before the endpoint is called
+        time.sleep(0.25)
+        self._expire(api)
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            getattr(api, self.ENDPOINT)()
+        self.assertEqual(self.breaker.state(self.ENDPOINT), 'half_open')
+
+        self._restart()
+        self.assertTrue(getattr(api, self.ENDPOINT)().success)
+        self.assertEqual(self.breaker.state(self.ENDPOINT), 'closed')
+        api.logout()
+
+    @unittest.skipUnless(httpx, 'requires httpx')
+    def test_auth_failure_on_test_call_async(self) -> None:
+        async def run() -> None:
+            async with jamf_async.AsyncJamfUAPI(self.server.url, 'admin', 'password', circuit_breaker=self.breaker,
+                                                timeout=2) as api:
+                self.assertTrue((await getattr(api, self.ENDPOINT)()).success)
+
+                self.server.stop()
+                client, api._client = api._client, None
+                await client.aclose()
+                with self.assertRaises(httpx.ConnectError):
+                    await getattr(api, self.ENDPOINT)()
+                self.assertEqual(self.breaker.state(self.ENDPOINT), 'open')
+
+                await asyncio.sleep(0.25)
+                self._expire(api)
+                with self.assertRaises(httpx.ConnectError):
+                    await getattr(api, self.ENDPOINT)()
+                self.assertEqual(self.breaker.state(self.ENDPOINT), 'half_open')
+
+                self._restart()
+                self.assertTrue((await getattr(api, self.ENDPOINT)()).success)
+                self.assertEqual(self.breaker.state(self.ENDPOINT), 'closed')
+
+        asyncio.run(run())
+
+
+class TestHedging(unittest.TestCase):
+    """
+    The connect time of a hedged request, sent on a hedger thread, is kept in the timings
+    """
+    ENDPOINT = 'scripts_get_v1_scripts'
+
+    def test_connect_time(self) -> None:
+        with MockJamfServer(computers=1, mobile_devices=1) as server:
+            hedger = jamf.Hedger(min_samples=1)
+            api = jamf.JamfUAPI(server.url, 'admin', 'password', hedge=hedger)
+            getattr(api, self.ENDPOINT)()
+            self.assertIsNotNone(hedger.delay(self.ENDPOINT))
+
+            # A new connection is opened for the next request
+            api._session.close()
+            response = getattr(api, self.ENDPOINT)()
+            self.assertTrue(response.success)
+            self.assertGreater(response.elapsed['connect'], 0.0)
+            api.logout()
+
+
+class TestPaging(unittest.TestCase):
+    """
+    Paging follows totalCount when the server serves smaller pages than were asked for
+    """
+
+    def test_capped_page_size(self) -> None:
+        with MockJamfServer(computers=95, mobile_devices=1, max_page_size=30) as server:
+            api = jamf.JamfUAPI(server.url, 'admin', 'password')
+            pages = list(api.iter_pages('computer_inventory_get_v1_computers_inventory', page_size=100))
+            self.assertEqual([len(page.json['results']) for page in pages], [30, 30, 30, 5])
+            ids = [computer['id'] for computer in api.iter_results('computer_inventory_get_v1_computers_inventory')]
+            self.assertEqual(ids, [str(i) for i in range(1, 96)])
+            api.logout()
+
+
+class TestConditionalRequests(unittest.TestCase):
+    """
+    A conditional GET after the token is renewed is sent with the new token
+    """
+    ENDPOINT = 'scripts_get_v1_scripts'
+
+    def test_token_renewed_between_requests(self) -> None:
+        with MockJamfServer(computers=1, mobile_devices=1) as server:
+            api = jamf.JamfUAPI(server.url, 'admin', 'password', conditional_requests=True)
+            first = getattr(api, self.ENDPOINT)()
+            self.assertEqual(first.http_code, 200)
+
+            # Renewed with keep-alive, which invalidates the token the last request was sent with
+            token_manager = api._token_manager
+            with token_manager._lock:
+                token_manager._refresh()
+            second = getattr(api, self.ENDPOINT)()
+            self.assertEqual(second.http_code, 304)
+            self.assertTrue(second.success)
+            self.assertEqual(second.data, first.data)
+            api.logout()
+
+
+class TestConfig(unittest.TestCase):
+    """
+    A client pickles as its config without a request, and keeps a cache kept in a file
+    """
+    ENDPOINT = 'scripts_get_v1_scripts'
+
+    def test_pickle(self) -> None:
+        with MockJamfServer(computers=1, mobile_devices=1) as server, tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cache.sqlite')
+            api = jamf.JamfUAPI(server.url, 'admin', 'password', cache=jamf.ResponseCache(path=path))
+            self.assertFalse(getattr(api, self.ENDPOINT)().cached)
+
+            # Expired, fetching a new token is left to the next call rather than done while pickling
+            api._token_manager._expires = time.time() - 1
+            sent = len(server.state.requests)
+            pickled = pickle.dumps(api)
+            self.assertEqual(api.config()['token'], api._token_manager._token)
+            self.assertEqual(len(server.state.requests), sent)
+            worker = pickle.loads(pickled)
+
+            self.assertEqual(worker._cache.path, path)
+            self.assertIsNot(worker._cache, api._cache)
+            self.assertTrue(getattr(worker, self.ENDPOINT)().cached)
+            worker.logout()
+            api.logout()
+
+
+class TestStreams(unittest.TestCase):
+    """
+    Streamed responses are sent through the same path as other calls
+    """
+
+    def test_iter_xml(self) -> None:
+        with MockJamfServer(computers=25, mobile_devices=1) as server:
+            metrics = jamf.Metrics()
+            api = jamf.JamfClassic(server.url, 'admin', 'password', metrics=metrics)
+            requests_seen, responses = [], []
+            api.add_hook('request', lambda name, method, url, request_args: requests_seen.append(name))
+            api.add_hook('response', lambda name, method, response: responses.append(response))
+
+            computers = list(api.iter_xml('computers_find_computers_basic'))
+            self.assertEqual([computer['id'] for computer in computers], [str(i) for i in range(1, 26)])
+            self.assertEqual(requests_seen, ['computers_find_computers_basic'])
+            self.assertEqual(len(responses), 1)
+            self.assertTrue(responses[0].success)
+            self.assertGreater(responses[0].data['bytes'], 0)
+            self.assertEqual(metrics.snapshot()['computers_find_computers_basic']['requests'], 1)
+            api.logout()
+
+    def test_download_after_token_renewal(self) -> None:
+        with MockJamfServer(computers=1, mobile_devices=1) as server:
+            metrics = jamf.Metrics()
+            api = jamf.JamfUAPI(server.url, 'admin', 'password', metrics=metrics)
+            content = bytes(range(256)) * 64
+            created = api.icon_create_v1_icon(files={'file': ('logo.png', io.BytesIO(content), 'image/png')})
+            self.assertTrue(created.success)
+            icon_id = created.json['id']
+
+            # download= sends headers of its own, merged with those carrying the renewed token
+            token_manager = api._token_manager
+            with token_manager._lock:
+                token_manager._refresh()
+            target = io.BytesIO()
+            downloaded = api.icon_get_v1_icon_download_by_id(id=icon_id, download=target)
+            self.assertTrue(downloaded.success)
+            self.assertEqual(target.getvalue(), content)
+
+            with token_manager._lock:
+                token_manager._refresh()
+            responses = []
+            api.add_hook('response', lambda name, method, response: responses.append(response))
+            chunks = list(api.iter_download('icon_get_v1_icon_download_by_id', chunk_size=1024, id=icon_id))
+            self.assertEqual(b''.join(chunks), content)
+            self.assertEqual(responses[0].data['bytes'], len(content))
+            self.assertEqual(metrics.snapshot()['icon_get_v1_icon_download_by_id']['requests'], 2)
+            api.logout()
+
+
+if __name__ == '__main__':
+    unittest.main()